@@ -4,18 +4,38 @@ from __future__ import annotations
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
 
 from .const import DOMAIN
+from .api import async_register_api
 from .coordinator import SGReadyCoordinator
+from .services import async_register_services
 
-PLATFORMS = [Platform.SENSOR, Platform.NUMBER, Platform.SWITCH, Platform.SELECT]
+PLATFORMS = [Platform.SENSOR, Platform.BINARY_SENSOR, Platform.NUMBER, Platform.SWITCH, Platform.SELECT]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    async_register_services(hass)
+    async_register_api(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     coordinator = SGReadyCoordinator(hass, entry)
+    await coordinator.async_start_backend()
+    await coordinator.async_restore_plan()
+    await coordinator.async_restore_price_history()
+    await coordinator.async_restore_peaks()
+    await coordinator.async_restore_energy()
+    await coordinator.async_restore_shadow()
     await coordinator.async_config_entry_first_refresh()
     await coordinator.async_start_ai_mqtt()
-    coordinator.async_start_nordpool_listener()
+    await coordinator.async_start_state_mqtt()
+    coordinator.async_start_price_listeners()
+    coordinator.async_start_entity_listeners()
+    coordinator.async_start_power_listener()
+    coordinator.async_start_forecast_listener()
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
@@ -33,7 +53,15 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     coordinator: SGReadyCoordinator = hass.data[DOMAIN].get(entry.entry_id)
     if coordinator:
         await coordinator.async_stop_ai_mqtt()
-        coordinator.async_stop_nordpool_listener()
+        await coordinator.async_stop_state_mqtt()
+        coordinator.async_stop_price_listeners()
+        coordinator.async_stop_entity_listeners()
+        coordinator.async_stop_power_listener()
+        coordinator.async_stop_forecast_listener()
+        coordinator.async_stop_plan_timer()
+        coordinator.async_stop_load_timer()
+        await coordinator.async_stop_backend()
+        await coordinator.async_flush_journal()
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
@@ -0,0 +1,109 @@
+"""Kvittens från värmepumpen — korrelerar publicerat läge med rapporterat tillstånd."""
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+
+from .const import MODE_BOOST, MODE_NORMAL, MODE_BLOCK
+
+_MODES = (MODE_BOOST, MODE_NORMAL, MODE_BLOCK)
+
+
+def parse_device_state(payload: str | bytes) -> str | None:
+    """Rapporterat läge från reläet/bryggan — ren text ("boost") eller JSON {"mode": "boost"}."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", "replace")
+    text = payload.strip()
+    if text.startswith("{"):
+        try:
+            text = str(json.loads(text).get("mode", ""))
+        except (ValueError, AttributeError):
+            return None
+    text = text.strip().lower()
+    return text if text in _MODES else None
+
+
+class ActuationTracker:
+    """Håller reda på väntande kommando, latens och avvikelser.
+
+    Tider är monotona sekunder (time.monotonic) — skickas in av anroparen.
+    """
+
+    def __init__(self) -> None:
+        self.commanded_mode: str | None = None
+        self.pending_mode: str | None = None
+        self.pending_since: float | None = None
+        self.attempts = 0
+        self.device_state: str | None = None
+        self.gave_up: str | None = None      # läge vars bevakning gav upp — bevakas inte igen förrän läge/enhet ändras
+        self.last_latency_ms: float | None = None
+        self.avg_latency_ms: float | None = None
+        self.acks = 0
+        self.mismatches = 0
+        self.retries = 0
+        self.failures = 0
+        self._listeners: list[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def sent(self, mode: str, now: float) -> None:
+        """Registrera ett nytt publicerat läge som väntar på kvittens."""
+        self.commanded_mode = mode
+        self.pending_mode = mode
+        self.pending_since = now
+        self.attempts = 1
+        self.gave_up = None
+
+    def resent(self) -> None:
+        """Omsändning av väntande läge — latensen mäts från första försöket."""
+        self.attempts += 1
+        self.retries += 1
+
+    def cancel(self) -> None:
+        """Inget kommando väntar längre på kvittens."""
+        self.pending_mode = None
+        self.pending_since = None
+        self.attempts = 0
+
+    def reported(self, state: str, now: float) -> float | None:
+        """Enheten rapporterade `state`. Returnerar latens i ms om det kvitterar väntande kommando."""
+        if state != self.device_state:
+            self.gave_up = None
+        self.device_state = state
+        latency = None
+        if self.pending_mode is not None and state == self.pending_mode:
+            latency = (now - self.pending_since) * 1000
+            self.last_latency_ms = latency
+            self.avg_latency_ms = latency if self.avg_latency_ms is None else 0.8 * self.avg_latency_ms + 0.2 * latency
+            self.acks += 1
+            self.cancel()
+        elif self.pending_mode is None and self.commanded_mode is not None and state != self.commanded_mode:
+            # Enheten bytte läge utan kommando från oss (lokal styrning, omstart …)
+            self.mismatches += 1
+        self._notify()
+        return latency
+
+    def timed_out(self) -> None:
+        """Ingen kvittens efter sista omförsöket — räknas som avvikelse."""
+        self.failures += 1
+        self.mismatches += 1
+        self.gave_up = self.pending_mode
+        self.cancel()
+        self._notify()
+
+    def as_dict(self) -> dict:
+        return {
+            "device_state": self.device_state,
+            "pending_mode": self.pending_mode,
+            "avg_latency_ms": round(self.avg_latency_ms, 1) if self.avg_latency_ms is not None else None,
+            "acks": self.acks,
+            "mismatch_count": self.mismatches,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
@@ -0,0 +1,111 @@
+"""Validering och hastighetsbegränsning av AI-kommandon (MQTT + tjänster)."""
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable
+from datetime import datetime
+
+import voluptuous as vol
+
+from .const import (
+    AI_MODES, AI_MODE_AUTO, PLAN_MAX_WINDOWS,
+    AI_MAX_PAYLOAD_BYTES, AI_REASON_MAX_LEN,
+)
+
+
+class CommandRejected(Exception):
+    """AI-kommandot avvisades — `str(err)` är orsaken som skickas i kvittensen."""
+
+
+def _datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError as err:
+        raise vol.Invalid(f"ogiltig tidpunkt: {value!r}") from err
+
+
+_REASON = vol.All(vol.Coerce(str), vol.Length(max=AI_REASON_MAX_LEN))
+_COMMON = {
+    vol.Optional("id"): vol.All(vol.Coerce(str), vol.Length(max=64)),
+    vol.Optional("source"): vol.All(vol.Coerce(str), vol.Length(max=64)),
+}
+
+WINDOW_SCHEMA = vol.Schema({
+    vol.Required("start"): _datetime,
+    vol.Required("end"): _datetime,
+    vol.Required("mode"): vol.In(AI_MODES),
+    vol.Optional("reason", default=""): _REASON,
+    vol.Optional("priority", default=0): vol.Coerce(int),
+})
+
+PLAN_COMMAND_SCHEMA = vol.Schema({
+    vol.Required("plan"): vol.All(list, vol.Length(max=PLAN_MAX_WINDOWS), [WINDOW_SCHEMA]),
+    vol.Optional("replace", default=True): bool,
+    **_COMMON,
+})
+
+MODE_COMMAND_SCHEMA = vol.Schema({
+    vol.Optional("mode", default=AI_MODE_AUTO): vol.In(AI_MODES),
+    vol.Optional("reason", default="AI-kommando"): _REASON,
+    vol.Optional("until"): vol.Any(None, _datetime),
+    **_COMMON,
+})
+
+
+def validate_command(payload) -> dict:
+    """Validera ett redan avkodat kommando. Kastar CommandRejected."""
+    if not isinstance(payload, dict):
+        raise CommandRejected("payload måste vara ett JSON-objekt")
+    schema = PLAN_COMMAND_SCHEMA if "plan" in payload else MODE_COMMAND_SCHEMA
+    try:
+        return schema(payload)
+    except vol.Invalid as err:
+        raise CommandRejected(str(err)) from err
+
+
+def decode_command(raw: str | bytes):
+    """Avkoda en MQTT-payload utan att validera. Storleken kontrolleras före json.loads."""
+    if len(raw) > AI_MAX_PAYLOAD_BYTES:
+        raise CommandRejected(f"payload större än {AI_MAX_PAYLOAD_BYTES} byte")
+    try:
+        return json.loads(raw)
+    except ValueError as err:
+        raise CommandRejected(f"ogiltig JSON: {err}") from err
+
+
+def command_id(payload) -> str | None:
+    """Kommandots `id` för kvittensen — även när resten av payloaden avvisas."""
+    if isinstance(payload, dict) and isinstance(payload.get("id"), (str, int)):
+        return str(payload["id"])[:64]
+    return None
+
+
+def parse_command(raw: str | bytes) -> dict:
+    """Avkoda och validera en MQTT-payload."""
+    return validate_command(decode_command(raw))
+
+
+class TokenBucket:
+    """Klassisk token bucket — `rate` kommandon per sekund, max `burst` i följd."""
+
+    __slots__ = ("rate", "burst", "_tokens", "_stamp", "_monotonic")
+
+    def __init__(self, rate: float, burst: float, monotonic: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._monotonic = monotonic
+        self._tokens = burst
+        self._stamp = monotonic()
+
+    def take(self) -> bool:
+        now = self._monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
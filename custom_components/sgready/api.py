@@ -0,0 +1,27 @@
+"""HTTP-vy för övervakning — OpenMetrics på /api/sgready/metrics."""
+from __future__ import annotations
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, METRICS_URL
+from .metrics import CONTENT_TYPE, render_openmetrics
+
+
+class SGReadyMetricsView(HomeAssistantView):
+    """Alla konfigurerade koordinatorers räknare. Kräver token (Authorization: Bearer …)."""
+
+    url = METRICS_URL
+    name = "api:sgready:metrics"
+
+    async def get(self, request: web.Request) -> web.Response:
+        hass: HomeAssistant = request.app["hass"]
+        coordinators = hass.data.get(DOMAIN, {})
+        body = render_openmetrics(sorted(coordinators.items()))
+        return web.Response(body=body.encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+@callback
+def async_register_api(hass: HomeAssistant) -> None:
+    hass.http.register_view(SGReadyMetricsView())
@@ -0,0 +1,177 @@
+"""Utgångar för SG Ready-läget — MQTT, två reläentiteter eller Modbus TCP.
+
+Varje utgång importerar sitt beroende först när den används, så att
+integrationen laddar även utan MQTT och utan pymodbus.
+"""
+from __future__ import annotations
+
+import inspect
+from abc import ABC, abstractmethod
+
+from homeassistant.const import STATE_ON
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    MODE_BOOST, MODE_NORMAL, MODE_BLOCK,
+    BACKEND_MQTT, BACKEND_SWITCH, BACKEND_MODBUS, DEFAULT_MODBUS_VALUES,
+)
+
+# SG Ready-kontakterna (K1, K2) per läge — samma som Shelly-scriptet
+RELAY_CONTACTS = {
+    MODE_BOOST: (True, True),
+    MODE_NORMAL: (False, False),
+    MODE_BLOCK: (True, False),
+}
+
+
+def modbus_unit_keyword(client) -> str:
+    """Nyckelordet för enhetsadressen: `device_id` i pymodbus 3.10+, `slave` i 3.6–3.9.
+
+    Läses ur signaturen — 3.6–3.9 tar `**kwargs`, så ett fel nyckelord
+    sväljs tyst och anropet går till enhet 0.
+    """
+    parameters = inspect.signature(client.write_register).parameters
+    return "device_id" if "device_id" in parameters else "slave"
+
+
+def mqtt_module(hass: HomeAssistant):
+    """MQTT-integrationen om den är laddad, annars None (MQTT är valfritt)."""
+    if "mqtt" not in hass.config.components:
+        return None
+    from homeassistant.components import mqtt
+    return mqtt
+
+
+class Backend(ABC):
+    """Skickar läget till värmepumpen. `async_read_back` används för kvittens om `can_confirm`."""
+
+    name = ""
+    publish_on_change = True    # False = skicka vid varje omräkning
+    can_confirm = False
+
+    async def async_start(self) -> None:
+        """Anslut (anropas vid uppstart)."""
+
+    async def async_stop(self) -> None:
+        """Koppla ner (anropas vid avladdning)."""
+
+    @abstractmethod
+    async def async_send(self, mode: str) -> None:
+        """Skicka läget; ConnectionError/RuntimeError om utgången inte nås."""
+
+    async def async_read_back(self) -> str | None:
+        return None
+
+
+class MqttBackend(Backend):
+    """Retained läge på styr-topicet — skickas varje omräkning."""
+
+    name = BACKEND_MQTT
+    publish_on_change = False
+
+    def __init__(self, hass: HomeAssistant, topic: str) -> None:
+        self.hass = hass
+        self.topic = topic
+
+    async def async_send(self, mode: str) -> None:
+        mqtt = mqtt_module(self.hass)
+        if mqtt is None:
+            raise RuntimeError("MQTT-integrationen är inte konfigurerad")
+        await mqtt.async_publish(self.hass, self.topic, mode, qos=1, retain=True)
+
+
+class SwitchBackend(Backend):
+    """Två HA-entiteter (switch, input_boolean …) på SG Ready-ingångarna — ingen broker emellan."""
+
+    name = BACKEND_SWITCH
+    can_confirm = True
+
+    def __init__(self, hass: HomeAssistant, k1_entity: str, k2_entity: str) -> None:
+        self.hass = hass
+        self.entities = (k1_entity, k2_entity)
+
+    async def async_send(self, mode: str) -> None:
+        for entity_id, on in zip(self.entities, RELAY_CONTACTS[mode]):
+            state = self.hass.states.get(entity_id)
+            if state is not None and (state.state == STATE_ON) == on:
+                continue
+            await self.hass.services.async_call(
+                "homeassistant", "turn_on" if on else "turn_off", {"entity_id": entity_id}, blocking=True,
+            )
+
+    async def async_read_back(self) -> str | None:
+        states = [self.hass.states.get(entity_id) for entity_id in self.entities]
+        if any(state is None for state in states):
+            return None
+        contacts = tuple(state.state == STATE_ON for state in states)
+        return next((mode for mode, pattern in RELAY_CONTACTS.items() if pattern == contacts), None)
+
+
+class ModbusBackend(Backend):
+    """Holding register i värmepumpen (inbyggt SG Ready via Modbus TCP).
+
+    `values` mappar läge → registervärde, t.ex. {"block": 1, "normal": 2, "boost": 3}.
+    """
+
+    name = BACKEND_MODBUS
+    can_confirm = True
+
+    def __init__(self, host: str, port: int, unit: int, register: int, values: dict[str, int]) -> None:
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.register = register
+        self.values = values
+        self._client = None
+        self._unit: dict[str, int] = {}   # {nyckelord: enhet} för den installerade pymodbus
+
+    async def async_start(self) -> None:
+        try:
+            from pymodbus.client import AsyncModbusTcpClient
+        except ImportError as err:
+            raise RuntimeError("pymodbus saknas — krävs för Modbus-utgången") from err
+        self._client = AsyncModbusTcpClient(self.host, port=self.port)
+        self._unit = {modbus_unit_keyword(self._client): self.unit}
+
+    async def async_stop(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def _connected(self):
+        if self._client is None:
+            await self.async_start()
+        if not self._client.connected and not await self._client.connect():
+            raise ConnectionError(f"Ingen Modbus-anslutning till {self.host}:{self.port}")
+        return self._client
+
+    async def async_send(self, mode: str) -> None:
+        client = await self._connected()
+        result = await client.write_register(self.register, self.values[mode], **self._unit)
+        if result.isError():
+            raise ConnectionError(f"Modbus-skrivning avvisades: {result}")
+
+    async def async_read_back(self) -> str | None:
+        client = await self._connected()
+        result = await client.read_holding_registers(self.register, count=1, **self._unit)
+        if result.isError():
+            return None
+        value = result.registers[0]
+        return next((mode for mode, raw in self.values.items() if raw == value), None)
+
+
+def modbus_values(data) -> dict[str, int]:
+    """Validera registervärden per läge. Kastar ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("Registervärden måste vara ett objekt")
+    values = {**DEFAULT_MODBUS_VALUES, **data}
+    if set(values) != set(RELAY_CONTACTS):
+        raise ValueError("Tillåtna nycklar: boost, normal, block")
+    try:
+        values = {mode: int(raw) for mode, raw in values.items()}
+    except (TypeError, ValueError) as err:
+        raise ValueError("Registervärden måste vara heltal") from err
+    if len(set(values.values())) != len(values) or not all(0 <= raw <= 0xFFFF for raw in values.values()):
+        raise ValueError("Registervärdena måste vara unika och 0–65535")
+    return values
+
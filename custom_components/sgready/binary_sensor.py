@@ -0,0 +1,49 @@
+"""Binärsensorer för SG Ready — en per konfigurerad last (på under valt billigaste fönster)."""
+from __future__ import annotations
+
+from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, BINARY_SENSOR_LOAD
+from .coordinator import SGReadyCoordinator
+
+
+async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback):
+    coordinator: SGReadyCoordinator = hass.data[DOMAIN][entry.entry_id]
+    async_add_entities(
+        SGReadyLoadBinarySensor(coordinator, entry, key) for key in coordinator.loads.specs
+    )
+
+
+class SGReadyLoadBinarySensor(BinarySensorEntity):
+    """På när lasten ska köra — styr t.ex. varmvattnet via en automation."""
+
+    _attr_icon = "mdi:calendar-clock"
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: SGReadyCoordinator, entry, key: str):
+        self._coordinator = coordinator
+        self._key = key
+        self._attr_unique_id = f"{entry.entry_id}_{BINARY_SENSOR_LOAD}_{key}"
+        self._attr_name = f"SG Ready {coordinator.loads.specs[key].name}"
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._coordinator.loads.add_listener(self.async_write_ha_state))
+
+    @property
+    def is_on(self) -> bool:
+        plan = self._coordinator.loads.plans.get(self._key)
+        return plan is not None and plan.active(self._coordinator.clock.now())
+
+    @property
+    def extra_state_attributes(self):
+        spec = self._coordinator.loads.specs[self._key]
+        plan = self._coordinator.loads.plans.get(self._key)
+        return {
+            "hours": spec.hours,
+            "count": spec.count,
+            "before": spec.before.isoformat() if spec.before else None,
+            "after": spec.after.isoformat() if spec.after else None,
+            **(plan.as_dict() if plan else {}),
+        }
@@ -0,0 +1,155 @@
+"""Klocka — monoton tid för varaktigheter och lokal väggtid för timslots, utan beroende till Home Assistant.
+
+Hysteres- och aktiveringstider (production override, kvittens, hämtintervall)
+mäts med `monotonic()` och påverkas därför inte av sommartid eller NTP-steg.
+Timslot, datum och tidsstämplar tas från `now()`/`utcnow()`, alltid
+tidszonsmedvetna. `VirtualClock` låter simuleringar och tester stega dygn av
+förlopp utan att vänta. Den har egna timers (`call_later`, `call_at`,
+`call_every`) som koordinatorn använder i stället för HA:s schemaläggare,
+så att kvittens-, plan- och fönstertimers följer den virtuella tiden.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone, tzinfo
+
+Action = Callable[[datetime], object]
+
+
+class Clock(ABC):
+    """Gränssnittet koordinatorn och de HA-fria modulerna läser tiden genom."""
+
+    @abstractmethod
+    def monotonic(self) -> float:
+        """Sekunder från godtycklig startpunkt — bara differenser har betydelse."""
+
+    @abstractmethod
+    def utcnow(self) -> datetime:
+        """Väggtid i UTC."""
+
+    @abstractmethod
+    def now(self) -> datetime:
+        """Lokal väggtid (tidszonsmedveten)."""
+
+
+class SystemClock(Clock):
+    """Systemets klockor. `tz` anropas vid varje `now()` så att en ändrad tidszon slår igenom."""
+
+    def __init__(self, tz: Callable[[], tzinfo] | None = None) -> None:
+        self._tz = tz
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def utcnow(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def now(self) -> datetime:
+        return self.utcnow().astimezone(self._tz() if self._tz else None)
+
+
+class VirtualClock(Clock):
+    """Klocka som bara går när den stegas.
+
+    `advance` flyttar både monoton tid och väggtid; `step_wall` flyttar bara
+    väggtiden (NTP-justering, manuellt ställd klocka) och låter varaktigheter
+    vara orörda.
+    """
+
+    def __init__(self, start: datetime, tz: tzinfo | None = None) -> None:
+        if start.tzinfo is None:
+            raise ValueError("starttiden måste ha tidszon")
+        self.tz = tz or start.tzinfo
+        self._wall = start.astimezone(timezone.utc)
+        self._monotonic = 0.0
+        # (förfallotid, ordning, åtgärd) — monoton tid respektive väggtid; avbrutna plockas bort vid tur
+        self._timers: list[tuple[float, int, Action]] = []
+        self._wall_timers: list[tuple[datetime, int, Action]] = []
+        self._cancelled: set[int] = set()
+        self._sequence = itertools.count()
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def utcnow(self) -> datetime:
+        return self._wall
+
+    def now(self) -> datetime:
+        return self._wall.astimezone(self.tz)
+
+    def advance(self, seconds: float | timedelta) -> None:
+        """Stega framåt; timers som förfaller anropas i tidsordning med klockan ställd på förfallotiden."""
+        if isinstance(seconds, timedelta):
+            seconds = seconds.total_seconds()
+        if seconds < 0:
+            raise ValueError("monoton tid kan inte gå baklänges")
+        target = self._monotonic + seconds
+        while (due := self._next_due()) is not None and due[0] <= target:
+            self._step(max(0.0, due[0] - self._monotonic))
+            heapq.heappop(due[1])
+            self._fire(due[2], due[3])
+        self._step(target - self._monotonic)
+
+    def step_wall(self, delta: timedelta) -> None:
+        """Flytta bara väggtiden; väggtidstimers som därmed passerats anropas."""
+        self._wall += delta
+        while self._wall_timers and self._wall_timers[0][0] <= self._wall:
+            _, sequence, action = heapq.heappop(self._wall_timers)
+            self._fire(sequence, action)
+
+    # ── Timers ───────────────────────────────────────────────────────────
+
+    def call_later(self, delay: float, action: Action) -> Callable[[], None]:
+        """Anropa `action(utcnow)` om `delay` sekunder monoton tid. Returnerar en avbrytare."""
+        sequence = next(self._sequence)
+        heapq.heappush(self._timers, (self._monotonic + max(0.0, delay), sequence, action))
+        return lambda: self._cancelled.add(sequence)
+
+    def call_at(self, when: datetime, action: Action) -> Callable[[], None]:
+        """Anropa `action(utcnow)` när väggtiden når `when`."""
+        sequence = next(self._sequence)
+        heapq.heappush(self._wall_timers, (when.astimezone(timezone.utc), sequence, action))
+        return lambda: self._cancelled.add(sequence)
+
+    def call_every(self, interval: float, action: Action) -> Callable[[], None]:
+        """Anropa `action(utcnow)` var `interval` sekund monoton tid tills avbrytaren anropas."""
+        cancel: list[Callable[[], None]] = []
+
+        def _tick(now: datetime) -> None:
+            cancel[0] = self.call_later(interval, _tick)
+            action(now)
+
+        cancel.append(self.call_later(interval, _tick))
+        return lambda: cancel[0]()
+
+    def _next_due(self) -> tuple[float, list, int, Action] | None:
+        """Nästa timer som (monoton förfallotid, kö, ordning, åtgärd); väggtidstimers räknas om till monoton tid."""
+        for queue in (self._timers, self._wall_timers):
+            while queue and queue[0][1] in self._cancelled:
+                self._cancelled.discard(heapq.heappop(queue)[1])
+        candidates = []
+        if self._timers:
+            due, sequence, action = self._timers[0]
+            candidates.append((due, sequence, self._timers, action))
+        if self._wall_timers:
+            when, sequence, action = self._wall_timers[0]
+            due = self._monotonic + (when - self._wall).total_seconds()
+            candidates.append((due, sequence, self._wall_timers, action))
+        if not candidates:
+            return None
+        due, sequence, queue, action = min(candidates, key=lambda item: item[:2])
+        return due, queue, sequence, action
+
+    def _step(self, seconds: float) -> None:
+        self._monotonic += seconds
+        self._wall += timedelta(seconds=seconds)
+
+    def _fire(self, sequence: int, action: Action) -> None:
+        if sequence in self._cancelled:
+            self._cancelled.discard(sequence)
+            return
+        action(self._wall)
@@ -1,6 +1,8 @@
 """Konfigurationsflöde för SG Ready."""
 from __future__ import annotations
 
+import importlib.util
+
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
@@ -8,14 +10,33 @@ from homeassistant.helpers import selector
 
 from .const import (
     DOMAIN,
-    CONF_MQTT_TOPIC, CONF_MQTT_AI_TOPIC,
+    CONF_MQTT_TOPIC, CONF_MQTT_AI_TOPIC, CONF_MQTT_AI_RESULT_TOPIC, CONF_MQTT_STATE_TOPIC,
+    CONF_MQTT_EDGE_TOPIC,
+    CONF_BACKEND, BACKENDS, BACKEND_MQTT, BACKEND_SWITCH, BACKEND_MODBUS,
+    CONF_RELAY_K1_ENTITY, CONF_RELAY_K2_ENTITY,
+    CONF_MODBUS_HOST, CONF_MODBUS_PORT, CONF_MODBUS_UNIT, CONF_MODBUS_REGISTER, CONF_MODBUS_VALUES,
+    DEFAULT_MODBUS_PORT, DEFAULT_MODBUS_UNIT, DEFAULT_MODBUS_VALUES,
     CONF_NORDPOOL_CONFIG_ENTRY, CONF_NORDPOOL_AREA,
     CONF_TEMP_ENTITY, CONF_TARIFF_ENTITY,
-    CONF_GRID_POWER_ENTITY, CONF_PROD_ENABLED,
-    CONF_BOOST_PCT, CONF_BLOCK_PCT, CONF_MIN_TEMP,
-    DEFAULT_MQTT_TOPIC, DEFAULT_MQTT_AI_TOPIC,
+    CONF_GRID_POWER_ENTITY, CONF_GRID_POWER_SOURCES, CONF_PROD_ENABLED,
+    CONF_PEAK_ENABLED, CONF_PEAK_TOP_K, CONF_PEAK_BOOST_LOAD, CONF_LOADS, CONF_SHADOW,
+    CONF_JOURNAL_ENABLED, CONF_DISABLED_STAGES,
+    CONF_PRICE_MODEL, CONF_PRICE_PROVIDERS, CONF_OUTDOOR_FORECAST_ENTITY, CONF_COP_CURVE,
+    CONF_FORECAST_ENTITIES, CONF_FORECAST_FILE, CONF_FORECAST_BASE_LOAD, DEFAULT_FORECAST_BASE_LOAD,
+    DEFAULT_PEAK_TOP_K, DEFAULT_PEAK_BOOST_LOAD,
+    CONF_BOOST_PCT, CONF_BLOCK_PCT, CONF_MIN_TEMP, CONF_LONGTERM_DAYS,
+    DEFAULT_LONGTERM_DAYS,
+    DEFAULT_MQTT_TOPIC, DEFAULT_MQTT_AI_TOPIC, DEFAULT_MQTT_AI_RESULT_TOPIC,
     DEFAULT_BOOST_PCT, DEFAULT_BLOCK_PCT, DEFAULT_MIN_TEMP,
 )
+from .backends import modbus_values
+from .fusion import PowerSource
+from .heatcost import CopCurve
+from .pipeline import OPTIONAL_STAGES
+from .pricing import PriceModel
+from .providers import price_provider
+from .scheduler import LoadSpec
+from .shadow import validate_overrides
 
 
 def _nordpool_entries(hass) -> list[dict]:
@@ -66,6 +87,7 @@ class SGReadyConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             }),
             vol.Required(CONF_MQTT_TOPIC, default=DEFAULT_MQTT_TOPIC): str,
             vol.Optional(CONF_MQTT_AI_TOPIC, default=DEFAULT_MQTT_AI_TOPIC): str,
+            vol.Optional(CONF_MQTT_AI_RESULT_TOPIC, default=DEFAULT_MQTT_AI_RESULT_TOPIC): str,
             vol.Optional(CONF_TEMP_ENTITY): selector.selector({
                 "entity": {"domain": "sensor", "device_class": "temperature"},
             }),
@@ -88,8 +110,54 @@ class SGReadyOptionsFlow(config_entries.OptionsFlow):
         self._entry = config_entry
 
     async def async_step_init(self, user_input=None):
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            loads = user_input.get(CONF_LOADS) or []
+            try:
+                for load in loads if isinstance(loads, list) else [loads]:
+                    LoadSpec.from_dict(load)
+            except ValueError:
+                errors[CONF_LOADS] = "invalid_loads"
+            sources = user_input.get(CONF_GRID_POWER_SOURCES) or []
+            try:
+                for source in sources if isinstance(sources, list) else [sources]:
+                    PowerSource.from_dict(source)
+            except ValueError:
+                errors[CONF_GRID_POWER_SOURCES] = "invalid_power_sources"
+            backend = user_input.get(CONF_BACKEND, BACKEND_MQTT)
+            if backend == BACKEND_SWITCH and not (user_input.get(CONF_RELAY_K1_ENTITY) and user_input.get(CONF_RELAY_K2_ENTITY)):
+                errors[CONF_BACKEND] = "relays_required"
+            elif backend == BACKEND_MODBUS:
+                if importlib.util.find_spec("pymodbus") is None:
+                    errors[CONF_BACKEND] = "pymodbus_missing"
+                if not user_input.get(CONF_MODBUS_HOST):
+                    errors[CONF_MODBUS_HOST] = "modbus_host_required"
+                try:
+                    modbus_values(user_input.get(CONF_MODBUS_VALUES) or {})
+                except ValueError:
+                    errors[CONF_MODBUS_VALUES] = "invalid_modbus_values"
+            providers = user_input.get(CONF_PRICE_PROVIDERS) or []
+            try:
+                for provider in providers if isinstance(providers, list) else [providers]:
+                    price_provider(self.hass, provider, None, "")
+            except ValueError:
+                errors[CONF_PRICE_PROVIDERS] = "invalid_price_providers"
+            if user_input.get(CONF_COP_CURVE):
+                try:
+                    CopCurve.from_dict(user_input[CONF_COP_CURVE])
+                except ValueError:
+                    errors[CONF_COP_CURVE] = "invalid_cop_curve"
+            try:
+                PriceModel.from_dict(user_input.get(CONF_PRICE_MODEL))
+            except ValueError:
+                errors[CONF_PRICE_MODEL] = "invalid_price_model"
+            if user_input.get(CONF_SHADOW):
+                try:
+                    validate_overrides(user_input[CONF_SHADOW])
+                except ValueError:
+                    errors[CONF_SHADOW] = "invalid_shadow"
+            if not errors:
+                return self.async_create_entry(title="", data=user_input)
 
         e = self._entry
         schema = vol.Schema({
@@ -103,10 +171,57 @@ class SGReadyOptionsFlow(config_entries.OptionsFlow):
             vol.Required(CONF_MIN_TEMP, default=_conf(e, CONF_MIN_TEMP, DEFAULT_MIN_TEMP)): selector.selector({
                 "number": {"min": 10, "max": 30, "step": 0.5, "mode": "slider", "unit_of_measurement": "°C"},
             }),
+            vol.Required(CONF_LONGTERM_DAYS, default=str(_conf(e, CONF_LONGTERM_DAYS, DEFAULT_LONGTERM_DAYS))): selector.selector({
+                "select": {
+                    "options": [
+                        {"value": "0", "label": "Av"},
+                        {"value": "7", "label": "7 dygn"},
+                        {"value": "30", "label": "30 dygn"},
+                    ],
+                    "mode": "dropdown",
+                }
+            }),
+
+            # ── Prisleverantörer (i prioritetsordning) ────────────────────
+            vol.Optional(CONF_PRICE_PROVIDERS, default=_conf(e, CONF_PRICE_PROVIDERS, [])): selector.selector({"object": {}}),
+
+            # ── Prismodell (avgifter, skatt, moms, export) ────────────────
+            vol.Optional(CONF_PRICE_MODEL, default=_conf(e, CONF_PRICE_MODEL, {})): selector.selector({"object": {}}),
+
+            # ── Värmekostnad (utetemperaturprognos och COP-kurva) ─────────
+            vol.Optional(CONF_OUTDOOR_FORECAST_ENTITY, default=_conf(e, CONF_OUTDOOR_FORECAST_ENTITY, "")): selector.selector({
+                "entity": {"domain": ["weather", "sensor"]},
+            }),
+            vol.Optional(CONF_COP_CURVE, default=_conf(e, CONF_COP_CURVE, {})): selector.selector({"object": {}}),
 
             # ── MQTT ──────────────────────────────────────────────────────
             vol.Required(CONF_MQTT_TOPIC, default=_conf(e, CONF_MQTT_TOPIC, DEFAULT_MQTT_TOPIC)): str,
             vol.Optional(CONF_MQTT_AI_TOPIC, default=_conf(e, CONF_MQTT_AI_TOPIC, DEFAULT_MQTT_AI_TOPIC)): str,
+            vol.Optional(CONF_MQTT_AI_RESULT_TOPIC, default=_conf(e, CONF_MQTT_AI_RESULT_TOPIC, DEFAULT_MQTT_AI_RESULT_TOPIC)): str,
+            vol.Optional(CONF_MQTT_STATE_TOPIC, default=_conf(e, CONF_MQTT_STATE_TOPIC, "")): str,
+            vol.Optional(CONF_MQTT_EDGE_TOPIC, default=_conf(e, CONF_MQTT_EDGE_TOPIC, "")): str,
+
+            # ── Utgång (MQTT, två reläer eller Modbus TCP) ────────────────
+            vol.Required(CONF_BACKEND, default=_conf(e, CONF_BACKEND, BACKEND_MQTT)): selector.selector({
+                "select": {"options": BACKENDS, "mode": "dropdown"},
+            }),
+            vol.Optional(CONF_RELAY_K1_ENTITY, default=_conf(e, CONF_RELAY_K1_ENTITY, "")): selector.selector({
+                "entity": {"domain": ["switch", "input_boolean"]},
+            }),
+            vol.Optional(CONF_RELAY_K2_ENTITY, default=_conf(e, CONF_RELAY_K2_ENTITY, "")): selector.selector({
+                "entity": {"domain": ["switch", "input_boolean"]},
+            }),
+            vol.Optional(CONF_MODBUS_HOST, default=_conf(e, CONF_MODBUS_HOST, "")): str,
+            vol.Optional(CONF_MODBUS_PORT, default=_conf(e, CONF_MODBUS_PORT, DEFAULT_MODBUS_PORT)): selector.selector({
+                "number": {"min": 1, "max": 65535, "step": 1, "mode": "box"},
+            }),
+            vol.Optional(CONF_MODBUS_UNIT, default=_conf(e, CONF_MODBUS_UNIT, DEFAULT_MODBUS_UNIT)): selector.selector({
+                "number": {"min": 0, "max": 247, "step": 1, "mode": "box"},
+            }),
+            vol.Optional(CONF_MODBUS_REGISTER, default=_conf(e, CONF_MODBUS_REGISTER, 0)): selector.selector({
+                "number": {"min": 0, "max": 65535, "step": 1, "mode": "box"},
+            }),
+            vol.Optional(CONF_MODBUS_VALUES, default=_conf(e, CONF_MODBUS_VALUES, DEFAULT_MODBUS_VALUES)): selector.selector({"object": {}}),
 
             # ── Entiteter ─────────────────────────────────────────────────
             vol.Optional(CONF_TEMP_ENTITY, default=_conf(e, CONF_TEMP_ENTITY, "")): selector.selector({
@@ -121,6 +236,39 @@ class SGReadyOptionsFlow(config_entries.OptionsFlow):
             vol.Optional(CONF_GRID_POWER_ENTITY, default=_conf(e, CONF_GRID_POWER_ENTITY, "")): selector.selector({
                 "entity": {"domain": "sensor", "device_class": "power"},
             }),
+            vol.Optional(CONF_GRID_POWER_SOURCES, default=_conf(e, CONF_GRID_POWER_SOURCES, [])): selector.selector({"object": {}}),
+
+            # ── Solprognos (förarmar production override) ─────────────────
+            vol.Optional(CONF_FORECAST_ENTITIES, default=_conf(e, CONF_FORECAST_ENTITIES, [])): selector.selector({
+                "entity": {"domain": "sensor", "multiple": True},
+            }),
+            vol.Optional(CONF_FORECAST_FILE, default=_conf(e, CONF_FORECAST_FILE, "")): str,
+            vol.Optional(CONF_FORECAST_BASE_LOAD, default=_conf(e, CONF_FORECAST_BASE_LOAD, DEFAULT_FORECAST_BASE_LOAD)): selector.selector({
+                "number": {"min": 0, "max": 10000, "step": 50, "mode": "box", "unit_of_measurement": "W"},
+            }),
+
+            # ── Effekttariff (använder samma elmätare) ────────────────────
+            vol.Optional(CONF_PEAK_ENABLED, default=_conf(e, CONF_PEAK_ENABLED, False)): bool,
+            vol.Optional(CONF_PEAK_TOP_K, default=_conf(e, CONF_PEAK_TOP_K, DEFAULT_PEAK_TOP_K)): selector.selector({
+                "number": {"min": 1, "max": 5, "step": 1, "mode": "box"},
+            }),
+            vol.Optional(CONF_PEAK_BOOST_LOAD, default=_conf(e, CONF_PEAK_BOOST_LOAD, DEFAULT_PEAK_BOOST_LOAD)): selector.selector({
+                "number": {"min": 0, "max": 10000, "step": 100, "mode": "box", "unit_of_measurement": "W"},
+            }),
+
+            # ── Lastplanering (varmvatten, pool, elbil …) ─────────────────
+            vol.Optional(CONF_LOADS, default=_conf(e, CONF_LOADS, [])): selector.selector({"object": {}}),
+
+            # ── Skuggläge (kandidatparametrar, styr inte) ─────────────────
+            vol.Optional(CONF_SHADOW, default=_conf(e, CONF_SHADOW, {})): selector.selector({"object": {}}),
+
+            # ── Beslutspipeline (avstängda steg) ──────────────────────────
+            vol.Optional(CONF_DISABLED_STAGES, default=_conf(e, CONF_DISABLED_STAGES, [])): selector.selector({
+                "select": {"options": OPTIONAL_STAGES, "multiple": True, "mode": "list"},
+            }),
+
+            # ── Beslutsjournal (för omspelning av incidenter) ─────────────
+            vol.Optional(CONF_JOURNAL_ENABLED, default=_conf(e, CONF_JOURNAL_ENABLED, False)): bool,
         })
 
-        return self.async_show_form(step_id="init", data_schema=schema)
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
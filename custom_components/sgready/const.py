@@ -8,12 +8,83 @@ DEFAULT_BLOCK_PCT = 30
 DEFAULT_MIN_TEMP = 20.0
 DEFAULT_MQTT_TOPIC = "homeassistant/sgready/control"
 DEFAULT_MQTT_AI_TOPIC = "homeassistant/sgready/ai_command"
+DEFAULT_MQTT_AI_RESULT_TOPIC = "homeassistant/sgready/ai_result"
 DEFAULT_PERSPECTIVE_HOURS = 24
+DEFAULT_LONGTERM_DAYS = 0
+
+# Lagring
+STORAGE_VERSION = 1
+
+# AI-plan (tidsstyrd override-kö)
+PLAN_MAX_WINDOWS = 500
+
+# AI-kommandon — validering, hastighetsbegränsning och sammanslagning
+AI_MAX_PAYLOAD_BYTES = 64 * 1024
+AI_REASON_MAX_LEN = 200
+AI_RATE_PER_MINUTE = 6        # per instans (AI-topic) — "source" i payloaden är bara en etikett
+AI_RATE_BURST = 3
+AI_COALESCE_SECONDS = 2.0     # kommandon inom fönstret slås ihop — senaste plan och senaste läge vinner
+AI_ACK_MAX_RESULTS = 50       # max resultat per kvittensmeddelande
+
+# Kvittens från värmepumpen (state-topic)
+ACK_TIMEOUT_SECONDS = 10      # första väntetiden, dubblas per omförsök
+ACK_MAX_RETRIES = 3
+
+# Långsiktig priskontext (kvantilskiss per dygn)
+SKETCH_COMPRESSION = 50
+SKETCH_MAX_DAYS = 30
+LONGTERM_MIN_DAYS = 3          # kräver minst så många dygn innan andra åsikten används
+LONGTERM_BLOCK_MIN_PCT = 50    # block kräver att priset är över medianen långsiktigt
+LONGTERM_BOOST_MAX_PCT = 90    # boost vetas om priset hör till de dyraste 10 % långsiktigt
+
+# Effekttariff — månadens timtoppar
+PEAK_MAX_GAP_SECONDS = 900     # HA skickar bara ändringar; längre tystnad räknas som okänd tid
+DEFAULT_PEAK_TOP_K = 3
+DEFAULT_PEAK_BOOST_LOAD = 1500  # W — extra last som boost antas ge
+
+# Effektfusion — flera mätare/faser till en nettoeffekt
+DEFAULT_POWER_MAX_AGE = 300    # s — äldre mätardata räknas som inaktuell
+POWER_QUALITY_GOOD = "good"
+POWER_QUALITY_STALE = "stale"
+POWER_QUALITY_MISSING = "missing"
+
+# Solprognos — förarmning av production override
+DEFAULT_FORECAST_BASE_LOAD = 500   # W — egen förbrukning som antas äta av prognosen
+FORECAST_ATTRIBUTES = ("watts", "detailedHourly", "detailedForecast", "forecast")   # provas i ordning
+
+# Värmekostnad — COP-kurva och utetemperaturprognos
+DEFAULT_COP_CURVE = {"-20": 1.9, "-10": 2.4, "0": 3.0, "7": 3.7, "15": 4.5}   # luft/vatten, ~35 °C framledning
+HEAT_FORECAST_REFRESH_SECONDS = 1800   # väderprognosen hämtas högst så ofta
+
+# Energi- och kostnadsbokföring
+ENERGY_MAX_GAP_SECONDS = 900   # ett mätvärde hålls högst så länge; resten av luckan bokförs inte
+POWER_SAMPLE_SECONDS = 60      # periodiskt sampel — ett oförändrat mätvärde ger ingen händelse
+ENERGY_NOTIFY_SECONDS = 60     # sensorer och lagring uppdateras högst så ofta
+ENERGY_CURRENCY = "SEK"
+
+# Övervakning — OpenMetrics
+METRICS_URL = "/api/sgready/metrics"
+METRICS_REFRESH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)  # s
+METRICS_STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)  # s per pipelinesteg
+
+# Beslutsjournal — fasta binärposter för omspelning
+JOURNAL_RECORD_SIZE = 128
+JOURNAL_PRICES_PER_RECORD = 12
+JOURNAL_MAX_BYTES = 4 * 1024 * 1024   # ~30 000 beslut per fil
+JOURNAL_KEEP_FILES = 3
+JOURNAL_FLUSH_SECONDS = 60
+JOURNAL_FLUSH_BYTES = 64 * 1024
+
+# Skuggläge — kandidatkonfiguration som utvärderas utan att styra
+SHADOW_MAX_DAYS = 30
+SHADOW_MAX_DIVERGENCES = 20
+SHADOW_MAX_GAP_SECONDS = 900   # längre tid mellan beslut bokförs inte
+SHADOW_MODE_LOAD = {"boost": 1.3, "normal": 1.0, "block": 0.0}  # relativ last per läge
 
 # Algoritm-konstanter
 MIN_SPREAD_TO_ACT = 0.10
 PRICE_ROUND_TO = 0.10
-EXTREME_LOW = 0.10
+EXTREME_LOW = 0.10      # spotpris, kr/kWh — jämförs aldrig mot importpriset efter prismodell
 EXTREME_HIGH = 5.0
 
 # Lägen
@@ -31,6 +102,26 @@ AI_MODES = [AI_MODE_AUTO, AI_MODE_FORCE_BOOST, AI_MODE_FORCE_NORMAL, AI_MODE_FOR
 # Config-nycklar
 CONF_MQTT_TOPIC = "mqtt_topic"
 CONF_MQTT_AI_TOPIC = "mqtt_ai_topic"
+CONF_MQTT_AI_RESULT_TOPIC = "mqtt_ai_result_topic"
+CONF_MQTT_STATE_TOPIC = "mqtt_state_topic"
+CONF_MQTT_EDGE_TOPIC = "mqtt_edge_topic"      # retained trösklar till Shelly-scriptet
+
+# Utgång för läget — MQTT (standard), två reläentiteter eller Modbus TCP
+CONF_BACKEND = "actuation_backend"
+BACKEND_MQTT = "mqtt"
+BACKEND_SWITCH = "switch"
+BACKEND_MODBUS = "modbus"
+BACKENDS = [BACKEND_MQTT, BACKEND_SWITCH, BACKEND_MODBUS]
+CONF_RELAY_K1_ENTITY = "relay_k1_entity"
+CONF_RELAY_K2_ENTITY = "relay_k2_entity"
+CONF_MODBUS_HOST = "modbus_host"
+CONF_MODBUS_PORT = "modbus_port"
+CONF_MODBUS_UNIT = "modbus_unit"
+CONF_MODBUS_REGISTER = "modbus_register"
+CONF_MODBUS_VALUES = "modbus_values"           # {"boost": 3, "normal": 2, "block": 1}
+DEFAULT_MODBUS_PORT = 502
+DEFAULT_MODBUS_UNIT = 1
+DEFAULT_MODBUS_VALUES = {"boost": 3, "normal": 2, "block": 1}   # registervärde per läge
 CONF_NORDPOOL_CONFIG_ENTRY = "nordpool_config_entry"
 CONF_NORDPOOL_AREA = "nordpool_area"
 CONF_TEMP_ENTITY = "temp_entity"
@@ -38,9 +129,11 @@ CONF_TARIFF_ENTITY = "tariff_entity"
 CONF_BOOST_PCT = "boost_pct"
 CONF_BLOCK_PCT = "block_pct"
 CONF_MIN_TEMP = "min_temp"
+CONF_LONGTERM_DAYS = "longterm_days"   # 0 = av, 7 eller 30
 
 # Production override config-nycklar
 CONF_GRID_POWER_ENTITY = "grid_power_entity"
+CONF_GRID_POWER_SOURCES = "grid_power_sources"   # lista med {"entity", "sign", "scale", "max_age"} — ersätter elmätaren
 CONF_TARIFF_ENTITY = "tariff_entity"
 CONF_PROD_ENABLED = "prod_override_enabled"
 CONF_PROD_NORMAL_THRESHOLD = "prod_normal_threshold"   # W, negativt = export
@@ -50,6 +143,42 @@ CONF_PROD_HYSTERESIS = "prod_hysteresis"               # W
 CONF_PROD_MIN_DURATION = "prod_min_duration"           # sekunder
 CONF_PROD_OFF_DELAY = "prod_off_delay"                 # sekunder
 
+# Prisleverantörer i prioritetsordning — lista med {"type": "nordpool" | "sensor" | "file", …}
+CONF_PRICE_PROVIDERS = "price_providers"
+PRICE_PROVIDER_NORDPOOL = "nordpool"
+PRICE_PROVIDER_SENSOR = "sensor"     # {"entity": "sensor.nordpool_kwh_se4_sek", "scale": 1}
+PRICE_PROVIDER_FILE = "file"         # {"path": "sgready_prices.json"}, relativt config-katalogen
+PRICE_PROVIDERS = [PRICE_PROVIDER_NORDPOOL, PRICE_PROVIDER_SENSOR, PRICE_PROVIDER_FILE]
+
+# Prismodell — objekt med avgifter per kWh ovanpå spotpriset (se pricing.PriceModel)
+CONF_PRICE_MODEL = "price_model"
+
+# Värmekostnad config-nycklar
+CONF_OUTDOOR_FORECAST_ENTITY = "outdoor_forecast_entity"   # weather.* eller entitet med forecast-attribut
+CONF_COP_CURVE = "cop_curve"                               # {"-15": 2.0, "7": 3.9} — °C → COP
+
+# Solprognos config-nycklar
+CONF_FORECAST_ENTITIES = "solar_forecast_entities"     # entiteter med prognos i attribut
+CONF_FORECAST_FILE = "solar_forecast_file"             # lokal JSON, relativt config-katalogen
+CONF_FORECAST_BASE_LOAD = "solar_forecast_base_load"   # W
+
+# Effekttariff config-nycklar
+CONF_PEAK_ENABLED = "peak_guard_enabled"
+CONF_PEAK_TOP_K = "peak_top_k"
+CONF_PEAK_BOOST_LOAD = "peak_boost_load"               # W
+
+# Lastplanering — lista med {"name", "hours", "before", "after", "count"}
+CONF_LOADS = "loads"
+
+# Skuggläge — objekt med parametrar som avviker från aktiv konfiguration
+CONF_SHADOW = "shadow_config"
+
+# Beslutspipeline — valfria steg som stängs av (production, temperature, tariff, peak)
+CONF_DISABLED_STAGES = "disabled_stages"
+
+# Beslutsjournal (.storage/sgready.<entry>.journal.bin)
+CONF_JOURNAL_ENABLED = "journal_enabled"
+
 # Standardvärden production override
 DEFAULT_PROD_NORMAL_THRESHOLD = -100
 DEFAULT_PROD_BOOST_THRESHOLD = -500
@@ -58,10 +187,26 @@ DEFAULT_PROD_HYSTERESIS = 50
 DEFAULT_PROD_MIN_DURATION = 300
 DEFAULT_PROD_OFF_DELAY = 600
 
+# Edge-reserv (Shelly) — HA räknas som borta efter så lång tystnad på hjärtslags-topicet
+# (<edge-topic>/heartbeat, inte retained). Koordinatorn publicerar minst var 5:e minut, så 900 s ger marginal.
+EDGE_HA_TIMEOUT_SECONDS = 900
+EDGE_HEARTBEAT_SUBTOPIC = "heartbeat"
+
+# Tjänster
+SERVICE_SET_OVERRIDE = "set_override"
+SERVICE_LOAD_PLAN = "load_plan"
+SERVICE_RECOMPUTE = "recompute"
+ATTR_ENTRY_ID = "entry_id"
+
 # Entitets-ID:n
 SENSOR_MODE = "mode"
 SENSOR_PRICE = "current_price"
 SENSOR_RANK = "price_percentile"
+SENSOR_ACTUATION_LATENCY = "actuation_latency"
+SENSOR_LOAD_NEXT_START = "load_next_start"           # + "_<last>"
+BINARY_SENSOR_LOAD = "load"                          # + "_<last>"
+SENSOR_SHADOW = "shadow_mode"
+SENSOR_ENERGY = "energy"                             # + "_<import|export|import_cost|export_revenue|boost|normal|block>"
 NUMBER_BOOST_PCT = "boost_percent"
 NUMBER_BLOCK_PCT = "block_percent"
 NUMBER_MIN_TEMP = "min_temp"
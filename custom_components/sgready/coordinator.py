@@ -1,28 +1,51 @@
 """SG Ready koordinator — portad från Node-RED + AI-override handles."""
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-import math
+import os
+import time
+from collections.abc import Callable
 from datetime import datetime, timedelta
 
-from homeassistant.components import mqtt
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import (
+    async_call_later, async_track_point_in_time, async_track_state_change_event,
+    async_track_time_interval,
+)
+from homeassistant.helpers.storage import STORAGE_DIR, Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.util.dt import now as ha_now, parse_datetime
+from homeassistant.util import dt as dt_util
 
 from .const import (
-    DOMAIN,
-    MODE_BOOST, MODE_NORMAL, MODE_BLOCK,
-    AI_MODE_AUTO, AI_MODE_FORCE_BOOST, AI_MODE_FORCE_NORMAL, AI_MODE_FORCE_BLOCK,
-    CONF_MQTT_TOPIC, CONF_MQTT_AI_TOPIC,
-    CONF_NORDPOOL_CONFIG_ENTRY, CONF_NORDPOOL_AREA,
+    DOMAIN, STORAGE_VERSION,
+    MODE_BOOST,
+    AI_MODE_AUTO,
+    CONF_MQTT_TOPIC, CONF_MQTT_AI_TOPIC, CONF_MQTT_AI_RESULT_TOPIC, CONF_MQTT_STATE_TOPIC,
+    CONF_MQTT_EDGE_TOPIC, EDGE_HA_TIMEOUT_SECONDS, EDGE_HEARTBEAT_SUBTOPIC,
+    CONF_BACKEND, BACKEND_MQTT, BACKEND_SWITCH, BACKEND_MODBUS,
+    CONF_RELAY_K1_ENTITY, CONF_RELAY_K2_ENTITY,
+    CONF_MODBUS_HOST, CONF_MODBUS_PORT, CONF_MODBUS_UNIT, CONF_MODBUS_REGISTER, CONF_MODBUS_VALUES,
+    DEFAULT_MODBUS_PORT, DEFAULT_MODBUS_UNIT, DEFAULT_MODBUS_VALUES,
+    CONF_NORDPOOL_CONFIG_ENTRY, CONF_NORDPOOL_AREA, CONF_PRICE_PROVIDERS, PRICE_PROVIDER_NORDPOOL,
     CONF_TEMP_ENTITY, CONF_TARIFF_ENTITY,
-    CONF_BOOST_PCT, CONF_BLOCK_PCT, CONF_MIN_TEMP,
-    DEFAULT_BOOST_PCT, DEFAULT_BLOCK_PCT, DEFAULT_MIN_TEMP,
-    DEFAULT_MQTT_TOPIC, DEFAULT_MQTT_AI_TOPIC,
-    MIN_SPREAD_TO_ACT, PRICE_ROUND_TO, EXTREME_LOW, EXTREME_HIGH,
-    CONF_GRID_POWER_ENTITY,
+    CONF_BOOST_PCT, CONF_BLOCK_PCT, CONF_MIN_TEMP, CONF_LONGTERM_DAYS,
+    DEFAULT_BOOST_PCT, DEFAULT_BLOCK_PCT, DEFAULT_MIN_TEMP, DEFAULT_LONGTERM_DAYS,
+    LONGTERM_MIN_DAYS,
+    DEFAULT_MQTT_TOPIC, DEFAULT_MQTT_AI_TOPIC, DEFAULT_MQTT_AI_RESULT_TOPIC,
+    AI_RATE_PER_MINUTE, AI_RATE_BURST, AI_COALESCE_SECONDS, AI_ACK_MAX_RESULTS,
+    ACK_TIMEOUT_SECONDS, ACK_MAX_RETRIES,
+    CONF_GRID_POWER_ENTITY, CONF_GRID_POWER_SOURCES,
+    CONF_PEAK_ENABLED, CONF_PEAK_TOP_K, CONF_PEAK_BOOST_LOAD, CONF_LOADS, CONF_SHADOW,
+    CONF_FORECAST_ENTITIES, CONF_FORECAST_FILE, CONF_FORECAST_BASE_LOAD,
+    DEFAULT_FORECAST_BASE_LOAD, FORECAST_ATTRIBUTES,
+    CONF_PRICE_MODEL,
+    CONF_OUTDOOR_FORECAST_ENTITY, CONF_COP_CURVE, DEFAULT_COP_CURVE, HEAT_FORECAST_REFRESH_SECONDS,
+    CONF_DISABLED_STAGES,
+    CONF_JOURNAL_ENABLED, JOURNAL_MAX_BYTES, JOURNAL_KEEP_FILES, JOURNAL_FLUSH_SECONDS, JOURNAL_FLUSH_BYTES,
+    DEFAULT_PEAK_TOP_K, DEFAULT_PEAK_BOOST_LOAD, POWER_QUALITY_STALE, POWER_SAMPLE_SECONDS,
     CONF_PROD_ENABLED,
     CONF_PROD_NORMAL_THRESHOLD, CONF_PROD_BOOST_THRESHOLD,
     CONF_PROD_RETURN_THRESHOLD, CONF_PROD_HYSTERESIS,
@@ -31,6 +54,27 @@ from .const import (
     DEFAULT_PROD_RETURN_THRESHOLD, DEFAULT_PROD_HYSTERESIS,
     DEFAULT_PROD_MIN_DURATION, DEFAULT_PROD_OFF_DELAY,
 )
+from .actuation import ActuationTracker, parse_device_state
+from .backends import Backend, ModbusBackend, MqttBackend, SwitchBackend, modbus_values, mqtt_module
+from .ai_commands import CommandRejected, TokenBucket, command_id, decode_command, validate_command
+from .clock import Clock, SystemClock, VirtualClock
+from .decision import ALL_FIELDS, Decision
+from .energy import EnergyLedger
+from .engine import price_context
+from .forecast import SurplusPlan, merge_forecasts, parse_forecast
+from .fusion import FusedPower, PowerFusion, PowerSource
+from .heatcost import CopCurve, HeatCostPlan, parse_temperature_forecast
+from .journal import STAGE_FULL, STAGE_POST, DecisionRecord, JournalWriter
+from .metrics import CoordinatorMetrics
+from .override_queue import OverrideQueue, OverrideWindow
+from .peaks import PeakTracker
+from .pipeline import BASE_STAGES, POST_FIELDS, POST_STAGES, Pipeline, StageInput, Verdict
+from .pricing import PriceModel, PriceVectors, price_vectors
+from .providers import PriceChain, PriceSlots, price_provider
+from .production import new_production_state, production_countdown, production_prearm, production_step
+from .scheduler import LoadSchedule, LoadSpec
+from .shadow import ShadowLedger, ShadowParams, validate_overrides
+from .sketch import PriceHistory
 
 _LOGGER = logging.getLogger(__name__)
 UPDATE_INTERVAL = timedelta(minutes=5)
@@ -41,63 +85,228 @@ def _conf(entry, key, default=None):
     return entry.options.get(key, entry.data.get(key, default))
 
 
-def _round_price(p: float) -> float:
-    return round(p * 100 / (PRICE_ROUND_TO * 100)) * PRICE_ROUND_TO
+def _load_specs(entry) -> list[LoadSpec]:
+    """Konfigurerade laster — ogiltiga poster loggas och hoppas över."""
+    raw = _conf(entry, CONF_LOADS) or []
+    if isinstance(raw, dict):
+        raw = [raw]
+    specs = []
+    for item in raw:
+        try:
+            specs.append(LoadSpec.from_dict(item))
+        except ValueError as err:
+            _LOGGER.warning("Ogiltig last i konfigurationen: %s", err)
+    return specs
+
+
+def _power_sources(entry) -> list[PowerSource]:
+    """Effektkällor — konfigurerad lista, annars den enskilda elmätaren."""
+    raw = _conf(entry, CONF_GRID_POWER_SOURCES) or []
+    if isinstance(raw, (dict, str)):
+        raw = [raw]
+    sources = []
+    for item in raw:
+        try:
+            sources.append(PowerSource.from_dict(item))
+        except ValueError as err:
+            _LOGGER.warning("Ogiltig effektkälla i konfigurationen: %s", err)
+    if not sources and _conf(entry, CONF_GRID_POWER_ENTITY):
+        sources.append(PowerSource(_conf(entry, CONF_GRID_POWER_ENTITY)))
+    return sources
+
+
+def _price_model(entry) -> PriceModel:
+    """Avgifter ovanpå spotpriset — ogiltig konfiguration loggas och ger rent spotpris."""
+    try:
+        return PriceModel.from_dict(_conf(entry, CONF_PRICE_MODEL))
+    except ValueError as err:
+        _LOGGER.warning("Ogiltig prismodell — använder spotpris: %s", err)
+        return PriceModel()
+
+
+def _cop_curve(entry) -> CopCurve:
+    """COP-kurvan — ogiltig konfiguration loggas och ger standardkurvan."""
+    try:
+        return CopCurve.from_dict(_conf(entry, CONF_COP_CURVE) or DEFAULT_COP_CURVE)
+    except ValueError as err:
+        _LOGGER.warning("Ogiltig COP-kurva — använder standardkurvan: %s", err)
+        return CopCurve.from_dict(DEFAULT_COP_CURVE)
+
+
+def _price_chain(hass: HomeAssistant, entry) -> PriceChain:
+    """Prisleverantörer i prioritetsordning — utan konfiguration bara Nord Pool-integrationen."""
+    nordpool_entry_id = _conf(entry, CONF_NORDPOOL_CONFIG_ENTRY)
+    area = _conf(entry, CONF_NORDPOOL_AREA, "SE4")
+    raw = _conf(entry, CONF_PRICE_PROVIDERS) or []
+    if isinstance(raw, (dict, str)):
+        raw = [raw]
+    providers = []
+    for item in raw:
+        try:
+            providers.append(price_provider(hass, item, nordpool_entry_id, area))
+        except ValueError as err:
+            _LOGGER.warning("Ogiltig prisleverantör i konfigurationen: %s", err)
+    if not providers:
+        providers.append(price_provider(hass, PRICE_PROVIDER_NORDPOOL, nordpool_entry_id, area))
+    return PriceChain(providers)
 
 
-def _calculate_stats(prices: list[float]) -> dict | None:
-    valid = [p for p in prices if p is not None and not math.isnan(p)]
-    if not valid:
-        return None
-    n = len(valid)
-    avg = sum(valid) / n
-    sorted_p = sorted(valid)
-    variance = sum((x - avg) ** 2 for x in valid) / n
-    return {
-        "avg": avg,
-        "min": min(valid),
-        "max": max(valid),
-        "std": math.sqrt(variance),
-        "median": sorted_p[n // 2],
-        "count": n,
-        "sorted": sorted_p,
-    }
+def _hour(prices: list[float], hour: int) -> float | None:
+    return prices[hour] if hour < len(prices) else None
+
+
+def _create_backend(hass: HomeAssistant, entry) -> Backend:
+    """Utgång för läget enligt konfigurationen — MQTT om inget annat valts."""
+    kind = _conf(entry, CONF_BACKEND, BACKEND_MQTT)
+    if kind == BACKEND_SWITCH:
+        return SwitchBackend(hass, _conf(entry, CONF_RELAY_K1_ENTITY), _conf(entry, CONF_RELAY_K2_ENTITY))
+    if kind == BACKEND_MODBUS:
+        try:
+            values = modbus_values(_conf(entry, CONF_MODBUS_VALUES) or {})
+        except ValueError as err:
+            _LOGGER.warning("Ogiltiga Modbus-registervärden — använder standard: %s", err)
+            values = dict(DEFAULT_MODBUS_VALUES)
+        return ModbusBackend(
+            _conf(entry, CONF_MODBUS_HOST),
+            int(_conf(entry, CONF_MODBUS_PORT, DEFAULT_MODBUS_PORT)),
+            int(_conf(entry, CONF_MODBUS_UNIT, DEFAULT_MODBUS_UNIT)),
+            int(_conf(entry, CONF_MODBUS_REGISTER, 0)),
+            values,
+        )
+    return MqttBackend(hass, _conf(entry, CONF_MQTT_TOPIC, DEFAULT_MQTT_TOPIC))
 
 
 class SGReadyCoordinator(DataUpdateCoordinator):
     """Hanterar prisdata och beräknar SG Ready-läge."""
 
-    def __init__(self, hass: HomeAssistant, entry) -> None:
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=UPDATE_INTERVAL)
+    def __init__(self, hass: HomeAssistant, entry, clock: Clock | None = None) -> None:
+        super().__init__(
+            hass, _LOGGER, name=DOMAIN, update_interval=UPDATE_INTERVAL, always_update=False,
+        )
         self.entry = entry
+        # All tid läses härifrån — monoton för varaktigheter, lokal för timslots (VirtualClock i simuleringar)
+        self.clock = clock or SystemClock(lambda: dt_util.DEFAULT_TIME_ZONE)
         self._manual_override = False  # Manuell boost-switch
+        self.metrics = CoordinatorMetrics()
+        self.backend = _create_backend(hass, entry)
+        self._sent_mode: str | None = None   # senast skickat läge (publish-on-change)
 
         # AI override state
         self._ai_mode: str = AI_MODE_AUTO
         self._ai_until: datetime | None = None
         self._ai_reason: str = ""
         self._mqtt_unsub = None
-        self._nordpool_unsub = None   # Prenumeration på Nord Pool-uppdateringar
+        self._price_unsubs: list = []   # Prenumerationer på prisleverantörerna
         self._had_prices: bool = False  # Har vi fått priser någon gång?
+        self._base_result: Decision | None = None  # Senaste beslut före POST-2/POST-3
+
+        # Beslutspipeline — P0 … POST-1 per full beräkning, POST-2 … vid varje entitetsändring
+        disabled = frozenset(_conf(entry, CONF_DISABLED_STAGES) or ())
+        self._base_pipeline = Pipeline.from_classes(BASE_STAGES, disabled)
+        self._post_pipeline = Pipeline.from_classes(POST_STAGES, disabled)
+        self.changed_fields: frozenset[str] = ALL_FIELDS  # Fält som ändrades vid senaste uppdatering
+        self._entity_unsub = None     # Prenumeration på temperatur/tariff
+
+        # AI-kommandon — hastighetsbegränsning per instans (topic) + sammanslagning
+        self._ai_limiter = TokenBucket(AI_RATE_PER_MINUTE / 60, AI_RATE_BURST, self.clock.monotonic)
+        self._ai_pending: dict[str, dict] = {}    # "plan"/"mode" → senaste accepterade, ej applicerade
+        self._ai_results: list[dict] = []         # kvittenser som väntar på nästa flush
+        self._ai_results_dropped = 0
+        self._ai_flush_unsub = None
+
+        # AI-plan — tidsstyrda override-fönster, persisterade över omstart
+        self._plan = OverrideQueue()
+        self._plan_window: OverrideWindow | None = None
+        self._plan_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.plan")
+        self._plan_timer_unsub = None
+
+        # Prishistorik — en kvantilskiss per dygn för 7/30-dygnskontext
+        self._price_history = PriceHistory()
+        self._history_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.price_history")
+
+        # Effekttariff — månadens högsta timmedel av nätimport
+        self.peak_enabled: bool = _conf(entry, CONF_PEAK_ENABLED, False)
+        self.peak_top_k: int = int(_conf(entry, CONF_PEAK_TOP_K, DEFAULT_PEAK_TOP_K))
+        self.peak_boost_load: float = _conf(entry, CONF_PEAK_BOOST_LOAD, DEFAULT_PEAK_BOOST_LOAD)
+        self._peaks = PeakTracker(self.peak_top_k, dt_util.DEFAULT_TIME_ZONE)
+        self._peak_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.peaks")
+        self._power_unsub = None
+
+        # Lastplanering — billigaste fönster för sekundära laster
+        self.loads = LoadSchedule(_load_specs(entry), dt_util.DEFAULT_TIME_ZONE)
+        self._load_prices_key: tuple | None = None
+        self._load_timer_unsub = None
+
+        # Skuggläge — kandidatparametrar utvärderas på samma indata, styr aldrig
+        self._shadow_overrides: dict | None = None
+        if _conf(entry, CONF_SHADOW):
+            try:
+                self._shadow_overrides = validate_overrides(_conf(entry, CONF_SHADOW))
+            except ValueError as err:
+                _LOGGER.warning("Ogiltig skuggkonfiguration — skuggläge av: %s", err)
+        self.shadow_ledger = ShadowLedger()
+        self._shadow_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.shadow")
+        self._shadow_base: Decision | None = None
+        self._shadow_prod_state: dict | None = None
+
+        # Beslutsjournal — varje besluts indata och utfall, för omspelning
+        self._journal: JournalWriter | None = None
+        if _conf(entry, CONF_JOURNAL_ENABLED, False):
+            self._journal = JournalWriter(
+                hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry.entry_id}.journal.bin"),
+                JOURNAL_MAX_BYTES, JOURNAL_KEEP_FILES,
+            )
+        self._journal_lock = asyncio.Lock()
+        self._journal_flush_unsub = None
 
-        # Production override state machine
-        self._prod_state = {
-            "active": False,
-            "mode": None,
-            "start_time": None,       # Tidpunkt för att börja räkna aktiveringstid
-            "last_change": None,      # Tidpunkt för in i hysteres-zon
-            "in_hysteresis": False,
-            "tariff_limited": False,
-        }
+        # Kvittens från värmepumpen (valfritt state-topic)
+        self.actuation = ActuationTracker()
+        self._state_unsub = None
+        self._ack_timer_unsub = None
 
-        # Grid meter
-        self._grid_power: float = 0.0
-        self._grid_timestamp: datetime | None = None
+        # Production override state machine
+        self._prod_state = new_production_state()
+
+        # Solprognos — planerade överskottsfönster förarmar production override
+        entities = _conf(entry, CONF_FORECAST_ENTITIES) or []
+        self._forecast_entities: list[str] = [entities] if isinstance(entities, str) else list(entities)
+        forecast_file = _conf(entry, CONF_FORECAST_FILE)
+        self._forecast_file: str | None = hass.config.path(forecast_file) if forecast_file else None
+        self.forecast_base_load: float = _conf(entry, CONF_FORECAST_BASE_LOAD, DEFAULT_FORECAST_BASE_LOAD)
+        self.surplus = SurplusPlan()
+        self._forecast_parts: dict[str, dict[datetime, float]] = {}   # källa → {timstart: W}
+        self._forecast_file_mtime: float | None = None   # -1 = läsfel (loggat)
+        self._forecast_unsub = None
+        self._surplus_timer_unsub = None
+        self._surplus_armed: datetime | None = None       # start för senast förarmade fönster
+
+        # Elmätare — en eller flera källor fusionerade till nettoeffekt
+        self.power = PowerFusion(_power_sources(entry))
+        self._power_seen: dict[str, tuple[datetime, datetime]] = {}   # entity → (last_reported, klockans tid)
+
+        # Prismodell — effektiva import-/exportpriser, räknade en gång per prisuppdatering
+        self.price_model = _price_model(entry)
+        self.prices: PriceVectors | None = None
+        self.price_chain = _price_chain(hass, entry)
+        self.price_slots: PriceSlots | None = None   # senaste leverans (källa, färskhet)
+
+        # Värmekostnad — elpris / COP per timslot från utetemperaturprognosen
+        self._outdoor_entity: str | None = _conf(entry, CONF_OUTDOOR_FORECAST_ENTITY) or None
+        self.cop_curve = _cop_curve(entry)
+        self.heat_cost = HeatCostPlan()
+        self._outdoor_forecast: dict[datetime, float] = {}   # {timstart: °C}
+        self._outdoor_fetched: float | None = None          # clock.monotonic(), senaste hämtningsförsök
+        self._outdoor_error: str | None = None               # senast loggade fel
+
+        # Energi och kostnad — nettoeffekt × timpris, bokfört per mätvärde
+        self.energy = EnergyLedger()
+        self._energy_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.energy")
 
         # Konfiguration — pris
         self.boost_pct: float = _conf(entry, CONF_BOOST_PCT, DEFAULT_BOOST_PCT)
         self.block_pct: float = _conf(entry, CONF_BLOCK_PCT, DEFAULT_BLOCK_PCT)
         self.min_temp: float = _conf(entry, CONF_MIN_TEMP, DEFAULT_MIN_TEMP)
+        self.longterm_days: int = int(_conf(entry, CONF_LONGTERM_DAYS, DEFAULT_LONGTERM_DAYS))
 
         # Konfiguration — production override (tweakbara per solanläggning)
         self.prod_normal_threshold: float = _conf(entry, CONF_PROD_NORMAL_THRESHOLD, DEFAULT_PROD_NORMAL_THRESHOLD)
@@ -106,18 +315,57 @@ class SGReadyCoordinator(DataUpdateCoordinator):
         self.prod_hysteresis: float = _conf(entry, CONF_PROD_HYSTERESIS, DEFAULT_PROD_HYSTERESIS)
         self.prod_min_duration: float = _conf(entry, CONF_PROD_MIN_DURATION, DEFAULT_PROD_MIN_DURATION)
         self.prod_off_delay: float = _conf(entry, CONF_PROD_OFF_DELAY, DEFAULT_PROD_OFF_DELAY)
+        self._edge_payload: str | None = None   # senast publicerade edge-config
+
+    # ── Timers ──────────────────────────────────────────────────────────────
+    # Med VirtualClock går timers på klockan i stället för HA:s schemaläggare,
+    # så att kvittens-, plan- och fönstertimers följer den simulerade tiden.
+
+    @callback
+    def _call_later(self, delay: float, action) -> Callable[[], None]:
+        if isinstance(self.clock, VirtualClock):
+            return self.clock.call_later(delay, self._clock_action(action))
+        return async_call_later(self.hass, delay, action)
+
+    @callback
+    def _call_at(self, when: datetime, action) -> Callable[[], None]:
+        if isinstance(self.clock, VirtualClock):
+            return self.clock.call_at(when, self._clock_action(action))
+        return async_track_point_in_time(self.hass, action, when)
+
+    @callback
+    def _call_every(self, interval: timedelta, action) -> Callable[[], None]:
+        if isinstance(self.clock, VirtualClock):
+            return self.clock.call_every(interval.total_seconds(), self._clock_action(action))
+        return async_track_time_interval(self.hass, action, interval)
+
+    def _clock_action(self, action) -> Callable[[datetime], None]:
+        """Åtgärden som klocktimer — korutiner körs som task, som HA:s schemaläggare gör."""
+        def _run(now: datetime) -> None:
+            result = action(now)
+            if asyncio.iscoroutine(result):
+                self.hass.async_create_task(result)
+        return _run
 
     # ── AI Override properties ──────────────────────────────────────────────
 
     @property
     def ai_mode(self) -> str:
-        """Returnerar aktuellt AI-läge, auto om utgångstid passerat."""
+        """Returnerar aktuellt AI-läge, auto om utgångstid passerat.
+
+        Direktkommandot (select/enskilt MQTT-kommando) har företräde; är det
+        auto gäller vinnande fönster i AI-planen.
+        """
+        now = self.clock.now()
         if self._ai_mode != AI_MODE_AUTO and self._ai_until:
-            if ha_now() > self._ai_until:
+            if now > self._ai_until:
                 _LOGGER.info("AI-override utgången — återgår till auto")
                 self._ai_mode = AI_MODE_AUTO
                 self._ai_reason = ""
                 self._ai_until = None
+        self._plan_window = self._plan.advance(now)
+        if self._ai_mode == AI_MODE_AUTO and self._plan_window:
+            return self._plan_window.mode
         return self._ai_mode
 
     @ai_mode.setter
@@ -127,6 +375,8 @@ class SGReadyCoordinator(DataUpdateCoordinator):
 
     @property
     def ai_until(self) -> datetime | None:
+        if self._ai_mode == AI_MODE_AUTO and self._plan_window:
+            return self._plan_window.end
         return self._ai_until
 
     @ai_until.setter
@@ -135,6 +385,8 @@ class SGReadyCoordinator(DataUpdateCoordinator):
 
     @property
     def ai_reason(self) -> str:
+        if self._ai_mode == AI_MODE_AUTO and self._plan_window:
+            return self._plan_window.reason
         return self._ai_reason
 
     @ai_reason.setter
@@ -153,25 +405,41 @@ class SGReadyCoordinator(DataUpdateCoordinator):
     # ── MQTT AI-kommandolyssning ────────────────────────────────────────────
 
     async def async_start_ai_mqtt(self) -> None:
-        """Prenumerera på MQTT-topic för AI-kommandon."""
+        """Prenumerera på MQTT-topic för AI-kommandon.
+
+        Hastighetsgränsen gäller topicet (avsändaren kan inte välja nyckel) och
+        prövas före avkodningen, så en flod avvisas utan att JSON tolkas.
+        Accepterade kommandon slås ihop under AI_COALESCE_SECONDS — senaste
+        plan och senaste lägeskommando appliceras, följt av en enda refresh och
+        en samlad kvittens på resultat-topicet. `source` är bara en etikett.
+        """
         topic = _conf(self.entry, CONF_MQTT_AI_TOPIC, DEFAULT_MQTT_AI_TOPIC)
+        mqtt = mqtt_module(self.hass)
+        if not topic or mqtt is None:
+            return
 
         @callback
         def _on_ai_command(msg) -> None:
+            source, payload = "mqtt", None
             try:
-                payload = json.loads(msg.payload)
-                mode = payload.get("mode", AI_MODE_AUTO)
-                reason = payload.get("reason", "AI-kommando")
-                until_str = payload.get("until")
-                until = parse_datetime(until_str) if until_str else None
-
-                _LOGGER.info("AI-kommando mottaget: mode=%s, reason=%s, until=%s", mode, reason, until)
-                self._ai_mode = mode
-                self._ai_reason = reason
-                self._ai_until = until
-                self.hass.async_create_task(self.async_refresh())
-            except (json.JSONDecodeError, Exception) as err:
-                _LOGGER.warning("Ogiltigt AI-MQTT-kommando: %s", err)
+                if not self._ai_limiter.take():
+                    raise CommandRejected("hastighetsgräns överskriden")
+                payload = decode_command(msg.payload)
+                command = validate_command(payload)
+                source = command.get("source", source)
+            except CommandRejected as err:
+                _LOGGER.debug("AI-kommando avvisat (källa=%s): %s", source, err)
+                self._queue_ai_result(command_id(payload), source, "rejected", str(err))
+                self._schedule_ai_flush()
+                return
+
+            kind = "plan" if "plan" in command else "mode"
+            _LOGGER.info("AI-kommando mottaget (källa=%s): %s", source, command.get("mode", "plan"))
+            previous = self._ai_pending.get(kind)
+            if previous is not None:
+                self._queue_ai_result(previous.get("id"), previous.get("source", "mqtt"), "superseded")
+            self._ai_pending[kind] = command
+            self._schedule_ai_flush()
 
         try:
             self._mqtt_unsub = await mqtt.async_subscribe(self.hass, topic, _on_ai_command)
@@ -183,470 +451,1171 @@ class SGReadyCoordinator(DataUpdateCoordinator):
         if self._mqtt_unsub:
             self._mqtt_unsub()
             self._mqtt_unsub = None
+        if self._ai_flush_unsub:
+            self._ai_flush_unsub()
+            self._ai_flush_unsub = None
+
+    @callback
+    def check_ai_command(self, command: dict) -> None:
+        """Pröva ett validerat kommando mot instansen utan att ändra något. Kastar ValueError."""
+        if "plan" in command:
+            self._plan.check(len(self._plan_windows(command)), replace=command.get("replace", True))
+
+    @callback
+    def async_apply_ai_command(self, command: dict) -> None:
+        """Applicera ett validerat kommando (utan refresh). Kastar ValueError."""
+        if "plan" in command:
+            self.async_set_plan(self._plan_windows(command), replace=command.get("replace", True))
+            return
+        until = command.get("until")
+        if until is not None and until.tzinfo is None:
+            until = until.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+        self._ai_mode = command["mode"]
+        self._ai_reason = command["reason"]
+        self._ai_until = until
+
+    @staticmethod
+    def _plan_windows(command: dict) -> list[OverrideWindow]:
+        return [OverrideWindow.from_dict(item, dt_util.DEFAULT_TIME_ZONE) for item in command["plan"]]
+
+    @callback
+    def _queue_ai_result(self, command_id, source: str, status: str, error: str | None = None) -> None:
+        self.metrics.ai_commands[status] += 1
+        if len(self._ai_results) >= AI_ACK_MAX_RESULTS:
+            self._ai_results_dropped += 1
+            return
+        result = {"id": command_id, "source": source, "status": status}
+        if error:
+            result["error"] = error
+        self._ai_results.append(result)
+
+    @callback
+    def _schedule_ai_flush(self) -> None:
+        """Starta sammanslagningsfönstret — senare meddelanden flyttar inte fram det."""
+        if self._ai_flush_unsub is None:
+            self._ai_flush_unsub = self._call_later(AI_COALESCE_SECONDS, self._async_flush_ai_commands)
+
+    async def _async_flush_ai_commands(self, _now=None) -> None:
+        self._ai_flush_unsub = None
+        pending, self._ai_pending = self._ai_pending, {}
+        applied = False
+        for kind in ("plan", "mode"):
+            command = pending.get(kind)
+            if command is None:
+                continue
+            source = command.get("source", "mqtt")
+            try:
+                self.async_apply_ai_command(command)
+            except ValueError as err:
+                self._queue_ai_result(command.get("id"), source, "rejected", str(err))
+            else:
+                self._queue_ai_result(command.get("id"), source, "accepted")
+                applied = True
+        if applied:
+            await self.async_refresh()
+
+        results, self._ai_results = self._ai_results, []
+        dropped, self._ai_results_dropped = self._ai_results_dropped, 0
+        topic = _conf(self.entry, CONF_MQTT_AI_RESULT_TOPIC, DEFAULT_MQTT_AI_RESULT_TOPIC)
+        mqtt = mqtt_module(self.hass)
+        if not topic or not results or mqtt is None:
+            return
+        ack = {
+            "results": results,
+            "dropped": dropped,
+            "ai_mode": self.ai_mode,
+            "effective_mode": self.data.mode if self.data else None,
+        }
+        try:
+            await mqtt.async_publish(self.hass, topic, json.dumps(ack), qos=0, retain=False)
+        except Exception as err:
+            _LOGGER.warning("Kunde inte publicera AI-kvittens: %s", err)
 
-    # ── Nord Pool-lyssnare ──────────────────────────────────────────────────
+    # ── Kvittens från reläet/värmepumpen ────────────────────────────────────
 
-    def async_start_nordpool_listener(self) -> None:
-        """Prenumerera på Nord Pool-koordinatorn — refresha direkt vid ny data.
+    async def async_start_state_mqtt(self) -> None:
+        """Prenumerera på enhetens state-topic (valfritt) för kvittens och latens."""
+        topic = _conf(self.entry, CONF_MQTT_STATE_TOPIC)
+        mqtt = mqtt_module(self.hass)
+        if not topic or mqtt is None:
+            return
+
+        @callback
+        def _on_device_state(msg) -> None:
+            state = parse_device_state(msg.payload)
+            if state is None:
+                _LOGGER.debug("Okänt tillstånd på %s: %s", topic, msg.payload)
+                return
+            self._on_reported_state(state)
+
+        try:
+            self._state_unsub = await mqtt.async_subscribe(self.hass, topic, _on_device_state)
+            _LOGGER.info("Lyssnar på enhetens tillstånd via MQTT: %s", topic)
+        except Exception as err:
+            _LOGGER.warning("Kunde inte prenumerera på state-topic %s: %s", topic, err)
 
-        Nord Pool publicerar morgondagens priser ~kl 13. Utan denna lyssnare
-        kan det dröja upp till 60 min innan vi märker det (Nord Pools egna
-        uppdateringsintervall). Med lyssnaren refreshar vi inom sekunder.
+    async def async_stop_state_mqtt(self) -> None:
+        self._cancel_ack_timer()
+        if self._state_unsub:
+            self._state_unsub()
+            self._state_unsub = None
+
+    @property
+    def confirms_actuation(self) -> bool:
+        """Kvittens finns — via state-topicet eller genom att utgången läses tillbaka."""
+        return self.backend.can_confirm or self._state_unsub is not None
+
+    @callback
+    def _on_reported_state(self, state: str) -> None:
+        latency = self.actuation.reported(state, self.clock.monotonic())
+        if latency is not None:
+            self._cancel_ack_timer()
+            _LOGGER.debug("Kvittens %s efter %.0f ms", state, latency)
+        elif self.actuation.pending_mode is None and self.data and state != self.data.mode:
+            _LOGGER.warning("Enheten rapporterar %s men beslutat läge är %s", state, self.data.mode)
+
+    @callback
+    def _track_actuation(self, mode: str) -> None:
+        """Starta kvittensbevakning för ett publicerat läge (bara vid faktisk ändring).
+
+        Har bevakningen av samma läge redan gett upp startas ingen ny cykel —
+        inte förrän enheten rapporterar något nytt eller läget ändras.
         """
-        nordpool_entry_id = _conf(self.entry, CONF_NORDPOOL_CONFIG_ENTRY)
-        nordpool_entry = self.hass.config_entries.async_get_entry(nordpool_entry_id)
-        if not nordpool_entry:
-            _LOGGER.warning("Kan inte starta Nord Pool-lyssnare — entry saknas")
+        tracker = self.actuation
+        if mode == tracker.gave_up:
+            return
+        if mode == tracker.device_state:
+            tracker.commanded_mode = mode
+            if tracker.pending_mode is not None:
+                tracker.cancel()
+                self._cancel_ack_timer()
             return
+        if mode != tracker.pending_mode:
+            tracker.sent(mode, self.clock.monotonic())
+            self._schedule_ack_timeout()
+
+    @callback
+    def _schedule_ack_timeout(self) -> None:
+        self._cancel_ack_timer()
+        delay = ACK_TIMEOUT_SECONDS * 2 ** (self.actuation.attempts - 1)
+        self._ack_timer_unsub = self._call_later(delay, self._async_ack_timeout)
+
+    @callback
+    def _cancel_ack_timer(self) -> None:
+        if self._ack_timer_unsub:
+            self._ack_timer_unsub()
+            self._ack_timer_unsub = None
+
+    async def _async_ack_timeout(self, _now=None) -> None:
+        self._ack_timer_unsub = None
+        tracker = self.actuation
+        if tracker.pending_mode is None:
+            return
+        if tracker.attempts > ACK_MAX_RETRIES:
+            _LOGGER.warning("Ingen kvittens för %s efter %d försök", tracker.pending_mode, tracker.attempts)
+            tracker.timed_out()
+            return
+        _LOGGER.info("Ingen kvittens för %s — skickar igen (försök %d)", tracker.pending_mode, tracker.attempts + 1)
+        tracker.resent()
+        try:
+            await self._send_mode(tracker.pending_mode, track=False)
+        except Exception as err:
+            _LOGGER.warning("Omsändning via %s misslyckades: %s", self.backend.name, err)
+        self._schedule_ack_timeout()
+
+    # ── AI-plan (tidsstyrd override-kö) ────────────────────────────────────
 
-        coordinator = getattr(nordpool_entry, "runtime_data", None)
-        if not coordinator:
-            _LOGGER.warning("Kan inte starta Nord Pool-lyssnare — ingen coordinator")
+    async def async_restore_plan(self) -> None:
+        """Läs in sparad plan — redan utgångna fönster släpps direkt."""
+        stored = await self._plan_store.async_load()
+        if not stored:
+            return
+        try:
+            tz = dt_util.DEFAULT_TIME_ZONE
+            self._plan.load([OverrideWindow.from_dict(item, tz) for item in stored.get("windows", [])])
+        except (ValueError, TypeError) as err:
+            _LOGGER.warning("Sparad AI-plan ogiltig — ignoreras: %s", err)
+            return
+        self._plan.advance(self.clock.now())
+        _LOGGER.info("AI-plan återställd: %d fönster", len(self._plan))
+        self._schedule_plan_boundary()
+
+    @callback
+    def async_set_plan(self, windows: list[OverrideWindow], replace: bool = True) -> None:
+        """Ladda (eller utöka) AI-planen och spara den. Anroparen refreshar."""
+        self._plan.load(windows, replace=replace)
+        self._plan.advance(self.clock.now())
+        _LOGGER.info("AI-plan laddad: %d fönster (replace=%s)", len(self._plan), replace)
+        self._save_plan()
+        self._schedule_plan_boundary()
+
+    @callback
+    def _save_plan(self) -> None:
+        self._plan_store.async_delay_save(lambda: {"windows": self._plan.as_list()}, 1)
+
+    def _schedule_plan_boundary(self) -> None:
+        """Schemalägg refresh vid nästa fönstergräns — inga fler meddelanden behövs."""
+        self.async_stop_plan_timer()
+        boundary = self._plan.next_boundary(self.clock.now())
+        if boundary is None:
             return
 
         @callback
-        def _on_nordpool_update() -> None:
-            _LOGGER.debug("Nord Pool uppdaterades — triggar SG Ready refresh")
+        def _on_boundary(_now) -> None:
+            self._plan_timer_unsub = None
+            _LOGGER.debug("AI-plan: fönstergräns %s — räknar om", boundary.isoformat())
+            self._plan.advance(self.clock.now())
+            self._save_plan()
+            self._schedule_plan_boundary()
             self.hass.async_create_task(self.async_refresh())
 
-        self._nordpool_unsub = coordinator.async_add_listener(_on_nordpool_update)
-        _LOGGER.info("Prenumererar på Nord Pool-uppdateringar")
+        self._plan_timer_unsub = self._call_at(boundary, _on_boundary)
+
+    def async_stop_plan_timer(self) -> None:
+        if self._plan_timer_unsub:
+            self._plan_timer_unsub()
+            self._plan_timer_unsub = None
 
-    def async_stop_nordpool_listener(self) -> None:
-        if self._nordpool_unsub:
-            self._nordpool_unsub()
-            self._nordpool_unsub = None
+    def decision_summary(self) -> dict:
+        """Kort sammanfattning av senaste beslut — används som tjänstesvar."""
+        d = self.data
+        return {
+            "mode": d.mode if d else None,
+            "reason": d.reason if d else None,
+            "ai_mode": self.ai_mode,
+            "ai_reason": self.ai_reason,
+            "ai_until": self.ai_until.isoformat() if self.ai_until else None,
+            "plan": self.ai_plan,
+        }
+
+    @property
+    def ai_plan(self) -> list[dict]:
+        return self._plan.as_list()
 
-    # ── Prisfetching via Nord Pool coordinator ──────────────────────────────
+    @property
+    def ai_plan_next_change(self) -> datetime | None:
+        return self._plan.next_boundary(self.clock.now())
 
-    async def _fetch_prices(self) -> tuple[list[float], list[float]]:
-        """Hämta timpriser direkt från Nord Pool-koordinatorns data.
+    # ── Prisleverantörslyssnare ─────────────────────────────────────────────
 
-        Nord Pool-integrationen (officiell, HA 2024+) lagrar priser i
-        config_entry.runtime_data. Rådata är i milli-SEK/MWh — delas
-        med 1000 för att få SEK/kWh.
+    def async_start_price_listeners(self) -> None:
+        """Prenumerera på prisleverantörerna — refresha direkt vid ny data.
+
+        Nord Pool publicerar morgondagens priser ~kl 13. Utan lyssnare kan det
+        dröja upp till en uppdateringsperiod innan vi märker det.
         """
-        from homeassistant.util import dt as dt_util
+        @callback
+        def _on_prices() -> None:
+            _LOGGER.debug("Ny prisdata — triggar SG Ready refresh")
+            self.hass.async_create_task(self.async_refresh())
 
-        nordpool_entry_id = _conf(self.entry, CONF_NORDPOOL_CONFIG_ENTRY)
-        area = _conf(self.entry, CONF_NORDPOOL_AREA, "SE4")
+        self._price_unsubs = self.price_chain.async_subscribe(_on_prices)
 
-        nordpool_entry = self.hass.config_entries.async_get_entry(nordpool_entry_id)
-        if not nordpool_entry:
-            _LOGGER.warning("Nord Pool config entry '%s' hittades inte", nordpool_entry_id)
-            return [], []
+    def async_stop_price_listeners(self) -> None:
+        for unsub in self._price_unsubs:
+            unsub()
+        self._price_unsubs = []
 
-        coordinator = getattr(nordpool_entry, "runtime_data", None)
-        if not coordinator or not getattr(coordinator, "data", None):
-            _LOGGER.warning("Nord Pool coordinator har ingen data ännu")
-            return [], []
+    # ── Temperatur/tariff-lyssnare ──────────────────────────────────────────
 
-        today_str = dt_util.now().strftime("%Y-%m-%d")
-        tomorrow_str = (dt_util.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    @callback
+    def async_start_entity_listeners(self) -> None:
+        """Lyssna på temperatur- och tariffentiteten.
 
-        today_prices: list[float] = []
-        tomorrow_prices: list[float] = []
+        En tillståndsändring räknar bara om POST-2/POST-3 ovanpå senaste
+        basbeslut — ingen prisberäkning, ingen ändring av production override.
+        Tariffen slår alltså av boost inom millisekunder i stället för vid
+        nästa 5-minutersrefresh.
+        """
+        entities = [
+            entity_id
+            for entity_id in (_conf(self.entry, CONF_TEMP_ENTITY), _conf(self.entry, CONF_TARIFF_ENTITY))
+            if entity_id
+        ]
+        if not entities:
+            return
 
+        @callback
+        def _on_entity_change(event) -> None:
+            new_state = event.data.get("new_state")
+            old_state = event.data.get("old_state")
+            if new_state is None or (old_state is not None and old_state.state == new_state.state):
+                return
+            self._async_reevaluate_post_stages()
+
+        self._entity_unsub = async_track_state_change_event(self.hass, entities, _on_entity_change)
+        _LOGGER.debug("Lyssnar på %s", ", ".join(entities))
+
+    @callback
+    def async_stop_entity_listeners(self) -> None:
+        if self._entity_unsub:
+            self._entity_unsub()
+            self._entity_unsub = None
+
+    @callback
+    def _async_reevaluate_post_stages(self) -> None:
+        if self._base_result is None or self.data is None:
+            return
+        result = self._apply_post_stages(self._base_result)
+        self._journal_decision(STAGE_POST, result, self._prod_state, self.clock.now(), self.clock.monotonic())
+        self._record_shadow(result)
+        changed = result.diff(self.data)
+        if not changed:
+            return
+        previous_mode = self.data.mode
+        # Sätt data direkt i stället för async_set_updated_data — den skulle
+        # skjuta upp den periodiska refreshen vid varje temperaturändring.
+        self.changed_fields = changed
+        self.data = result
+        self.async_update_listeners()
+        if result.mode != previous_mode:
+            _LOGGER.info("SG Ready: %s | %s (POST-2/3)", result.mode.upper(), result.reason)
+            self.hass.async_create_task(self._async_publish_mode(result.mode))
+
+    # ── Prishistorik (kvantilskiss) ────────────────────────────────────────
+
+    async def async_restore_price_history(self) -> None:
+        stored = await self._history_store.async_load()
+        if not stored:
+            return
         try:
-            today_start = dt_util.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            tomorrow_start = today_start + timedelta(days=1)
-            day_after_start = tomorrow_start + timedelta(days=1)
-
-            today_dict: dict[int, float] = {}
-            tomorrow_dict: dict[int, float] = {}
-
-            for day_data in coordinator.data.entries:
-                for entry in day_data.entries:
-                    price = entry.entry.get(area)
-                    if price is None:
-                        continue
-                    entry_local = dt_util.as_local(entry.start)
-                    if today_start <= entry_local < tomorrow_start:
-                        # Dict deduplicerar — senaste värdet vinner vid ev. dubbletter
-                        today_dict[entry_local.hour] = price / 1000
-                    elif tomorrow_start <= entry_local < day_after_start:
-                        tomorrow_dict[entry_local.hour] = price / 1000
-
-            # Sortera kronologiskt (timme 0 → index 0), max 24 element per dag
-            today_prices = [today_dict[h] for h in sorted(today_dict)]
-            tomorrow_prices = [tomorrow_dict[h] for h in sorted(tomorrow_dict)]
+            self._price_history = PriceHistory.from_dict(stored.get("days", {}))
+        except (ValueError, TypeError) as err:
+            _LOGGER.warning("Sparad prishistorik ogiltig — börjar om: %s", err)
+            return
+        _LOGGER.debug("Prishistorik återställd: %d dygn", len(self._price_history))
 
-        except Exception as err:
-            _LOGGER.error("Fel vid parsning av Nord Pool-data: %s", err, exc_info=True)
-            return [], []
+    @callback
+    def _record_price_history(self, today: list[float]) -> None:
+        """Lägg in dagens priser i skissen en gång per dygn (bara kompletta dygn)."""
+        day = self.clock.now().date().isoformat()
+        if len(today) < 23 or self._price_history.has_day(day):
+            return
+        self._price_history.add_day(day, today)
+        self._history_store.async_delay_save(lambda: {"days": self._price_history.as_dict()}, 60)
 
-        if not today_prices:
-            if self._had_prices:
-                _LOGGER.warning(
-                    "Priser saknas plötsligt för %s area=%s — kör på normalläge tills data återkommer",
-                    today_str, area,
+    # ── Effekttopp (effekttariff) ───────────────────────────────────────────
+
+    async def async_restore_peaks(self) -> None:
+        if not self.peak_enabled:
+            return
+        stored = await self._peak_store.async_load()
+        if not stored:
+            return
+        try:
+            self._peaks = PeakTracker.from_dict(stored, self.peak_top_k, dt_util.DEFAULT_TIME_ZONE)
+        except (ValueError, TypeError) as err:
+            _LOGGER.warning("Sparade effekttoppar ogiltiga — börjar om: %s", err)
+            return
+        _LOGGER.debug("Effekttoppar återställda: %s", self._peaks.peaks)
+
+    async def async_restore_energy(self) -> None:
+        if not self.power.sources:
+            return
+        stored = await self._energy_store.async_load()
+        if not stored:
+            return
+        try:
+            self.energy = EnergyLedger.from_dict(stored)
+        except (ValueError, TypeError) as err:
+            _LOGGER.warning("Sparad energibokföring ogiltig — börjar om: %s", err)
+
+    @callback
+    def async_start_power_listener(self) -> None:
+        """Räkna mätvärden, bokför energi/kostnad och integrera nettoeffekten till timmedel
+        när någon av effektkällorna ändras, och dessutom var POWER_SAMPLE_SECONDS.
+
+        Ett oförändrat mätvärde (dödband) ger ingen state_changed-händelse;
+        det periodiska samplet håller integrationen igång så att den inte
+        räknar tystnaden som lucka.
+        """
+        if not self.power.sources:
+            return
+
+        @callback
+        def _on_power_change(event) -> None:
+            if event.data.get("new_state") is None:
+                return
+            self.metrics.grid_samples += 1
+            self._record_power_sample()
+
+        @callback
+        def _on_interval(_now) -> None:
+            self._record_power_sample()
+
+        self._power_unsub = [
+            async_track_state_change_event(self.hass, list(self.power.sources), _on_power_change),
+            self._call_every(timedelta(seconds=POWER_SAMPLE_SECONDS), _on_interval),
+        ]
+
+    @callback
+    def async_stop_power_listener(self) -> None:
+        for unsub in self._power_unsub or ():
+            unsub()
+        self._power_unsub = None
+
+    @callback
+    def _record_power_sample(self) -> None:
+        """Nuvarande nettoeffekt till energibokföringen och effekttariffen (sample-and-hold)."""
+        fused = self._grid_power()
+        # Saknad/inaktuell källa bryter integrationen
+        power = fused.power_w if fused.good else None
+        ts = self.clock.utcnow()
+        mode = self.data.mode if self.data is not None else None
+        if self.energy.add_sample(power, ts, mode, self._slot_price):
+            self._energy_store.async_delay_save(self.energy.as_dict, 10)
+        if not self.peak_enabled:
+            return
+        if self._peaks.add_sample(power, ts):
+            self._peak_store.async_delay_save(self._peaks.as_dict, 10)
+        # Vetot kan bara slå om när basbeslutet är boost
+        if self._base_result is not None and self._base_result.mode == MODE_BOOST:
+            self._async_reevaluate_post_stages()
+
+    @callback
+    def _grid_power(self) -> FusedPower:
+        """Nettoeffekt från effektkällornas aktuella tillstånd.
+
+        Läser tillståndsmaskinen i stället för att lita på händelser — ett
+        oförändrat värde (dödband-hjärtslag) flyttar bara last_reported
+        (HA 2024.3+) och ger ingen state_changed-händelse.
+        """
+        for entity_id in self.power.sources:
+            state = self.hass.states.get(entity_id)
+            if state is None:
+                self.power.update(entity_id, None, self.clock.utcnow())
+                continue
+            try:
+                value = float(state.state)
+            except ValueError:
+                value = None   # unknown/unavailable
+            self.power.update(entity_id, value, self._reported_at(entity_id, state))
+        return self.power.net(self.clock.utcnow())
+
+    def _reported_at(self, entity_id: str, state) -> datetime:
+        """När mätvärdet kom, på koordinatorns klocka.
+
+        HA stämplar last_reported med systemtid, som inte går att jämföra med
+        en virtuell klocka. Varje nytt last_reported stämplas därför en gång,
+        när det först ses: klockans tid minus värdets ålder i systemtid. Med
+        systemklockan blir det last_reported igen.
+        """
+        reported = getattr(state, "last_reported", state.last_updated)
+        seen = self._power_seen.get(entity_id)
+        if seen is None or seen[0] != reported:
+            age = max(0.0, (dt_util.utcnow() - reported).total_seconds())
+            seen = (reported, self.clock.utcnow() - timedelta(seconds=age))
+            self._power_seen[entity_id] = seen
+        return seen[1]
+
+    def _slot_price(self, slot_start: datetime, export: bool = False) -> float | None:
+        """Import- eller exportpriset för en timslot ur senaste prisvektorerna (None om okänt)."""
+        if self.prices is None:
+            return None
+        local = dt_util.as_local(slot_start)
+        return self.prices.export_at(local) if export else self.prices.import_at(local)
+
+    def _peak_veto(self) -> tuple[bool, float | None]:
+        """(veto, förväntat timmedel) — boost-lasten räknas bara till om vi inte redan boostar."""
+        if not self.peak_enabled:
+            return False, None
+        now = self.clock.now()
+        boosting = self.data is not None and self.data.mode == MODE_BOOST
+        extra = 0.0 if boosting else float(self.peak_boost_load)
+        projected = self._peaks.projected_w(now, extra)
+        return self._peaks.would_set_peak(now, extra), projected
+
+    # ── Lastplanering ───────────────────────────────────────────────────────
+
+    @callback
+    def _update_load_plans(self, today: list[float], tomorrow: list[float]) -> None:
+        """Planera om lasterna — bara när prisvektorn faktiskt ändrats."""
+        if not self.loads.specs or not today:
+            return
+        now = self.clock.now()
+        key = (now.date(), tuple(today), tuple(tomorrow))
+        if key == self._load_prices_key:
+            return
+        self._load_prices_key = key
+        self.loads.update(today + tomorrow, now.date(), now)
+        self._schedule_load_boundary()
+
+    @callback
+    def _schedule_load_boundary(self) -> None:
+        """Timer till nästa fönsterstart/-slut så att binärsensorerna slår om i tid."""
+        self.async_stop_load_timer()
+        boundary = self.loads.next_boundary(self.clock.now())
+        if boundary is None:
+            return
+
+        @callback
+        def _on_boundary(_now) -> None:
+            self._load_timer_unsub = None
+            self.loads.tick(self.clock.now())
+            self._schedule_load_boundary()
+
+        self._load_timer_unsub = self._call_at(boundary, _on_boundary)
+
+    @callback
+    def async_stop_load_timer(self) -> None:
+        if self._load_timer_unsub:
+            self._load_timer_unsub()
+            self._load_timer_unsub = None
+
+    # ── Solprognos ──────────────────────────────────────────────────────────
+
+    @property
+    def forecast_enabled(self) -> bool:
+        return bool(self._forecast_entities or self._forecast_file)
+
+    @callback
+    def async_start_forecast_listener(self) -> None:
+        """Läs prognosentiteterna och planera om när någon av dem ändras."""
+        if not self._forecast_entities:
+            return
+        for entity_id in self._forecast_entities:
+            self._read_forecast_entity(entity_id)
+        self._update_surplus_plan()
+
+        @callback
+        def _on_forecast_change(event) -> None:
+            self._read_forecast_entity(event.data["entity_id"])
+            self._update_surplus_plan()
+
+        self._forecast_unsub = async_track_state_change_event(self.hass, self._forecast_entities, _on_forecast_change)
+
+    @callback
+    def async_stop_forecast_listener(self) -> None:
+        if self._forecast_unsub:
+            self._forecast_unsub()
+            self._forecast_unsub = None
+        self._cancel_surplus_timer()
+
+    def _read_forecast_entity(self, entity_id: str) -> None:
+        state = self.hass.states.get(entity_id)
+        data = None
+        if state is not None:
+            data = next((state.attributes[name] for name in FORECAST_ATTRIBUTES if name in state.attributes), None)
+        if data is None:
+            self._forecast_parts.pop(entity_id, None)
+            return
+        try:
+            self._forecast_parts[entity_id] = parse_forecast(data, dt_util.DEFAULT_TIME_ZONE)
+        except ValueError as err:
+            _LOGGER.warning("Ogiltig solprognos i %s: %s", entity_id, err)
+            self._forecast_parts.pop(entity_id, None)
+
+    async def _async_load_forecast_file(self) -> None:
+        """Läs prognosfilen — bara om den ändrats sedan förra läsningen."""
+        path = self._forecast_file
+        if not path:
+            return
+
+        def _read() -> tuple[float, object]:
+            mtime = os.stat(path).st_mtime
+            if mtime == self._forecast_file_mtime:
+                return mtime, None
+            with open(path, encoding="utf-8") as fh:
+                return mtime, json.load(fh)
+
+        try:
+            mtime, data = await self.hass.async_add_executor_job(_read)
+        except (OSError, ValueError) as err:
+            if self._forecast_file_mtime != -1:
+                _LOGGER.warning("Kan inte läsa solprognosen %s: %s", path, err)
+            self._forecast_file_mtime = -1
+            self._forecast_parts.pop(path, None)
+            return
+        if data is None:
+            return
+        self._forecast_file_mtime = mtime
+        try:
+            self._forecast_parts[path] = parse_forecast(data, dt_util.DEFAULT_TIME_ZONE)
+        except ValueError as err:
+            _LOGGER.warning("Ogiltig solprognos i %s: %s", path, err)
+            self._forecast_parts.pop(path, None)
+
+    @callback
+    def _update_surplus_plan(self) -> None:
+        """Planera om överskottsfönstren — bara när prognos eller priser faktiskt ändrats."""
+        prices = self.prices
+        if not self.forecast_enabled or prices is None:
+            return
+        forecast = merge_forecasts(*self._forecast_parts.values())
+        if not self.surplus.update(
+            forecast, self.forecast_base_load, self,
+            prices.export_today, prices.export_tomorrow, prices.day, dt_util.DEFAULT_TIME_ZONE,
+        ):
+            return
+        _LOGGER.debug("Solprognos: %d överskottsfönster", len(self.surplus.windows))
+        self._schedule_surplus_start()
+
+    @callback
+    def _schedule_surplus_start(self) -> None:
+        """Timer till nästa fönsterstart — förarmningen väntar inte på nästa 5-minutersrefresh."""
+        self._cancel_surplus_timer()
+        start = self.surplus.next_start(self.clock.now())
+        if start is None:
+            return
+
+        @callback
+        def _on_start(_now) -> None:
+            self._surplus_timer_unsub = None
+            self._schedule_surplus_start()
+            self.hass.async_create_task(self.async_refresh())
+
+        self._surplus_timer_unsub = self._call_at(start, _on_start)
+
+    @callback
+    def _cancel_surplus_timer(self) -> None:
+        if self._surplus_timer_unsub:
+            self._surplus_timer_unsub()
+            self._surplus_timer_unsub = None
+
+    def _prearm_production(self, tick: float) -> None:
+        """Förarma production override när ett prognostiserat överskottsfönster börjar.
+
+        Körs före journalens ögonblicksbild av production-tillståndet, så att
+        omspelningen ser samma tillstånd. Varje fönster förarmas högst en gång;
+        mätaren bekräftar eller avbryter sedan i production_step.
+        """
+        if not self.surplus.windows or not self.power.sources or not _conf(self.entry, CONF_PROD_ENABLED, True):
+            return
+        if self._manual_override or self.ai_mode != AI_MODE_AUTO:
+            return
+        window = self.surplus.active(self.clock.now())
+        if window is None or window.start == self._surplus_armed:
+            return
+        self._surplus_armed = window.start
+        if production_prearm(self._prod_state, window.mode, tick):
+            self.metrics.prod_transitions["prearmed"] += 1
+            _LOGGER.info(
+                "Production override förarmad: %s (prognos ~%.0fW överskott till %s)",
+                window.mode, window.surplus_w, window.end.strftime("%H:%M"),
+            )
+
+    def _surplus_summary(self) -> dict | None:
+        """Pågående eller nästa överskottsfönster (för lägessensorn)."""
+        window = self.surplus.upcoming(self.clock.now()) if self.surplus.windows else None
+        return window.as_dict() if window else None
+
+    # ── Värmekostnad (COP) ──────────────────────────────────────────────────
+
+    async def _async_load_outdoor_forecast(self) -> None:
+        """Hämta timprognosen för utetemperatur — högst var HEAT_FORECAST_REFRESH_SECONDS.
+
+        weather.* läses via weather.get_forecasts, andra entiteter via attributet
+        forecast. Vid fel behålls förra prognosen (timmar utanför den får
+        närmaste prognostiserade värde).
+        """
+        entity_id = self._outdoor_entity
+        if not entity_id:
+            return
+        tick = self.clock.monotonic()
+        if self._outdoor_fetched is not None and tick - self._outdoor_fetched < HEAT_FORECAST_REFRESH_SECONDS:
+            return
+        self._outdoor_fetched = tick
+        try:
+            if entity_id.startswith("weather."):
+                response = await self.hass.services.async_call(
+                    "weather", "get_forecasts", {"type": "hourly"},
+                    target={"entity_id": entity_id}, blocking=True, return_response=True,
                 )
+                data = (response or {}).get(entity_id, {}).get("forecast")
             else:
-                _LOGGER.warning("Inga priser hittade för %s, area=%s", today_str, area)
-        else:
-            self._had_prices = True
-            had_tomorrow = bool(tomorrow_prices)
-            _LOGGER.debug(
-                "Nord Pool: %d timmar idag%s (area=%s)",
-                len(today_prices),
-                f", {len(tomorrow_prices)} imorgon" if had_tomorrow else " — morgondagens priser saknas ännu",
-                area,
-            )
+                state = self.hass.states.get(entity_id)
+                data = state.attributes.get("forecast") if state else None
+            if not data:
+                raise ValueError("ingen timprognos")
+            forecast = parse_temperature_forecast(data, dt_util.DEFAULT_TIME_ZONE)
+        except (HomeAssistantError, ValueError) as err:
+            if str(err) != self._outdoor_error:
+                self._outdoor_error = str(err)
+                _LOGGER.warning("Kan inte läsa utetemperaturprognosen %s: %s", entity_id, err)
+            return
+        if self._outdoor_error:
+            _LOGGER.info("Utetemperaturprognosen %s läses igen", entity_id)
+            self._outdoor_error = None
+        self._outdoor_forecast = forecast
+
+    def _ranking_prices(self, today: list[float], tomorrow: list[float]) -> tuple[list[float], list[float]]:
+        """Vektorerna som percentillogiken rankar — värmekostnad när en prognos finns, annars importpris."""
+        if not self._outdoor_entity or self.prices is None:
+            return today, tomorrow
+        if self.heat_cost.update(
+            self._outdoor_forecast, self.cop_curve, today, tomorrow, self.prices.day, dt_util.DEFAULT_TIME_ZONE,
+        ):
+            _LOGGER.debug("Värmekostnad: COP %s", [round(cop, 1) for cop in self.heat_cost.cops])
+        return self.heat_cost.ranking(today, tomorrow, self.clock.now().hour)
+
+    # ── Skuggläge ───────────────────────────────────────────────────────────
+
+    @property
+    def shadow_enabled(self) -> bool:
+        return self._shadow_overrides is not None
+
+    @property
+    def shadow_params(self) -> ShadowParams | None:
+        """Kandidatparametrar — avvikelserna ovanpå aktuella (slider-)värden."""
+        if self._shadow_overrides is None:
+            return None
+        return ShadowParams.from_source(self).with_overrides(self._shadow_overrides)
+
+    async def async_restore_shadow(self) -> None:
+        if not self.shadow_enabled:
+            return
+        stored = await self._shadow_store.async_load()
+        if not stored:
+            return
+        try:
+            self.shadow_ledger = ShadowLedger.from_dict(stored)
+        except (ValueError, TypeError, KeyError) as err:
+            _LOGGER.warning("Sparad skuggstatistik ogiltig — börjar om: %s", err)
+
+    @callback
+    def _record_shadow(self, live: Decision) -> None:
+        """Skuggbeslutet för samma tidpunkt — POST-stegen körs med kandidatens mintemperatur."""
+        shadow = self.shadow_params
+        if shadow is None or self._shadow_base is None:
+            return
+        result = self._apply_post_stages(self._shadow_base, params=shadow)
+        self.shadow_ledger.record(live.mode, result.mode, live.current_price, self.clock.now(), result.reason)
+        self._shadow_store.async_delay_save(self.shadow_ledger.as_dict, 300)
+
+    # ── Beslutsjournal ─────────────────────────────────────────────────────
+
+    @callback
+    def _journal_decision(
+        self, stage: int, result: Decision, prod_before: dict, started: datetime, tick: float,
+        today: list | None = None, tomorrow: list | None = None,
+    ) -> None:
+        """Lägg beslutets indata och utfall i journalbufferten — skrivs till disk i executor.
+
+        `started` är beslutets lokala väggtid, `tick` den monotona tid som
+        production-tillståndets åldrar räknas mot.
+        """
+        journal = self._journal
+        if journal is None:
+            return
+        ts = started.timestamp()
+        day = started.date().toordinal()
+        try:
+            if stage == STAGE_FULL:
+                journal.append_prices(ts, day, today or [], tomorrow or [])
+            self._append_journal_record(journal, stage, result, prod_before, tick, ts, day)
+        except Exception as err:   # journalen får aldrig påverka styrningen
+            _LOGGER.warning("Kunde inte journalföra beslutet: %s", err)
+            return
+        if journal.pending >= JOURNAL_FLUSH_BYTES:
+            self.hass.async_create_task(self.async_flush_journal())
+        elif self._journal_flush_unsub is None:
+            self._journal_flush_unsub = self._call_later(JOURNAL_FLUSH_SECONDS, self.async_flush_journal)
+
+    def _append_journal_record(
+        self, journal: JournalWriter, stage: int, result: Decision, prod_before: dict,
+        tick: float, ts: float, day: int,
+    ) -> None:
+        grid = self._grid_power() if self.power.sources else None
+        peak_veto, peak_projected_w = self._peak_veto()
+        longterm = self._longterm_percentiles(result.spot_price if result.spot_price is not None else result.current_price)
+        journal.append_decision(DecisionRecord(
+            ts=ts, stage=stage, day=day, hour=result.hour,
+            params=ShadowParams.from_source(self),
+            manual_override=result.manual_override,
+            ai_mode=result.ai_mode,
+            percentile_7d=longterm[7],
+            percentile_30d=longterm[30],
+            prod_enabled=bool(_conf(self.entry, CONF_PROD_ENABLED, True)),
+            grid_power=grid.power_w if grid else None,
+            grid_quality=grid.quality if grid else None,
+            tariff_active=self._tariff_active(),
+            indoor_temp=self._get_indoor_temp(),
+            **DecisionRecord.prod_fields(prod_before, tick),
+            peak_enabled=self.peak_enabled,
+            peak_veto=peak_veto,
+            peak_projected_w=peak_projected_w,
+            peak_threshold_w=result.peak_threshold_w,
+            mode=result.mode,
+            base_mode=self._base_result.mode,
+            confidence=result.confidence,
+            ai_override_active=result.ai_override_active,
+            prod_override_active=result.prod_override_active,
+            temp_override_active=result.temp_override_active,
+            tariff_blocked=result.tariff_blocked,
+            peak_vetoed=result.peak_vetoed,
+            has_tomorrow=result.has_tomorrow,
+            prod_sell=result.sell_surplus,
+            spot_price=result.spot_price,
+            disabled_stages=self._base_pipeline.disabled | self._post_pipeline.disabled,
+        ))
+
+    async def async_flush_journal(self, _now=None) -> None:
+        """Skriv bufferten (anropas av timern, vid full buffert och vid avladdning)."""
+        if self._journal_flush_unsub:
+            self._journal_flush_unsub()
+            self._journal_flush_unsub = None
+        journal = self._journal
+        if journal is None:
+            return
+        async with self._journal_lock:
+            data, prices = journal.take()
+            if not data:
+                return
+            try:
+                await self.hass.async_add_executor_job(journal.write, data, prices)
+            except OSError as err:
+                _LOGGER.warning("Kunde inte skriva beslutsjournalen: %s", err)
+
+    # ── Prisfetching via prisleverantörerna ────────────────────────────────
+
+    async def _fetch_prices(self) -> tuple[list[float], list[float]]:
+        """Timpriser (SEK/kWh) för idag och imorgon från första leverantören som har dem.
+
+        Leverantörerna normaliserar till lokala timslots (index = timme) —
+        se providers.py för Nord Pool, prissensor och lokal fil.
+        """
+        day = self.clock.now().date()
+        slots = await self.price_chain.async_fetch(day)
+        self.price_slots = slots
+        if slots is None:
+            if self._had_prices:
+                _LOGGER.warning("Priser saknas plötsligt för %s — kör på normalläge tills data återkommer", day)
+            else:
+                _LOGGER.warning("Inga priser hittade för %s", day)
+            return [], []
 
-        return today_prices, tomorrow_prices
+        self._had_prices = True
+        _LOGGER.debug(
+            "%s: %d timmar idag%s",
+            slots.source,
+            len(slots.today),
+            f", {len(slots.tomorrow)} imorgon" if slots.tomorrow else " — morgondagens priser saknas ännu",
+        )
+        return slots.today, slots.tomorrow
+
+    # ── Prismodell ──────────────────────────────────────────────────────────
+
+    def _update_price_vectors(self, spot_today: list[float], spot_tomorrow: list[float]) -> PriceVectors:
+        """Effektiva prisvektorer — räknas bara om när spotpriserna eller dygnet ändrats."""
+        day = self.clock.now().date()
+        prices = self.prices
+        if (
+            prices is None or prices.day != day
+            or prices.spot_today != spot_today or prices.spot_tomorrow != spot_tomorrow
+        ):
+            self.prices = price_vectors(self.price_model, spot_today, spot_tomorrow, day, dt_util.DEFAULT_TIME_ZONE)
+        return self.prices
+
+    def _sell_surplus(self, export_price: float | None, block_threshold: float | None) -> bool:
+        """Är överskottet värt mer sålt än använt? Bara med prismodell: exportpriset
+        jämförs med blockgränsen i importpris — värme kan köpas billigare senare."""
+        if self.price_model.neutral or export_price is None or block_threshold is None:
+            return False
+        return export_price >= block_threshold
 
     # ── Huvuduppdatering ────────────────────────────────────────────────────
 
-    async def _async_update_data(self) -> dict:
-        today, tomorrow = await self._fetch_prices()
+    async def _async_update_data(self) -> Decision:
+        started = time.perf_counter()
+        spot_today, spot_tomorrow = await self._fetch_prices()
+        self._record_price_history(spot_today)
+        prices = self._update_price_vectors(spot_today, spot_tomorrow)
+        today, tomorrow = prices.import_today, prices.import_tomorrow
+        self._update_load_plans(today, tomorrow)
+        await self._async_load_forecast_file()
+        self._update_surplus_plan()
+        await self._async_load_outdoor_forecast()
+        today, tomorrow = self._ranking_prices(today, tomorrow)
 
         try:
             result = self._calculate_mode(today, tomorrow)
         except Exception as err:
             _LOGGER.error("Fel i _calculate_mode: %s", err, exc_info=True)
-            result = {"mode": MODE_NORMAL, "reason": "Beräkningsfel — normal fallback", "confidence": 0,
-                      "current_price": 0.0, "price_percentile": 50.0, "price_vs_avg_pct": 100.0,
-                      "diff_from_avg_ore": 0.0, "price_spread": 0.0, "spread_pct": 0.0,
-                      "insignificant_spread": True, "boost_threshold": None, "block_threshold": None,
-                      "window_size": 0, "window_avg": None, "window_min": None, "window_max": None,
-                      "has_tomorrow": False, "indoor_temp": None, "temp_override_active": False,
-                      "prod_override_active": False, "prod_override_mode": None,
-                      "prod_override_in_hysteresis": False, "prod_override_countdown": None,
-                      "tariff_blocked": False, "ai_override_active": False}
+            result = Decision.fallback(
+                "Beräkningsfel — normal fallback",
+                ai_mode=self.ai_mode,
+                manual_override=self._manual_override,
+                boost_pct=self.boost_pct,
+                block_pct=self.block_pct,
+                min_temp=self.min_temp,
+            )
+
+        # Med always_update=False notifieras lyssnare bara om resultatet skiljer
+        # sig; changed_fields låter varje entitet hoppa över irrelevanta ändringar.
+        self.changed_fields = result.diff(self.data)
+        self.metrics.refresh_duration.observe(time.perf_counter() - started)
+        await self._async_publish_mode(result.mode)
+        return result
 
+    async def _async_publish_mode(self, mode: str) -> None:
         try:
-            await self._publish_mqtt(result["mode"])
+            await self._send_mode(mode)
         except Exception as err:
-            _LOGGER.warning("MQTT-publicering misslyckades: %s", err)
+            self.metrics.publish_failures += 1
+            _LOGGER.warning("Kunde inte skicka läget via %s: %s", self.backend.name, err)
+        try:
+            await self._publish_edge_config()
+            await self._publish_edge_heartbeat(mode)
+        except Exception as err:
+            _LOGGER.warning("Kunde inte publicera edge-config: %s", err)
 
-        return result
+    async def _publish_edge_heartbeat(self, mode: str) -> None:
+        """Hjärtslag till Shelly-reserven: läget och tidsstämpel, inte retained.
+
+        Reserven räknar HA som borta när hjärtslagen uteblir i
+        EDGE_HA_TIMEOUT_SECONDS. Styr-topicet duger inte — det är retained,
+        så en återansluten Shelly skulle få ett gammalt läge och tro att HA lever.
+        """
+        edge_topic = _conf(self.entry, CONF_MQTT_EDGE_TOPIC)
+        mqtt = mqtt_module(self.hass)
+        if not edge_topic or mqtt is None:
+            return
+        payload = json.dumps({"mode": mode, "ts": int(self.clock.utcnow().timestamp())})
+        await mqtt.async_publish(self.hass, f"{edge_topic}/{EDGE_HEARTBEAT_SUBTOPIC}", payload, qos=0, retain=False)
+
+    async def _publish_edge_config(self) -> None:
+        """Publicera production override-trösklarna retained till Shelly-scriptet.
+
+        Bara vid ändring — sliders slår igenom senast vid nästa uppdatering.
+        """
+        topic = _conf(self.entry, CONF_MQTT_EDGE_TOPIC)
+        mqtt = mqtt_module(self.hass)
+        if not topic or mqtt is None:
+            return
+        payload = json.dumps({
+            "enabled": bool(_conf(self.entry, CONF_PROD_ENABLED, True)),
+            "normal_threshold": self.prod_normal_threshold,
+            "boost_threshold": self.prod_boost_threshold,
+            "return_threshold": self.prod_return_threshold,
+            "hysteresis": self.prod_hysteresis,
+            "min_duration": self.prod_min_duration,
+            "off_delay": self.prod_off_delay,
+            "heartbeat_topic": f"{topic}/{EDGE_HEARTBEAT_SUBTOPIC}",
+            "control_topic": _conf(self.entry, CONF_MQTT_TOPIC, DEFAULT_MQTT_TOPIC),
+            # Lokala beslut på styr-topicet bara om värmepumpen läser det
+            "control_publish": self.backend.name == BACKEND_MQTT,
+            "ha_timeout": EDGE_HA_TIMEOUT_SECONDS,
+        }, sort_keys=True)
+        if payload == self._edge_payload:
+            return
+        await mqtt.async_publish(self.hass, topic, payload, qos=1, retain=True)
+        self._edge_payload = payload
+        _LOGGER.debug("Edge-config → %s", topic)
 
     # ── Algoritm ────────────────────────────────────────────────────────────
 
-    def _build_window(self, today, tomorrow, current_hour, perspective_hours=24):
-        hours_back = perspective_hours // 2
-        hours_forward = perspective_hours - hours_back
-        has_tomorrow = bool(tomorrow)
-        window = []
-
-        for i in range(hours_back, 0, -1):
-            h = current_hour - i
-            if 0 <= h < len(today) and today[h] is not None:
-                window.append(float(today[h]))
-
-        if current_hour < len(today) and today[current_hour] is not None:
-            window.append(float(today[current_hour]))
-
-        for i in range(1, hours_forward):
-            h = current_hour + i
-            if h < 24 and h < len(today) and today[h] is not None:
-                window.append(float(today[h]))
-            elif h >= 24 and has_tomorrow:
-                th = h - 24
-                if th < len(tomorrow) and tomorrow[th] is not None:
-                    window.append(float(tomorrow[th]))
-
-        return window, has_tomorrow
-
-    def _calculate_mode(self, today: list, tomorrow: list) -> dict:
-        current_hour = datetime.now().hour
-        window, has_tomorrow = self._build_window(today, tomorrow, current_hour)
-        window_stats = _calculate_stats(window)
-
-        current_price = float(today[current_hour]) if current_hour < len(today) else 0.0
-
-        boost_percentile = self.boost_pct
-        block_percentile = 100 - self.block_pct
-
-        price_percentile = 50.0
-        boost_threshold = None
-        block_threshold = None
-
-        if window_stats and window:
-            rounded_current = _round_price(current_price)
-            rounded_window = [_round_price(p) for p in window_stats["sorted"]]
-            lower_count = sum(1 for p in rounded_window if p < rounded_current)
-            price_percentile = (lower_count / len(rounded_window)) * 100
-
-            boost_idx = min(math.floor(len(rounded_window) * boost_percentile / 100), len(rounded_window) - 1)
-            block_idx = min(math.floor(len(rounded_window) * block_percentile / 100), len(rounded_window) - 1)
-            boost_threshold = rounded_window[boost_idx]
-            block_threshold = rounded_window[block_idx]
-
-        price_spread = (window_stats["max"] - window_stats["min"]) if window_stats else 0
-        insignificant_spread = price_spread < MIN_SPREAD_TO_ACT
-        window_avg = window_stats["avg"] if window_stats else None
+    def _calculate_mode(self, today: list, tomorrow: list) -> Decision:
+        started, tick = self.clock.now(), self.clock.monotonic()
+        self._prearm_production(tick)
+        prod_before = dict(self._prod_state)
+        self._base_result = self._calculate_base(today, tomorrow)
+        result = self._apply_post_stages(self._base_result)
+        _LOGGER.info("SG Ready: %s | %s | conf=%d%%", result.mode.upper(), result.reason, result.confidence)
+        self._journal_decision(STAGE_FULL, result, prod_before, started, tick, today, tomorrow)
+        self._record_shadow(result)
+        return result
+
+    def _calculate_base(self, today: list, tomorrow: list) -> Decision:
+        """P0–P4 + POST-1 — allt som beror på priser och production override."""
+        current_hour = self.clock.now().hour
+        prices = self.prices
+        spot_price = _hour(prices.spot_today, current_hour) if prices else None
+        ctx = price_context(today, tomorrow, current_hour, spot_price)
+        current_price = ctx.current_price
+        price_percentile = ctx.price_percentile
+        boost_threshold, block_threshold = ctx.thresholds(self.boost_pct, self.block_pct)
+        window_avg = ctx.window_avg
         price_vs_avg = (current_price / window_avg) if window_avg else 1.0
         diff_from_avg = abs(current_price - window_avg) if window_avg else 0.0
 
-        # ── BESLUTSLOGIK ─────────────────────────────────────────────────────
+        # Långsiktig kontext mot spotpriset — prishistoriken sparas i spotpris
+        export_price = _hour(prices.export_today, current_hour) if prices else None
+        slots = self.price_slots
+        heat = self.heat_cost.at(current_hour) if self.heat_cost.active else None
+        longterm = self._longterm_percentiles(spot_price if spot_price is not None else current_price)
+        percentile_7d, percentile_30d = longterm[7], longterm[30]
 
-        sg_mode = MODE_NORMAL
-        reason = ""
-        confidence = 0
-        temp_override_active = False
-        ai_override_active = False
+        # ── BESLUTSLOGIK ─────────────────────────────────────────────────────
+        # P0 → P1–P4 → POST-1 (se pipeline.py); AI/manuell override låser läget för prissteget
 
-        # P0: AI OVERRIDE (högsta prioritet)
         effective_ai_mode = self.ai_mode  # Kontrollerar utgångstid
-        if self._manual_override:
-            sg_mode = MODE_BOOST
-            reason = "⚡ Manuell boost-override"
-            confidence = 100
-        elif effective_ai_mode == AI_MODE_FORCE_BOOST:
-            sg_mode = MODE_BOOST
-            reason = f"🤖 AI: {self._ai_reason}" if self._ai_reason else "⚡ Manuell överstyrning: boost"
-            confidence = 100
-            ai_override_active = True
-        elif effective_ai_mode == AI_MODE_FORCE_NORMAL:
-            sg_mode = MODE_NORMAL
-            reason = f"🤖 AI: {self._ai_reason}" if self._ai_reason else "🏠 Manuell överstyrning: normal"
-            confidence = 100
-            ai_override_active = True
-        elif effective_ai_mode == AI_MODE_FORCE_BLOCK:
-            sg_mode = MODE_BLOCK
-            reason = f"🤖 AI: {self._ai_reason}" if self._ai_reason else "🔒 Manuell överstyrning: block"
-            confidence = 100
-            ai_override_active = True
-
-        # P1–P4: Normal algoritm
-        elif insignificant_spread:
-            sg_mode = MODE_NORMAL
-            reason = f"Minimal prisspridning ({price_spread * 100:.0f} öre)"
-            confidence = 85
-        elif current_price < EXTREME_LOW:
-            sg_mode = MODE_BOOST
-            reason = "⚡ Extremt lågt pris (<10 öre)"
-            confidence = 100
-        elif current_price > EXTREME_HIGH:
-            sg_mode = MODE_BLOCK
-            reason = "⚠️ Extremt högt pris (>5 kr)"
-            confidence = 100
-        elif price_percentile <= boost_percentile:
-            sg_mode = MODE_BOOST
-            reason = f"Låg percentil P{price_percentile:.0f} (billigaste {self.boost_pct:.0f}%)"
-            confidence = 85
-        elif price_percentile >= block_percentile:
-            sg_mode = MODE_BLOCK
-            reason = f"Hög percentil P{price_percentile:.0f} (dyraste {self.block_pct:.0f}%)"
-            confidence = 85
-        else:
-            sg_mode = MODE_NORMAL
-            reason = f"Normalläge P{price_percentile:.0f}"
-            confidence = 75
-
-        # POST-1: Production override (ersätter bara block, ej vid AI-override)
-        prod_override_active = False
-        if not ai_override_active:
-            sg_mode, reason, prod_override_active = self._check_production_override(sg_mode, reason)
-            if prod_override_active:
-                confidence = 95
-
-        # POST-2: Temperaturskydd (förhindrar bara block, ej vid AI/prod-override)
-        indoor_temp = self._get_indoor_temp()
-        if not ai_override_active and not prod_override_active and indoor_temp is not None and indoor_temp < self.min_temp and sg_mode == MODE_BLOCK:
-            sg_mode = MODE_NORMAL
-            reason = f"🌡 Temp för låg ({indoor_temp:.1f}°C < {self.min_temp}°C) — förhindrar block"
-            confidence = 95
-            temp_override_active = True
-
-        # POST-3: Tariff blockerar boost globalt (sista steget, efter alla overrides)
-        tariff_blocked = False
-        if sg_mode == MODE_BOOST and not ai_override_active:
-            tariff_entity = _conf(self.entry, CONF_TARIFF_ENTITY)
-            if tariff_entity:
-                t_state = self.hass.states.get(tariff_entity)
-                if t_state and t_state.state in ("on", "true", "1", "active"):
-                    sg_mode = MODE_NORMAL
-                    reason = "⏰ Tariff aktiv — boost blockerad"
-                    tariff_blocked = True
-
-        # Sänk confidence om imorgondagens priser saknas sent
-        if not has_tomorrow and current_hour >= 18:
-            confidence = max(50, confidence - 10)
-            reason += " [begränsad data]"
-        elif not has_tomorrow:
-            confidence = max(55, confidence - 5)
-
-        _LOGGER.info("SG Ready: %s | %s | conf=%d%%", sg_mode.upper(), reason, confidence)
+        sell_surplus = self._sell_surplus(export_price, block_threshold)
+        verdict = self._base_pipeline.run(Verdict(), StageInput(
+            params=self,
+            ai_mode=effective_ai_mode,
+            ai_reason=self.ai_reason,
+            manual_override=self._manual_override,
+            ctx=ctx,
+            longterm=longterm,
+            sell=sell_surplus,
+            production=lambda mode, reason, sell: self._check_production_override(mode, reason, sell=sell),
+        ), self.metrics.observe_stage)
+        grid = self._grid_power() if self.power.sources else None   # bara kvaliteten visas — värdet ändras hela tiden
+
+        base = Decision(
+            mode=verdict.mode,
+            reason=verdict.reason,
+            confidence=verdict.confidence,
+            hour=current_hour,
+            current_price=current_price,
+            spot_price=spot_price,
+            export_price=round(export_price, 4) if export_price is not None else None,
+            price_source=slots.source if slots else None,
+            price_updated=slots.updated.isoformat() if slots else None,
+            outdoor_temp=heat["outdoor_temp"] if heat else None,
+            cop=heat["cop"] if heat else None,
+            heat_cost=heat["heat_cost"] if heat else None,
+            price_percentile=round(price_percentile, 1),
+            price_vs_avg_pct=round(price_vs_avg * 100, 1),
+            diff_from_avg_ore=round(diff_from_avg * 100, 1),
+            price_spread=round(ctx.price_spread, 3),
+            spread_pct=round((ctx.price_spread / window_avg * 100) if window_avg else 0, 1),
+            insignificant_spread=ctx.insignificant_spread,
+            boost_threshold=round(boost_threshold, 3) if boost_threshold else None,
+            block_threshold=round(block_threshold, 3) if block_threshold else None,
+            window_size=ctx.window_size,
+            window_avg=round(window_avg, 3) if window_avg else None,
+            window_min=round(ctx.window_min, 3) if ctx.window_min is not None else None,
+            window_max=round(ctx.window_max, 3) if ctx.window_max is not None else None,
+            has_tomorrow=ctx.has_tomorrow,
+            price_percentile_7d=round(percentile_7d, 1) if percentile_7d is not None else None,
+            price_percentile_30d=round(percentile_30d, 1) if percentile_30d is not None else None,
+            indoor_temp=None,
+            temp_override_active=False,
+            prod_override_active=verdict.production,
+            prod_override_mode=self._prod_state.get("mode"),
+            prod_override_in_hysteresis=self._prod_state.get("in_hysteresis", False),
+            prod_override_countdown=self._get_prod_countdown(),
+            prod_forecast_window=self._surplus_summary(),
+            sell_surplus=sell_surplus,
+            grid_power_quality=grid.quality if grid else None,
+            tariff_blocked=False,
+            ai_override_active=verdict.ai,
+            ai_mode=effective_ai_mode,
+            ai_reason=self.ai_reason,
+            ai_until=self.ai_until.isoformat() if self.ai_until else None,
+            ai_plan_windows=len(self._plan),
+            manual_override=self._manual_override,
+            boost_pct=self.boost_pct,
+            block_pct=self.block_pct,
+            min_temp=self.min_temp,
+        )
+
+        # Skuggläge — samma pipeline på samma indata, kandidatens parametrar och eget production-tillstånd
+        shadow = self.shadow_params
+        if shadow is not None:
+            def _shadow_production(mode: str, reason: str, sell: bool) -> tuple[str, str, bool]:
+                if self._shadow_prod_state is None:
+                    self._shadow_prod_state = dict(self._prod_state)
+                return self._check_production_override(mode, reason, shadow, self._shadow_prod_state, sell=sell)
+
+            shadow_verdict = self._base_pipeline.run(Verdict(), StageInput(
+                params=shadow,
+                ai_mode=effective_ai_mode,
+                ai_reason=self.ai_reason,
+                manual_override=self._manual_override,
+                ctx=ctx,
+                longterm=longterm,
+                sell=self._sell_surplus(export_price, ctx.thresholds(shadow.boost_pct, shadow.block_pct)[1]),
+                production=_shadow_production,
+            ))
+            self._shadow_base = base.replace(
+                mode=shadow_verdict.mode, reason=shadow_verdict.reason, prod_override_active=shadow_verdict.production,
+            )
+        return base
 
+    def _longterm_percentiles(self, price: float) -> dict[int, float | None]:
+        """Långsiktig kontext — var ligger priset bland de senaste 7/30 dygnen?"""
+        history = self._price_history
         return {
-            "mode": sg_mode,
-            "reason": reason,
-            "confidence": confidence,
-            "current_price": current_price,
-            "price_percentile": round(price_percentile, 1),
-            "price_vs_avg_pct": round(price_vs_avg * 100, 1),
-            "diff_from_avg_ore": round(diff_from_avg * 100, 1),
-            "price_spread": round(price_spread, 3),
-            "spread_pct": round((price_spread / window_avg * 100) if window_avg else 0, 1),
-            "insignificant_spread": insignificant_spread,
-            "boost_threshold": round(boost_threshold, 3) if boost_threshold else None,
-            "block_threshold": round(block_threshold, 3) if block_threshold else None,
-            "window_size": len(window),
-            "window_avg": round(window_avg, 3) if window_avg else None,
-            "window_min": round(window_stats["min"], 3) if window_stats else None,
-            "window_max": round(window_stats["max"], 3) if window_stats else None,
-            "has_tomorrow": has_tomorrow,
-            "indoor_temp": indoor_temp,
-            "temp_override_active": temp_override_active,
-            "prod_override_active": prod_override_active,
-            "prod_override_mode": self._prod_state.get("mode"),
-            "prod_override_in_hysteresis": self._prod_state.get("in_hysteresis", False),
-            "prod_override_countdown": self._get_prod_countdown(),
-            "tariff_blocked": tariff_blocked,
-            "ai_override_active": ai_override_active,
-            "ai_mode": effective_ai_mode,
-            "ai_reason": self._ai_reason,
-            "ai_until": self._ai_until.isoformat() if self._ai_until else None,
-            "manual_override": self._manual_override,
-            "boost_pct": self.boost_pct,
-            "block_pct": self.block_pct,
-            "min_temp": self.min_temp,
+            days: history.percentile(price, days) if history.days_available(days) >= LONGTERM_MIN_DAYS else None
+            for days in (7, 30)
         }
 
+    def _apply_post_stages(self, base: Decision, params=None) -> Decision:
+        """POST-2 (temperatur), POST-3 (tariff) och POST-4 (effekttopp) ovanpå ett cachat basbeslut.
+
+        Körs efter varje full beräkning och dessutom direkt när temperatur-,
+        tariff- eller (vid boost) elmätarentiteten ändras — utan att räkna om priser eller röra
+        production override-tillståndet. Steg som inte kan ändra läget läser inga entiteter.
+        `params` anges för skuggläget (kandidatens min_temp).
+        """
+        p = params if params is not None else self
+        verdict = self._post_pipeline.run(Verdict(
+            mode=base.mode,
+            reason=base.reason,
+            confidence=base.confidence,
+            manual=base.manual_override,
+            ai=base.ai_override_active,
+            production=base.prod_override_active,
+        ), StageInput(
+            params=p,
+            hour=base.hour,
+            has_tomorrow=base.has_tomorrow,
+            peak_enabled=self.peak_enabled,
+            peak_threshold_w=self._peaks.threshold_w,
+            tariff_active=self._tariff_active,
+            indoor_temp=self._get_indoor_temp,
+            peak_veto=self._peak_veto,
+        ), self.metrics.observe_stage if params is None else None)
+
+        fields = {**POST_FIELDS, **verdict.fields}
+        if "indoor_temp" not in verdict.fields:
+            fields["indoor_temp"] = self._get_indoor_temp()   # visas även när temperatursteget inte prövats
+        return base.replace(
+            mode=verdict.mode,
+            reason=verdict.reason,
+            confidence=verdict.confidence,
+            **fields,
+            peak_threshold_w=self._peaks.threshold_w if self.peak_enabled else None,
+            min_temp=p.min_temp,
+        )
+
+    def _tariff_active(self) -> bool:
+        tariff_entity = _conf(self.entry, CONF_TARIFF_ENTITY)
+        if not tariff_entity:
+            return False
+        t_state = self.hass.states.get(tariff_entity)
+        return bool(t_state) and t_state.state in ("on", "true", "1", "active")
+
     def _check_production_override(
-        self, original_mode: str, original_reason: str
+        self, original_mode: str, original_reason: str, params=None, state: dict | None = None,
+        sell: bool = False,
     ) -> tuple[str, str, bool]:
         """Production override — ersätter BARA 'block' vid eget överskott.
         
         Returnerar (new_mode, reason, override_active).
         Portat direkt från Node-RED 'Production Override Logic (med hysteres)'.
+        `params`/`state` anges för skuggläget — eget tillstånd, samma mätardata.
         """
+        p = params if params is not None else self   # live-inställningar (HA-sliders) som standard
+        live = state is None
         # Enabled?
         if not _conf(self.entry, CONF_PROD_ENABLED, True):
             return original_mode, original_reason, False
 
-        # Hämta config från live-inställningar (tweakbara via HA-sliders)
-        normal_threshold = self.prod_normal_threshold
-        boost_threshold = self.prod_boost_threshold
-        return_threshold = self.prod_return_threshold
-        hysteresis = self.prod_hysteresis
-        min_duration = self.prod_min_duration
-        off_delay = self.prod_off_delay
-
-        # Hämta mätardata
-        grid_entity = _conf(self.entry, CONF_GRID_POWER_ENTITY)
-        if not grid_entity:
-            return original_mode, original_reason, False
-
-        grid_state = self.hass.states.get(grid_entity)
-        if not grid_state or grid_state.state in ("unknown", "unavailable"):
-            return original_mode, original_reason, False
-
-        try:
-            meter_power = float(grid_state.state)
-        except ValueError:
+        # Hämta mätardata — alla källor måste ha färska värden (max_age, standard 5 min)
+        if not self.power.sources:
             return original_mode, original_reason, False
-
-        # Kontrollera att mätardata är färsk (max 5 min)
-        from homeassistant.util.dt import utcnow
-        last_updated = grid_state.last_updated
-        if (utcnow() - last_updated).total_seconds() > 300:
-            _LOGGER.warning("Gammal mätardata — production override inaktiv")
+        fused = self._grid_power()
+        if not fused.good:
+            if live and fused.quality == POWER_QUALITY_STALE:
+                _LOGGER.warning("Gammal mätardata (%s) — production override inaktiv", ", ".join(fused.degraded))
             return original_mode, original_reason, False
 
-        # Tariff-status
-        in_tariff_period = False
-        tariff_entity = _conf(self.entry, CONF_TARIFF_ENTITY)
-        if tariff_entity:
-            t_state = self.hass.states.get(tariff_entity)
-            if t_state:
-                in_tariff_period = t_state.state in ("on", "true", "1", "active")
-
-        # Hysteres-tröskel vid återgång
-        s = self._prod_state
-        deactivation_threshold = return_threshold + (hysteresis if s["active"] else 0)
-        now = datetime.now()
-        surplus = abs(meter_power)
-
-        if meter_power < normal_threshold:
-            # Tillräckligt överskott
-            if not s["active"]:
-                if s["start_time"] is None:
-                    s["start_time"] = now
-                duration = (now - s["start_time"]).total_seconds()
-                if duration >= min_duration:
-                    s["active"] = True
-                    s["last_change"] = now
-                    s["in_hysteresis"] = False
-                    # Välj läge
-                    if surplus >= abs(boost_threshold) and (not in_tariff_period or meter_power < 0):
-                        s["mode"] = MODE_BOOST
-                        s["tariff_limited"] = False
-                    elif surplus >= abs(boost_threshold):
-                        s["mode"] = MODE_NORMAL
-                        s["tariff_limited"] = True
-                    else:
-                        s["mode"] = MODE_NORMAL
-                        s["tariff_limited"] = False
-                    _LOGGER.info("Production override aktiverad: %s vid %dW", s["mode"], surplus)
-            else:
-                # Aktiv — uppdatera läge dynamiskt
-                s["in_hysteresis"] = False
-                s["last_change"] = now
-                if surplus >= abs(boost_threshold):
-                    if not in_tariff_period or meter_power < 0:
-                        if s["mode"] != MODE_BOOST:
-                            s["mode"] = MODE_BOOST
-                            s["tariff_limited"] = False
-                    elif s["mode"] == MODE_BOOST:
-                        s["mode"] = MODE_NORMAL
-                        s["tariff_limited"] = True
-                elif surplus >= abs(normal_threshold):
-                    if s["mode"] != MODE_NORMAL:
-                        s["mode"] = MODE_NORMAL
-                        s["tariff_limited"] = False
-
-        elif meter_power > deactivation_threshold:
-            # Över återgångströskel
-            s["start_time"] = None
-            if s["active"]:
-                if not s["in_hysteresis"]:
-                    s["in_hysteresis"] = True
-                    s["last_change"] = now
-                time_since = (now - s["last_change"]).total_seconds()
-                if time_since >= off_delay:
-                    s["active"] = False
-                    s["mode"] = None
-                    s["in_hysteresis"] = False
-                    s["tariff_limited"] = False
-                    _LOGGER.info("Production override inaktiverad efter %ds", off_delay)
-        else:
-            # Hysteres-zon
-            if not s["active"]:
-                s["start_time"] = None
-
-        # Applicera — ENDAST om original_mode är "block"
-        if s["active"] and s["mode"] and original_mode == MODE_BLOCK:
-            power_str = f"{surplus:.0f}W överskott" if meter_power < 0 else f"{meter_power:.0f}W import"
-            tariff_str = " (tariff-begränsad)" if s["tariff_limited"] else ""
-            reason = f"🔋 Egen produktion: {power_str} → {s['mode']}{tariff_str}"
-            return s["mode"], reason, True
-        elif s["active"] and s["mode"] and original_mode != MODE_BLOCK:
-            # Ursprungligt läge är inte block — låt vara
-            s["active"] = False
-            s["mode"] = None
-
-        return original_mode, original_reason, False
+        s = self._prod_state if live else state
+        was_active = s["active"]
+        result = production_step(
+            s, p, fused.power_w, self._tariff_active(), self.clock.monotonic(),
+            original_mode, original_reason, log=live, sell=sell,
+        )
+        if live and s["active"] != was_active:
+            self.metrics.prod_transitions["active" if s["active"] else "inactive"] += 1
+        return result
 
     def _get_prod_countdown(self) -> dict:
         """Returnerar nedräkningsstatus för production override (som Node-RED status-text)."""
-        s = self._prod_state
-        now = datetime.now()
-        min_duration = _conf(self.entry, CONF_PROD_MIN_DURATION, DEFAULT_PROD_MIN_DURATION)
-        off_delay = _conf(self.entry, CONF_PROD_OFF_DELAY, DEFAULT_PROD_OFF_DELAY)
-
-        if s["active"] and s["in_hysteresis"] and s["last_change"]:
-            time_left = off_delay - (now - s["last_change"]).total_seconds()
-            return {"state": "hysteresis", "seconds_left": max(0, round(time_left))}
-        elif not s["active"] and s["start_time"]:
-            duration = (now - s["start_time"]).total_seconds()
-            time_left = min_duration - duration
-            return {"state": "waiting", "seconds_left": max(0, round(time_left))}
-        elif s["active"]:
-            return {"state": "active", "seconds_left": 0}
-        return {"state": "passive", "seconds_left": 0}
+        return production_countdown(self._prod_state, self, self.clock.monotonic())
 
     def _get_indoor_temp(self) -> float | None:
         temp_entity = _conf(self.entry, CONF_TEMP_ENTITY)
@@ -660,7 +1629,32 @@ class SGReadyCoordinator(DataUpdateCoordinator):
         except ValueError:
             return None
 
-    async def _publish_mqtt(self, mode: str) -> None:
-        topic = _conf(self.entry, CONF_MQTT_TOPIC, DEFAULT_MQTT_TOPIC)
-        await mqtt.async_publish(self.hass, topic, mode, qos=1, retain=True)
-        _LOGGER.debug("MQTT → %s: %s", topic, mode)
+    # ── Utgång ──────────────────────────────────────────────────────────────
+
+    async def async_start_backend(self) -> None:
+        try:
+            await self.backend.async_start()
+        except Exception as err:
+            _LOGGER.warning("Utgången %s kunde inte starta: %s", self.backend.name, err)
+
+    async def async_stop_backend(self) -> None:
+        await self.backend.async_stop()
+
+    async def _send_mode(self, mode: str, track: bool = True) -> None:
+        """Skicka läget via vald utgång. `track=False` vid omsändning (skickas alltid)."""
+        backend = self.backend
+        if track and backend.publish_on_change and mode == self._sent_mode:
+            # Oförändrat — läs bara tillbaka och skicka igen om någon ändrat utgången
+            if not backend.can_confirm or await backend.async_read_back() in (mode, None):
+                return
+            _LOGGER.warning("Utgången %s står inte i %s — skickar igen", backend.name, mode)
+        await backend.async_send(mode)
+        self._sent_mode = mode
+        self.metrics.publishes[mode] += 1
+        _LOGGER.debug("%s → %s", backend.name, mode)
+        if track and self.confirms_actuation:
+            self._track_actuation(mode)
+        if backend.can_confirm:
+            state = await backend.async_read_back()
+            if state is not None:
+                self._on_reported_state(state)
@@ -0,0 +1,98 @@
+"""Beslutsresultat — oföränderligt och billigt att jämföra mellan refresh-cykler."""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields, replace
+
+from .const import AI_MODE_AUTO, MODE_NORMAL
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    """Ett SG Ready-beslut inklusive allt som entiteterna visar.
+
+    Standardvärdena är samtidigt felfallbacken — `Decision.fallback()` och
+    normalvägen bygger alltså alltid samma typ med samma fält.
+    """
+
+    mode: str
+    reason: str
+    confidence: int = 0
+    hour: int = 0
+    # Prisanalys
+    current_price: float = 0.0                     # importpris efter prismodellen (= spot utan modell)
+    spot_price: float | None = None
+    export_price: float | None = None
+    price_source: str | None = None                # prisleverantören som gav dagens priser
+    price_updated: str | None = None               # när källan senast fick ny data (ISO)
+    # Värmekostnad (elpris / COP) — rankningen görs på den när en utetemperaturprognos finns
+    outdoor_temp: float | None = None
+    cop: float | None = None
+    heat_cost: float | None = None                 # kr per kWh värme
+    price_percentile: float = 50.0
+    price_vs_avg_pct: float = 100.0
+    diff_from_avg_ore: float = 0.0
+    price_spread: float = 0.0
+    spread_pct: float = 0.0
+    insignificant_spread: bool = True
+    boost_threshold: float | None = None
+    block_threshold: float | None = None
+    # Fönster
+    window_size: int = 0
+    window_avg: float | None = None
+    window_min: float | None = None
+    window_max: float | None = None
+    has_tomorrow: bool = False
+    # Långsiktig kontext (kvantilskiss)
+    price_percentile_7d: float | None = None
+    price_percentile_30d: float | None = None
+    # Temperatur / tariff
+    indoor_temp: float | None = None
+    temp_override_active: bool = False
+    tariff_blocked: bool = False
+    # Effekttopp
+    peak_vetoed: bool = False
+    peak_threshold_w: float | None = None
+    peak_projected_w: float | None = None
+    # Production override
+    prod_override_active: bool = False
+    prod_override_mode: str | None = None
+    prod_override_in_hysteresis: bool = False
+    prod_override_countdown: dict | None = None
+    sell_surplus: bool = False                     # exportpriset slår blockgränsen — överskottet säljs
+    prod_forecast_window: dict | None = None       # pågående/nästa prognostiserade överskottsfönster
+    # Elmätare (fusionerad nettoeffekt)
+    grid_power_quality: str | None = None
+    # AI / manuell override
+    ai_override_active: bool = False
+    ai_mode: str = AI_MODE_AUTO
+    ai_reason: str = ""
+    ai_until: str | None = None
+    ai_plan_windows: int = 0
+    manual_override: bool = False
+    # Konfiguration
+    boost_pct: float = 0.0
+    block_pct: float = 0.0
+    min_temp: float = 0.0
+
+    @classmethod
+    def fallback(cls, reason: str, **config) -> Decision:
+        """Normal-läge med neutrala värden — används vid beräkningsfel."""
+        return cls(mode=MODE_NORMAL, reason=reason, **config)
+
+    def replace(self, **changes) -> Decision:
+        return replace(self, **changes)
+
+    def diff(self, other: Decision | None) -> frozenset[str]:
+        """Namn på fält som skiljer sig från `other` (alla fält om `other` saknas)."""
+        if other is None:
+            return ALL_FIELDS
+        return frozenset(
+            name for name in _FIELD_NAMES if getattr(self, name) != getattr(other, name)
+        )
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+_FIELD_NAMES = tuple(f.name for f in fields(Decision))
+ALL_FIELDS = frozenset(_FIELD_NAMES)
@@ -0,0 +1,155 @@
+"""Energi- och kostnadsbokföring — nettoeffekt × timpris, inkrementellt per mätvärde."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from .const import MODE_BOOST, MODE_NORMAL, MODE_BLOCK, ENERGY_MAX_GAP_SECONDS, ENERGY_NOTIFY_SECONDS
+
+_MODES = (MODE_BOOST, MODE_NORMAL, MODE_BLOCK)
+_TOTALS = (
+    "import_kwh", "export_kwh", "import_cost", "export_revenue",
+    "priced_import_kwh", "unpriced_kwh", "price_hours", "price_sum",
+)
+
+
+def _slot_start(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+class EnergyLedger:
+    """Integrerar nettoeffekten med sample-and-hold och prissätter per timslot.
+
+    Som i PeakTracker antas effekten från förra samplet gälla fram till nästa,
+    men högst ENERGY_MAX_GAP_SECONDS — resten av en längre lucka räknas som
+    okänd tid och bokförs inte. Ett oförändrat värde ger ingen ny händelse i
+    HA, så koordinatorn samplar även periodiskt. `None` (mätaren otillgänglig
+    eller inaktuell) bryter hållet. Intervallet delas vid timgränser (varje
+    del får sin timmes pris, räknat i UTC); importen fördelas även per
+    gällande SG Ready-läge.
+
+    Kostnaden jämförs med vad samma import hade kostat till tidsviktat
+    medelpris (`savings`) — ett ärligt mått på vad styrningen flyttat.
+    """
+
+    def __init__(self) -> None:
+        self.import_kwh = 0.0
+        self.export_kwh = 0.0
+        self.import_cost = 0.0
+        self.export_revenue = 0.0
+        self.priced_import_kwh = 0.0
+        self.unpriced_kwh = 0.0       # energi under timmar utan känt pris
+        self.price_hours = 0.0        # bokförd tid med känt pris …
+        self.price_sum = 0.0          # … och pris × timmar (för tidsviktat medelpris)
+        self.mode_kwh = dict.fromkeys(_MODES, 0.0)   # import per gällande läge
+        self.gaps = 0
+        self._last_ts: datetime | None = None
+        self._last_w: float | None = None
+        self._last_mode: str | None = None
+        self._notified: datetime | None = None
+        self._listeners: list[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def add_sample(
+        self, power_w: float | None, ts: datetime, mode: str | None,
+        price_at: Callable[[datetime, bool], float | None],
+    ) -> bool:
+        """Registrera ett sample (W, positivt = import). `price_at(timstart, export)` ger import-
+        respektive exportpriset per kWh.
+
+        Returnerar True när lyssnarna notifierats (högst var ENERGY_NOTIFY_SECONDS) — spara då.
+        """
+        ts = ts.astimezone(timezone.utc)
+        if self._last_ts is not None and ts <= self._last_ts:
+            return False   # äldre eller samma sample
+        if self._last_ts is not None and self._last_w is not None:
+            end = min(ts, self._last_ts + timedelta(seconds=ENERGY_MAX_GAP_SECONDS))
+            if end < ts:
+                self.gaps += 1
+            self._integrate(self._last_ts, self._last_w, end, self._last_mode, price_at)
+        self._last_ts = ts
+        self._last_w = power_w
+        self._last_mode = mode
+        if self._notified is None or (ts - self._notified).total_seconds() >= ENERGY_NOTIFY_SECONDS:
+            self._notified = ts
+            self._notify()
+            return True
+        return False
+
+    def _integrate(
+        self, t0: datetime, power_w: float, t1: datetime, mode: str | None,
+        price_at: Callable[[datetime, bool], float | None],
+    ) -> None:
+        """Bokför `power_w` hållen från t0 till t1, delad vid timgränser."""
+        points = [t0]
+        boundary = _slot_start(t0) + timedelta(hours=1)
+        while boundary < t1:
+            points.append(boundary)
+            boundary += timedelta(hours=1)
+        points.append(t1)
+        for a, b in zip(points, points[1:]):
+            hours = (b - a).total_seconds() / 3600
+            kwh = power_w * hours / 1000
+            slot = _slot_start(a)
+            price = price_at(slot, False)
+            if price is None:
+                self.unpriced_kwh += abs(kwh)
+            else:
+                self.price_hours += hours
+                self.price_sum += price * hours
+            if kwh > 0:
+                self.import_kwh += kwh
+                if mode in self.mode_kwh:
+                    self.mode_kwh[mode] += kwh
+                if price is not None:
+                    self.import_cost += kwh * price
+                    self.priced_import_kwh += kwh
+            elif kwh < 0:
+                self.export_kwh -= kwh
+                export_price = price_at(slot, True)
+                if export_price is not None:
+                    self.export_revenue -= kwh * export_price
+
+    @property
+    def average_price(self) -> float | None:
+        """Tidsviktat medelpris över bokförd tid."""
+        return self.price_sum / self.price_hours if self.price_hours else None
+
+    @property
+    def savings(self) -> float | None:
+        """Importen till tidsviktat medelpris minus faktisk kostnad (positivt = styrningen sparade)."""
+        average = self.average_price
+        if average is None:
+            return None
+        return self.priced_import_kwh * average - self.import_cost
+
+    def as_dict(self) -> dict:
+        return {
+            **{key: getattr(self, key) for key in _TOTALS},
+            "mode_kwh": dict(self.mode_kwh),
+            "gaps": self.gaps,
+            "last_ts": self._last_ts.isoformat() if self._last_ts else None,
+            "last_w": self._last_w,
+            "last_mode": self._last_mode,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> EnergyLedger:
+        ledger = cls()
+        for key in _TOTALS:
+            setattr(ledger, key, float(data.get(key, 0.0)))
+        ledger.mode_kwh.update({mode: float(kwh) for mode, kwh in data.get("mode_kwh", {}).items() if mode in _MODES})
+        ledger.gaps = int(data.get("gaps", 0))
+        # Senaste samplet överbryggar en kort omstart (längre luckor bokförs inte)
+        if data.get("last_ts"):
+            ledger._last_ts = datetime.fromisoformat(data["last_ts"])
+            ledger._last_w = data.get("last_w")
+            ledger._last_mode = data.get("last_mode")
+        return ledger
@@ -0,0 +1,153 @@
+"""Beslutskärna — prisfönster, statistik och P1–P4 utan beroende till Home Assistant.
+
+Används av koordinatorn och av den fristående flottgatewayen (`fleet/`).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+from .const import (
+    MODE_BOOST, MODE_NORMAL, MODE_BLOCK,
+    MIN_SPREAD_TO_ACT, PRICE_ROUND_TO, EXTREME_LOW, EXTREME_HIGH,
+    LONGTERM_BLOCK_MIN_PCT, LONGTERM_BOOST_MAX_PCT,
+)
+
+
+def round_price(p: float) -> float:
+    return round(p * 100 / (PRICE_ROUND_TO * 100)) * PRICE_ROUND_TO
+
+
+def calculate_stats(prices: list[float]) -> dict | None:
+    valid = [p for p in prices if p is not None and not math.isnan(p)]
+    if not valid:
+        return None
+    n = len(valid)
+    avg = sum(valid) / n
+    sorted_p = sorted(valid)
+    variance = sum((x - avg) ** 2 for x in valid) / n
+    return {
+        "avg": avg,
+        "min": min(valid),
+        "max": max(valid),
+        "std": math.sqrt(variance),
+        "median": sorted_p[n // 2],
+        "count": n,
+        "sorted": sorted_p,
+    }
+
+
+def build_window(today, tomorrow, current_hour, perspective_hours=24):
+    hours_back = perspective_hours // 2
+    hours_forward = perspective_hours - hours_back
+    has_tomorrow = bool(tomorrow)
+    window = []
+
+    for i in range(hours_back, 0, -1):
+        h = current_hour - i
+        if 0 <= h < len(today) and today[h] is not None:
+            window.append(float(today[h]))
+
+    if current_hour < len(today) and today[current_hour] is not None:
+        window.append(float(today[current_hour]))
+
+    for i in range(1, hours_forward):
+        h = current_hour + i
+        if h < 24 and h < len(today) and today[h] is not None:
+            window.append(float(today[h]))
+        elif h >= 24 and has_tomorrow:
+            th = h - 24
+            if th < len(tomorrow) and tomorrow[th] is not None:
+                window.append(float(tomorrow[th]))
+
+    return window, has_tomorrow
+
+
+@dataclass(frozen=True, slots=True)
+class PriceContext:
+    """Prisanalysen för en timme — oberoende av boost/block-procent, alltså delbar
+    mellan parameteruppsättningar (skuggläge) och mellan anläggningar i samma elområde."""
+
+    hour: int
+    current_price: float
+    spot_price: float               # P2:s extremgränser gäller spotpriset, inte importpriset
+    price_percentile: float
+    price_spread: float
+    insignificant_spread: bool
+    rounded_window: tuple[float, ...]
+    window_avg: float | None
+    window_min: float | None
+    window_max: float | None
+    has_tomorrow: bool
+
+    @property
+    def window_size(self) -> int:
+        return len(self.rounded_window)
+
+    def thresholds(self, boost_pct: float, block_pct: float) -> tuple[float | None, float | None]:
+        """Prisgränserna för boost/block i fönstret (för visning)."""
+        window = self.rounded_window
+        if not window:
+            return None, None
+        boost_idx = min(math.floor(len(window) * boost_pct / 100), len(window) - 1)
+        block_idx = min(math.floor(len(window) * (100 - block_pct) / 100), len(window) - 1)
+        return window[boost_idx], window[block_idx]
+
+
+def price_context(today: list, tomorrow: list, hour: int, spot: float | None = None) -> PriceContext:
+    """Prisanalysen för timmen `hour`. `spot` är timmens spotpris när `today` är
+    importpriser efter en prismodell; utan den är prisvektorn spotpris."""
+    window, has_tomorrow = build_window(today, tomorrow, hour)
+    stats = calculate_stats(window)
+    current_price = float(today[hour]) if hour < len(today) else 0.0
+
+    price_percentile = 50.0
+    rounded_window: tuple[float, ...] = ()
+    if stats and window:
+        rounded_current = round_price(current_price)
+        rounded_window = tuple(round_price(p) for p in stats["sorted"])
+        lower_count = sum(1 for p in rounded_window if p < rounded_current)
+        price_percentile = (lower_count / len(rounded_window)) * 100
+
+    price_spread = (stats["max"] - stats["min"]) if stats else 0
+    return PriceContext(
+        hour=hour,
+        current_price=current_price,
+        spot_price=current_price if spot is None else float(spot),
+        price_percentile=price_percentile,
+        price_spread=price_spread,
+        insignificant_spread=price_spread < MIN_SPREAD_TO_ACT,
+        rounded_window=rounded_window,
+        window_avg=stats["avg"] if stats else None,
+        window_min=stats["min"] if stats else None,
+        window_max=stats["max"] if stats else None,
+        has_tomorrow=has_tomorrow,
+    )
+
+
+def classify_price(p, ctx: PriceContext, longterm: dict | None = None) -> tuple[str, str, int]:
+    """P1–P4 för parameteruppsättningen `p` (boost_pct, block_pct, longterm_days).
+
+    Returnerar (läge, orsak, confidence). `longterm` mappar 7/30 → percentil.
+    """
+    price_percentile = ctx.price_percentile
+    boost_percentile = p.boost_pct
+    block_percentile = 100 - p.block_pct
+    longterm_percentile = (longterm or {}).get(p.longterm_days)
+    if ctx.insignificant_spread:
+        return MODE_NORMAL, f"Minimal prisspridning ({ctx.price_spread * 100:.0f} öre)", 85
+    if ctx.spot_price < EXTREME_LOW:
+        return MODE_BOOST, "⚡ Extremt lågt spotpris (<10 öre)", 100
+    if ctx.spot_price > EXTREME_HIGH:
+        return MODE_BLOCK, "⚠️ Extremt högt spotpris (>5 kr)", 100
+    if price_percentile <= boost_percentile:
+        if longterm_percentile is not None and longterm_percentile >= LONGTERM_BOOST_MAX_PCT:
+            return MODE_NORMAL, (f"Låg percentil P{price_percentile:.0f} men dyrt över "
+                                 f"{p.longterm_days} dygn (P{longterm_percentile:.0f})"), 70
+        return MODE_BOOST, f"Låg percentil P{price_percentile:.0f} (billigaste {p.boost_pct:.0f}%)", 85
+    if price_percentile >= block_percentile:
+        if longterm_percentile is not None and longterm_percentile < LONGTERM_BLOCK_MIN_PCT:
+            return MODE_NORMAL, (f"Hög percentil P{price_percentile:.0f} men billigt över "
+                                 f"{p.longterm_days} dygn (P{longterm_percentile:.0f})"), 70
+        return MODE_BLOCK, f"Hög percentil P{price_percentile:.0f} (dyraste {p.block_pct:.0f}%)", 85
+    return MODE_NORMAL, f"Normalläge P{price_percentile:.0f}", 75
@@ -0,0 +1,161 @@
+"""Solprognos — förväntade överskottsfönster för production override, utan beroende till Home Assistant.
+
+Prognosen (W per tidpunkt) kommer från en entitets attribut eller en lokal
+JSON-fil i något av formaten
+
+    {"watts": {"2026-05-01T10:00:00+02:00": 2400, …}}        Forecast.Solar / Open-Meteo
+    [{"period_start": "2026-05-01T10:00:00+02:00", "pv_estimate": 2.4}, …]   Solcast (kW)
+    {"2026-05-01T10:00:00+02:00": 2400, …}
+
+och medelvärdesbildas per timslot — samma upplösning som prisvektorn.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, tzinfo
+
+from .const import MODE_BOOST, MODE_NORMAL
+
+
+def _points(data) -> list[tuple[object, object]]:
+    if isinstance(data, dict) and "watts" in data:
+        data = data["watts"]
+    if isinstance(data, dict):
+        return list(data.items())
+    if not isinstance(data, list):
+        raise ValueError("Prognosen måste vara ett objekt eller en lista")
+    points = []
+    for item in data:
+        if not isinstance(item, dict):
+            raise ValueError("Prognospunkter måste vara objekt")
+        moment = item.get("period_start", item.get("start", item.get("time")))
+        if "pv_estimate" in item:
+            try:
+                points.append((moment, float(item["pv_estimate"]) * 1000))   # kW
+            except (TypeError, ValueError) as err:
+                raise ValueError(f"Ogiltig prognospunkt: {item!r}") from err
+        else:
+            points.append((moment, item.get("watts", item.get("power"))))
+    return points
+
+
+def parse_forecast(data, tz: tzinfo) -> dict[datetime, float]:
+    """Prognos → {timstart i lokal tid: medeleffekt i W}. Kastar ValueError."""
+    buckets: dict[datetime, list[float]] = {}
+    for raw, watts in _points(data):
+        try:
+            moment = raw if isinstance(raw, datetime) else datetime.fromisoformat(str(raw))
+            watts = float(watts)
+        except (TypeError, ValueError) as err:
+            raise ValueError(f"Ogiltig prognospunkt: {raw!r}") from err
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=tz)
+        slot = moment.astimezone(tz).replace(minute=0, second=0, microsecond=0)
+        buckets.setdefault(slot, []).append(max(watts, 0.0))
+    return {slot: sum(values) / len(values) for slot, values in sorted(buckets.items())}
+
+
+def merge_forecasts(*forecasts: dict[datetime, float]) -> dict[datetime, float]:
+    """Summera flera prognoser (t.ex. Solcast idag + imorgon, eller två anläggningar)."""
+    merged: dict[datetime, float] = {}
+    for forecast in forecasts:
+        for slot, watts in forecast.items():
+            merged[slot] = merged.get(slot, 0.0) + watts
+    return dict(sorted(merged.items()))
+
+
+@dataclass(frozen=True, slots=True)
+class SurplusWindow:
+    """Sammanhängande timmar där prognosen ger samma production override-läge."""
+
+    start: datetime
+    end: datetime
+    mode: str
+    surplus_w: float      # förväntat medelöverskott (export) i W
+    price: float          # medelpris — vad överskottet annars säljs för
+
+    def contains(self, now: datetime) -> bool:
+        return self.start <= now < self.end
+
+    def as_dict(self) -> dict:
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "mode": self.mode,
+            "surplus_w": round(self.surplus_w),
+            "price": round(self.price, 3),
+        }
+
+
+def expected_mode(meter_power: float, p) -> str | None:
+    """Läget production_step skulle välja vid `meter_power` (utan tariff), None = inget överskott."""
+    if meter_power >= p.prod_normal_threshold:
+        return None
+    return MODE_BOOST if abs(meter_power) >= abs(p.prod_boost_threshold) else MODE_NORMAL
+
+
+def surplus_windows(
+    forecast: dict[datetime, float], base_load_w: float, p, prices: list[float], day: date, tz: tzinfo,
+) -> list[SurplusWindow]:
+    """Överskottsfönster för timmarna i `prices` (idag + imorgon, index 0 = `day` 00:00).
+
+    Förväntad mätareffekt = base_load_w − prognos (negativt = export) jämförs
+    med samma trösklar som production_step. Timmar utan prognos bryter fönstret.
+    """
+    windows: list[SurplusWindow] = []
+    run: list[tuple[datetime, str, float, float]] = []
+
+    def close() -> None:
+        if run:
+            windows.append(SurplusWindow(
+                start=run[0][0],
+                end=run[-1][0] + timedelta(hours=1),
+                mode=run[0][1],
+                surplus_w=sum(item[2] for item in run) / len(run),
+                price=sum(item[3] for item in run) / len(run),
+            ))
+            run.clear()
+
+    for index, price in enumerate(prices):
+        start = datetime.combine(day + timedelta(days=index // 24), time(index % 24), tz)
+        watts = forecast.get(start)
+        mode = expected_mode(base_load_w - watts, p) if watts is not None else None
+        if run and mode != run[-1][1]:
+            close()
+        if mode is not None:
+            run.append((start, mode, watts - base_load_w, price))
+    close()
+    return windows
+
+
+class SurplusPlan:
+    """Planerade överskottsfönster — räknas bara om när prognos, priser eller trösklar ändrats."""
+
+    def __init__(self) -> None:
+        self.windows: list[SurplusWindow] = []
+        self._key: tuple | None = None
+
+    def update(
+        self, forecast: dict[datetime, float], base_load_w: float, p,
+        today: list[float], tomorrow: list[float], day: date, tz: tzinfo,
+    ) -> bool:
+        """Planera om vid ändrade indata. Returnerar True om planen räknades om."""
+        key = (
+            day, tuple(today), tuple(tomorrow), tuple(forecast.items()),
+            base_load_w, p.prod_normal_threshold, p.prod_boost_threshold,
+        )
+        if key == self._key:
+            return False
+        self._key = key
+        self.windows = surplus_windows(forecast, base_load_w, p, today + tomorrow, day, tz)
+        return True
+
+    def active(self, now: datetime) -> SurplusWindow | None:
+        return next((window for window in self.windows if window.contains(now)), None)
+
+    def upcoming(self, now: datetime) -> SurplusWindow | None:
+        """Pågående eller nästa fönster."""
+        return next((window for window in self.windows if now < window.end), None)
+
+    def next_start(self, now: datetime) -> datetime | None:
+        return next((window.start for window in self.windows if window.start > now), None)
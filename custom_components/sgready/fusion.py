@@ -0,0 +1,100 @@
+"""Effektfusion — flera mätare/faser till en nettoeffekt med kvalitetsflagga."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from .const import (
+    DEFAULT_POWER_MAX_AGE, POWER_QUALITY_GOOD, POWER_QUALITY_STALE, POWER_QUALITY_MISSING,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class PowerSource:
+    """En effektkälla, t.ex. {"entity": "sensor.fas_l1"} eller {"entity": "sensor.solceller", "sign": -1}."""
+
+    entity_id: str
+    sign: float = 1.0                     # -1 för källor som ska dras av (separat solcellsmätare)
+    scale: float = 1.0                    # 1000 för sensorer i kW
+    max_age: float = DEFAULT_POWER_MAX_AGE  # sekunder innan senaste värdet räknas som inaktuellt
+
+    @classmethod
+    def from_dict(cls, data) -> PowerSource:
+        """Bygg från config-objekt (eller bara ett entitets-ID). Kastar ValueError vid ogiltiga värden."""
+        if isinstance(data, str):
+            data = {"entity": data}
+        if not isinstance(data, dict):
+            raise ValueError("Effektkälla måste vara ett objekt eller entitets-ID")
+        entity_id = str(data.get("entity", "")).strip()
+        if "." not in entity_id:
+            raise ValueError(f"Ogiltigt entitets-ID: {entity_id!r}")
+        try:
+            sign = float(data.get("sign", 1))
+            scale = float(data.get("scale", 1))
+            max_age = float(data.get("max_age", DEFAULT_POWER_MAX_AGE))
+        except (TypeError, ValueError) as err:
+            raise ValueError(f"{entity_id}: sign/scale/max_age måste vara tal") from err
+        if sign not in (1.0, -1.0) or scale <= 0 or max_age <= 0:
+            raise ValueError(f"{entity_id}: sign ska vara 1 eller -1, scale och max_age positiva")
+        return cls(entity_id=entity_id, sign=sign, scale=scale, max_age=max_age)
+
+
+@dataclass(frozen=True, slots=True)
+class FusedPower:
+    """Nettoeffekt vid en tidpunkt. `power_w` är None om någon källa saknar värde."""
+
+    power_w: float | None
+    quality: str
+    updated: datetime | None = None       # nyaste bidragande sample
+    oldest: datetime | None = None        # äldsta bidragande sample
+    degraded: tuple[str, ...] = ()        # källor som saknas eller är inaktuella
+
+    @property
+    def good(self) -> bool:
+        return self.quality == POWER_QUALITY_GOOD
+
+
+class PowerFusion:
+    """Summerar källornas senaste värden (last-value-hold) till en nettoeffekt.
+
+    Källorna samplas vid olika tidpunkter; varje värde hålls tills nästa
+    kommer, men högst källans `max_age`. Nettot är bara "good" när alla
+    källor har ett färskt värde — annars "stale" (värde finns men för
+    gammalt) eller "missing" (någon källa har inget värde alls).
+    """
+
+    def __init__(self, sources: list[PowerSource]) -> None:
+        self.sources = {source.entity_id: source for source in sources}
+        self._values: dict[str, tuple[float, datetime]] = {}
+
+    def update(self, entity_id: str, value: float | None, ts: datetime) -> None:
+        """Registrera ett värde (W före tecken/skala). None = källan otillgänglig."""
+        source = self.sources.get(entity_id)
+        if source is None:
+            return
+        if value is None:
+            self._values.pop(entity_id, None)
+            return
+        previous = self._values.get(entity_id)
+        if previous is not None and ts < previous[1]:
+            return   # äldre än det vi redan har
+        self._values[entity_id] = (value * source.scale * source.sign, ts)
+
+    def net(self, now: datetime) -> FusedPower:
+        if not self.sources:
+            return FusedPower(None, POWER_QUALITY_MISSING)
+        missing = [entity_id for entity_id in self.sources if entity_id not in self._values]
+        if missing:
+            return FusedPower(None, POWER_QUALITY_MISSING, degraded=tuple(missing))
+        stale = tuple(
+            entity_id for entity_id, (_, ts) in self._values.items()
+            if (now - ts).total_seconds() > self.sources[entity_id].max_age
+        )
+        timestamps = [ts for _, ts in self._values.values()]
+        return FusedPower(
+            power_w=sum(value for value, _ in self._values.values()),
+            quality=POWER_QUALITY_STALE if stale else POWER_QUALITY_GOOD,
+            updated=max(timestamps),
+            oldest=min(timestamps),
+            degraded=stale,
+        )
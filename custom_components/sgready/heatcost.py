@@ -0,0 +1,156 @@
+"""Värmekostnad — elpris / COP per timslot från en utetemperaturprognos, utan beroende till Home Assistant.
+
+En värmepump ger COP kWh värme per kWh el, och COP faller kraftigt med
+utetemperaturen. En billig timme vid −15 °C kan alltså ge dyrare värme än
+en något dyrare timme vid +5 °C. Prognosen (°C per tidpunkt) kommer från
+en väderentitet i något av formaten
+
+    [{"datetime": "2026-01-14T10:00:00+01:00", "temperature": -4.5}, …]   weather.get_forecasts
+    {"2026-01-14T10:00:00+01:00": -4.5, …}
+
+och medelvärdesbildas per timslot — samma upplösning som prisvektorn.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta, tzinfo
+
+
+class CopCurve:
+    """Styckvis linjär COP(utetemperatur), konstant utanför ytterpunkterna."""
+
+    def __init__(self, points: list[tuple[float, float]]) -> None:
+        self.points = sorted(points)
+        self._temps = [temp for temp, _ in self.points]
+
+    @classmethod
+    def from_dict(cls, data) -> CopCurve:
+        """Bygg från config, t.ex. {"-15": 2.0, "7": 3.9} eller [[-15, 2.0], [7, 3.9]]. Kastar ValueError."""
+        if isinstance(data, dict):
+            data = list(data.items())
+        if not isinstance(data, list):
+            raise ValueError("COP-kurvan måste vara ett objekt eller en lista med [temperatur, cop]")
+        points = []
+        for item in data:
+            if isinstance(item, dict):
+                item = (item.get("temp"), item.get("cop"))
+            try:
+                temp, cop = float(item[0]), float(item[1])
+            except (IndexError, KeyError, TypeError, ValueError) as err:
+                raise ValueError(f"Ogiltig COP-punkt: {item!r}") from err
+            if cop <= 0:
+                raise ValueError(f"COP måste vara positivt: {item!r}")
+            points.append((temp, cop))
+        if len(points) < 2 or len({temp for temp, _ in points}) != len(points):
+            raise ValueError("COP-kurvan kräver minst två punkter med olika temperatur")
+        return cls(points)
+
+    def cop(self, temp: float) -> float:
+        index = bisect_left(self._temps, temp)
+        if index == 0:
+            return self.points[0][1]
+        if index == len(self.points):
+            return self.points[-1][1]
+        (t0, c0), (t1, c1) = self.points[index - 1], self.points[index]
+        return c0 + (c1 - c0) * (temp - t0) / (t1 - t0)
+
+
+def parse_temperature_forecast(data, tz: tzinfo) -> dict[datetime, float]:
+    """Prognos → {timstart i lokal tid: medeltemperatur i °C}. Kastar ValueError."""
+    if isinstance(data, dict) and "forecast" in data:
+        data = data["forecast"]
+    if isinstance(data, dict):
+        points = list(data.items())
+    elif isinstance(data, list):
+        points = []
+        for item in data:
+            if not isinstance(item, dict):
+                raise ValueError("Prognospunkter måste vara objekt")
+            points.append((item.get("datetime", item.get("time")), item.get("temperature", item.get("temp"))))
+    else:
+        raise ValueError("Prognosen måste vara ett objekt eller en lista")
+    buckets: dict[datetime, list[float]] = {}
+    for raw, temp in points:
+        if temp is None:
+            continue
+        try:
+            moment = raw if isinstance(raw, datetime) else datetime.fromisoformat(str(raw))
+            temp = float(temp)
+        except (TypeError, ValueError) as err:
+            raise ValueError(f"Ogiltig prognospunkt: {raw!r}") from err
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=tz)
+        slot = moment.astimezone(tz).replace(minute=0, second=0, microsecond=0)
+        buckets.setdefault(slot, []).append(temp)
+    return {slot: sum(values) / len(values) for slot, values in sorted(buckets.items())}
+
+
+def slot_temperatures(forecast: dict[datetime, float], count: int, day: date, tz: tzinfo) -> list[float]:
+    """Temperatur för `count` timslots från `day` 00:00. Timmar utan prognos (t.ex. förflutna
+    timmar idag) får närmaste prognostiserade timmes värde."""
+    if not forecast:
+        return []
+    known = sorted(forecast.items())
+    starts = [slot for slot, _ in known]
+    temps = []
+    for index in range(count):
+        start = datetime.combine(day + timedelta(days=index // 24), time(index % 24), tz)
+        if start in forecast:
+            temps.append(forecast[start])
+            continue
+        pos = bisect_left(starts, start)
+        neighbours = [known[i] for i in (pos - 1, pos) if 0 <= i < len(known)]
+        temps.append(min(neighbours, key=lambda item: abs(item[0] - start))[1])
+    return temps
+
+
+class HeatCostPlan:
+    """COP och värmekostnad (pris / COP) per timslot — räknas bara om när prognos, priser eller kurva ändrats."""
+
+    def __init__(self) -> None:
+        self.temps: list[float] = []
+        self.cops: list[float] = []
+        self.cost_today: list[float] = []
+        self.cost_tomorrow: list[float] = []
+        self._key: tuple | None = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.cops)
+
+    def update(
+        self, forecast: dict[datetime, float], curve: CopCurve,
+        today: list[float], tomorrow: list[float], day: date, tz: tzinfo,
+    ) -> bool:
+        """Räkna om vid ändrade indata. Returnerar True om vektorn räknades om."""
+        key = (day, tuple(today), tuple(tomorrow), tuple(forecast.items()), tuple(curve.points))
+        if key == self._key:
+            return False
+        self._key = key
+        self.temps = slot_temperatures(forecast, len(today) + len(tomorrow), day, tz)
+        self.cops = [curve.cop(temp) for temp in self.temps]
+        costs = [price / cop for price, cop in zip(today + tomorrow, self.cops)]
+        self.cost_today, self.cost_tomorrow = costs[:len(today)], costs[len(today):]
+        return True
+
+    def ranking(self, today: list[float], tomorrow: list[float], hour: int) -> tuple[list[float], list[float]]:
+        """Priser omräknade till samma värmekostnad vid aktuell timmes COP.
+
+        Rangordningen är densamma som för pris / COP, men aktuell timme behåller
+        sitt elpris — extremgränser, spridning och blockgräns gäller i kr/kWh el.
+        """
+        if not self.active or hour >= len(today):
+            return today, tomorrow
+        reference = self.cops[hour]
+        ranked = [price * (reference / cop) for price, cop in zip(today + tomorrow, self.cops)]
+        return ranked[:len(today)], ranked[len(today):]
+
+    def at(self, hour: int) -> dict | None:
+        """Utetemperatur, COP och värmekostnad för timslot `hour` idag."""
+        if hour >= len(self.cost_today):
+            return None
+        return {
+            "outdoor_temp": round(self.temps[hour], 1),
+            "cop": round(self.cops[hour], 2),
+            "heat_cost": round(self.cost_today[hour], 4),
+        }
@@ -0,0 +1,565 @@
+"""Beslutsjournal — indata och utfall för varje beslut i fasta binärposter, utan beroende till Home Assistant.
+
+Filen är en följd av RECORD_SIZE-byteposter (little-endian). Första posten
+är ett huvud (magi, version, poststorlek); därefter prisposter (ett dygns
+importpriser efter prismodellen — det besluten rankade — skrivs när
+prisvektorn ändras) och beslutsposter (allt som
+`_calculate_mode` och POST-stegen läste, plus utfallet). Fast storlek gör
+att en läsare kan mmap:a filen och hoppa direkt till post i eller
+binärsöka på tid utan att tolka resten.
+
+`replay_decision` kör om beslutspipelinen (samma steg som koordinatorn,
+med postens avstängda steg) på en journalförd post — med samma eller
+ändrade parametrar — och talar om vilket steg som satte läget.
+"""
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .const import (
+    MODE_BOOST, MODE_NORMAL, MODE_BLOCK, AI_MODES,
+    POWER_QUALITY_GOOD, POWER_QUALITY_STALE, POWER_QUALITY_MISSING,
+    JOURNAL_RECORD_SIZE, JOURNAL_PRICES_PER_RECORD,
+)
+from .engine import price_context
+from .pipeline import (
+    BASE_STAGES, POST_STAGES, DataQualityStage, OverrideStage, PeakStage, Pipeline, PriceStage, ProductionStage,
+    StageInput, TariffStage, TemperatureStage, Verdict,
+)
+from .production import new_production_state, production_step
+from .shadow import ShadowParams
+
+MAGIC = b"SGRJ"
+VERSION = 1
+RECORD_SIZE = JOURNAL_RECORD_SIZE
+
+KIND_HEADER = 0
+KIND_PRICES = 1
+KIND_DECISION = 2
+
+STAGE_FULL = 1    # full omräkning (priser, production override, POST-2–4)
+STAGE_POST = 2    # bara POST-2–4 ovanpå cachat basbeslut
+
+_MODES = (None, MODE_BOOST, MODE_NORMAL, MODE_BLOCK)
+_QUALITIES = (None, POWER_QUALITY_GOOD, POWER_QUALITY_STALE, POWER_QUALITY_MISSING)
+
+_HEADER = struct.Struct("<B4sHHd")
+_KIND = struct.Struct("<Bxxxd")           # kind + ts — gemensamt prefix för alla poster
+_PRICES = struct.Struct(f"<BBxxdIHH{JOURNAL_PRICES_PER_RECORD}d")   # priser i full precision
+# kind, stage, hour, flaggor in | ts | dygn | ai, kvalitet, prod-läge före, longterm_days |
+# 9 parametrar | p7, p30, nät, inne, prod start-ålder, prod ändrings-ålder, topp prognos, topp tröskel |
+# läge, basläge, confidence, flaggor ut | flaggor in 2, spotpris, avstängda steg (noll i äldre poster)
+_DECISION = struct.Struct("<BBBBdIBBBB9f8fBBBBBdB")
+assert _DECISION.size <= RECORD_SIZE and _PRICES.size <= RECORD_SIZE
+
+# Flaggor in
+_IN_MANUAL = 1 << 0
+_IN_PROD_ENABLED = 1 << 1
+_IN_TARIFF = 1 << 2
+_IN_PEAK_ENABLED = 1 << 3
+_IN_PEAK_VETO = 1 << 4
+_IN_PROD_ACTIVE = 1 << 5
+_IN_PROD_HYSTERESIS = 1 << 6
+_IN_PROD_TARIFF_LIMITED = 1 << 7
+# Flaggor in 2
+_IN2_PROD_SELL = 1 << 0
+_IN2_HAS_SPOT = 1 << 1     # spotpriset är journalfört (äldre poster: P2 mot prisvektorn)
+# Flaggor ut
+_OUT_AI = 1 << 0
+_OUT_PROD = 1 << 1
+_OUT_TEMP = 1 << 2
+_OUT_TARIFF = 1 << 3
+_OUT_PEAK = 1 << 4
+_OUT_HAS_TOMORROW = 1 << 5
+# Avstängda steg, bit = position — nya steg läggs bara till sist
+_STAGE_BITS = (
+    OverrideStage.name, PriceStage.name, ProductionStage.name,
+    TemperatureStage.name, TariffStage.name, PeakStage.name, DataQualityStage.name,
+)
+
+_FLOAT_PARAMS = (
+    "boost_pct", "block_pct", "min_temp",
+    "prod_normal_threshold", "prod_boost_threshold", "prod_return_threshold",
+    "prod_hysteresis", "prod_min_duration", "prod_off_delay",
+)
+
+
+def _f(value: float | None) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _opt(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+def _age(now: float, ts: float | None) -> float:
+    return math.nan if ts is None else now - ts
+
+
+@dataclass(frozen=True, slots=True)
+class DecisionRecord:
+    """Ett besluts indata och utfall. Tider i production-tillståndet lagras som ålder i sekunder."""
+
+    ts: float                          # Unix-tid
+    stage: int
+    day: int                           # date.toordinal() för "idag" i prisvektorn
+    hour: int
+    params: ShadowParams
+    manual_override: bool
+    ai_mode: str
+    percentile_7d: float | None
+    percentile_30d: float | None
+    prod_enabled: bool
+    grid_power: float | None
+    grid_quality: str | None
+    tariff_active: bool
+    indoor_temp: float | None
+    prod_active: bool
+    prod_mode: str | None
+    prod_in_hysteresis: bool
+    prod_tariff_limited: bool
+    prod_start_age: float | None
+    prod_change_age: float | None
+    peak_enabled: bool
+    peak_veto: bool
+    peak_projected_w: float | None
+    peak_threshold_w: float | None
+    mode: str
+    base_mode: str
+    confidence: int
+    ai_override_active: bool
+    prod_override_active: bool
+    temp_override_active: bool
+    tariff_blocked: bool
+    peak_vetoed: bool
+    has_tomorrow: bool
+    prod_sell: bool = False            # exportpriset slog blockgränsen (prismodell)
+    spot_price: float | None = None    # timmens spotpris — P2 jämför mot det, inte mot importpriset
+    disabled_stages: frozenset[str] = frozenset()   # pipelinesteg som var avstängda
+
+    @staticmethod
+    def prod_fields(state: dict, now: float) -> dict:
+        """Production-tillståndet före steget som konstruktorargument (`now` monoton, som tillståndet)."""
+        return {
+            "prod_active": bool(state["active"]),
+            "prod_mode": state["mode"],
+            "prod_in_hysteresis": bool(state["in_hysteresis"]),
+            "prod_tariff_limited": bool(state.get("tariff_limited", False)),
+            "prod_start_age": _opt(_age(now, state["start_time"])),
+            "prod_change_age": _opt(_age(now, state["last_change"])),
+        }
+
+    def production_state(self, now: float) -> dict:
+        """Återskapa production-tillståndet som det var före steget, relativt monotona `now`."""
+        state = new_production_state()
+        state.update(
+            active=self.prod_active,
+            mode=self.prod_mode,
+            in_hysteresis=self.prod_in_hysteresis,
+            tariff_limited=self.prod_tariff_limited,
+            start_time=None if self.prod_start_age is None else now - self.prod_start_age,
+            last_change=None if self.prod_change_age is None else now - self.prod_change_age,
+        )
+        return state
+
+    @property
+    def time(self) -> datetime:
+        return datetime.fromtimestamp(self.ts, timezone.utc)
+
+    def pack_into(self, buffer, offset: int) -> None:
+        flags_in = (
+            (_IN_MANUAL if self.manual_override else 0)
+            | (_IN_PROD_ENABLED if self.prod_enabled else 0)
+            | (_IN_TARIFF if self.tariff_active else 0)
+            | (_IN_PEAK_ENABLED if self.peak_enabled else 0)
+            | (_IN_PEAK_VETO if self.peak_veto else 0)
+            | (_IN_PROD_ACTIVE if self.prod_active else 0)
+            | (_IN_PROD_HYSTERESIS if self.prod_in_hysteresis else 0)
+            | (_IN_PROD_TARIFF_LIMITED if self.prod_tariff_limited else 0)
+        )
+        flags_out = (
+            (_OUT_AI if self.ai_override_active else 0)
+            | (_OUT_PROD if self.prod_override_active else 0)
+            | (_OUT_TEMP if self.temp_override_active else 0)
+            | (_OUT_TARIFF if self.tariff_blocked else 0)
+            | (_OUT_PEAK if self.peak_vetoed else 0)
+            | (_OUT_HAS_TOMORROW if self.has_tomorrow else 0)
+        )
+        _DECISION.pack_into(
+            buffer, offset,
+            KIND_DECISION, self.stage, self.hour, flags_in,
+            self.ts, self.day,
+            AI_MODES.index(self.ai_mode), _QUALITIES.index(self.grid_quality),
+            _MODES.index(self.prod_mode), self.params.longterm_days,
+            *(float(getattr(self.params, name)) for name in _FLOAT_PARAMS),
+            _f(self.percentile_7d), _f(self.percentile_30d), _f(self.grid_power), _f(self.indoor_temp),
+            _f(self.prod_start_age), _f(self.prod_change_age), _f(self.peak_projected_w), _f(self.peak_threshold_w),
+            _MODES.index(self.mode), _MODES.index(self.base_mode), self.confidence, flags_out,
+            (_IN2_PROD_SELL if self.prod_sell else 0) | (_IN2_HAS_SPOT if self.spot_price is not None else 0),
+            _f(self.spot_price),
+            sum(1 << bit for bit, name in enumerate(_STAGE_BITS) if name in self.disabled_stages),
+        )
+
+    @classmethod
+    def unpack_from(cls, buffer, offset: int) -> DecisionRecord:
+        (
+            _, stage, hour, flags_in, ts, day, ai, quality, prod_mode, longterm_days, *rest,
+        ) = _DECISION.unpack_from(buffer, offset)
+        values, rest = rest[:9], rest[9:]
+        (p7, p30, grid, indoor, start_age, change_age, projected, threshold,
+         mode, base_mode, confidence, flags_out, flags_in2, spot, disabled) = rest
+        params = ShadowParams(longterm_days=longterm_days, **dict(zip(_FLOAT_PARAMS, values)))
+        return cls(
+            ts=ts, stage=stage, day=day, hour=hour, params=params,
+            manual_override=bool(flags_in & _IN_MANUAL),
+            ai_mode=AI_MODES[ai],
+            percentile_7d=_opt(p7), percentile_30d=_opt(p30),
+            prod_enabled=bool(flags_in & _IN_PROD_ENABLED),
+            grid_power=_opt(grid), grid_quality=_QUALITIES[quality],
+            tariff_active=bool(flags_in & _IN_TARIFF),
+            indoor_temp=_opt(indoor),
+            prod_active=bool(flags_in & _IN_PROD_ACTIVE),
+            prod_mode=_MODES[prod_mode],
+            prod_in_hysteresis=bool(flags_in & _IN_PROD_HYSTERESIS),
+            prod_tariff_limited=bool(flags_in & _IN_PROD_TARIFF_LIMITED),
+            prod_start_age=_opt(start_age), prod_change_age=_opt(change_age),
+            peak_enabled=bool(flags_in & _IN_PEAK_ENABLED),
+            peak_veto=bool(flags_in & _IN_PEAK_VETO),
+            peak_projected_w=_opt(projected), peak_threshold_w=_opt(threshold),
+            mode=_MODES[mode], base_mode=_MODES[base_mode], confidence=confidence,
+            ai_override_active=bool(flags_out & _OUT_AI),
+            prod_override_active=bool(flags_out & _OUT_PROD),
+            temp_override_active=bool(flags_out & _OUT_TEMP),
+            tariff_blocked=bool(flags_out & _OUT_TARIFF),
+            peak_vetoed=bool(flags_out & _OUT_PEAK),
+            has_tomorrow=bool(flags_out & _OUT_HAS_TOMORROW),
+            prod_sell=bool(flags_in2 & _IN2_PROD_SELL),
+            spot_price=spot if flags_in2 & _IN2_HAS_SPOT else None,
+            disabled_stages=frozenset(name for bit, name in enumerate(_STAGE_BITS) if disabled & (1 << bit)),
+        )
+
+
+def pack_prices(ts: float, day: int, prices: list[float]) -> bytes:
+    """Ett dygns priser som en eller flera poster (JOURNAL_PRICES_PER_RECORD per post)."""
+    out = bytearray()
+    total = len(prices)
+    for offset in range(0, max(total, 1), JOURNAL_PRICES_PER_RECORD):
+        chunk = [float(p) for p in prices[offset:offset + JOURNAL_PRICES_PER_RECORD]]
+        record = bytearray(RECORD_SIZE)
+        _PRICES.pack_into(
+            record, 0, KIND_PRICES, len(chunk), ts, day, offset, total,
+            *chunk, *([0.0] * (JOURNAL_PRICES_PER_RECORD - len(chunk))),
+        )
+        out += record
+    return bytes(out)
+
+
+def pack_decision(record: DecisionRecord) -> bytes:
+    buffer = bytearray(RECORD_SIZE)
+    record.pack_into(buffer, 0)
+    return bytes(buffer)
+
+
+def _header(ts: float) -> bytes:
+    buffer = bytearray(RECORD_SIZE)
+    _HEADER.pack_into(buffer, 0, KIND_HEADER, MAGIC, VERSION, RECORD_SIZE, ts)
+    return bytes(buffer)
+
+
+# ── Skrivning ──────────────────────────────────────────────────────────────
+
+class JournalWriter:
+    """Buffrade tillägg i minnet; `write` (blockerande, körs i executor) lägger till och roterar.
+
+    Roteras när filen passerar `max_bytes`: journal.bin → journal.bin.1 → … →
+    journal.bin.{keep}. Prisposterna som gällde vid buffertens första post
+    skrivs om först i varje ny fil så att varje fil kan spelas upp på egen
+    hand — även när bufferten spänner över ett prisbyte (t.ex. midnatt).
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int, keep: int) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self._buffer = bytearray()
+        self._prices = b""      # senaste prisposterna
+        self._head_prices = b""  # prisposterna som gällde när bufferten senast tömdes
+        self._prices_key = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def append_prices(self, ts: float, day: int, today: list[float], tomorrow: list[float]) -> None:
+        """Lägg till prisposter — bara när prisvektorn ändrats."""
+        key = (day, tuple(today), tuple(tomorrow))
+        if key == self._prices_key:
+            return
+        self._prices_key = key
+        data = pack_prices(ts, day, today)
+        if tomorrow:
+            data += pack_prices(ts, day + 1, tomorrow)
+        self._prices = data
+        self._buffer += data
+
+    def append_decision(self, record: DecisionRecord) -> None:
+        offset = len(self._buffer)
+        self._buffer += bytes(RECORD_SIZE)
+        record.pack_into(self._buffer, offset)
+
+    def take(self) -> tuple[bytes, bytes]:
+        """(poster, prisposterna som gällde före första posten) att skriva — bufferten töms."""
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        prices, self._head_prices = self._head_prices, self._prices
+        return data, prices
+
+    def write(self, data: bytes, prices: bytes = b"") -> None:
+        """Lägg till `data` sist i filen. Blockerande.
+
+        `prices` är prisposterna som gällde före `data`s första post; de
+        skrivs först i en ny fil efter rotation om `data` inte börjar med egna.
+        """
+        if not data:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+            size = 0
+            if prices and _KIND.unpack_from(data, 0)[0] != KIND_PRICES:
+                data = prices + data
+        with open(self.path, "r+b" if size else "wb") as fh:
+            if size:
+                aligned = size - size % RECORD_SIZE   # halvskriven post efter krasch
+                if aligned < RECORD_SIZE:
+                    aligned = 0
+                fh.truncate(aligned)
+                fh.seek(aligned)
+                size = aligned
+            if not size:
+                fh.write(_header(_KIND.unpack_from(data, 0)[1]))
+            fh.write(data)
+
+    def _rotate(self) -> None:
+        for index in range(self.keep, 0, -1):
+            source = self.path if index == 1 else self.path.with_name(f"{self.path.name}.{index - 1}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index}"))
+        if self.keep <= 0:
+            self.path.unlink(missing_ok=True)
+
+
+def journal_files(path: str | Path) -> list[Path]:
+    """Journalfilen och dess roterade föregångare, äldst först."""
+    path = Path(path)
+    rotated = sorted(
+        (p for p in path.parent.glob(f"{path.name}.*") if p.suffix[1:].isdigit()),
+        key=lambda p: int(p.suffix[1:]), reverse=True,
+    )
+    return rotated + ([path] if path.exists() else [])
+
+
+# ── Läsning ────────────────────────────────────────────────────────────────
+
+class JournalReader:
+    """mmap-läsare — post i ligger på (i + 1) * RECORD_SIZE, inget tolkas förrän det efterfrågas."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._fh = open(self.path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        if size < RECORD_SIZE:
+            self._fh.close()
+            raise ValueError(f"{self.path}: ingen journal")
+        self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        kind, magic, version, record_size, self.created = _HEADER.unpack_from(self._map, 0)
+        if kind != KIND_HEADER or magic != MAGIC or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{self.path}: okänt format")
+        if version > VERSION:
+            self.close()
+            raise ValueError(f"{self.path}: version {version} stöds inte")
+        self._count = size // RECORD_SIZE - 1   # halvskriven sista post ignoreras
+
+    def close(self) -> None:
+        self._map.close()
+        self._fh.close()
+
+    def __enter__(self) -> JournalReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offset(self, index: int) -> int:
+        return (index + 1) * RECORD_SIZE
+
+    def kind(self, index: int) -> int:
+        return self._map[self._offset(index)]
+
+    def ts(self, index: int) -> float:
+        return _KIND.unpack_from(self._map, self._offset(index))[1]
+
+    def decision(self, index: int) -> DecisionRecord:
+        return DecisionRecord.unpack_from(self._map, self._offset(index))
+
+    def prices(self, index: int) -> tuple[float, int, int, int, tuple[float, ...]]:
+        """(ts, dygn, offset, totalt, värden) för en prispost."""
+        _, count, ts, day, offset, total, *values = _PRICES.unpack_from(self._map, self._offset(index))
+        return ts, day, offset, total, tuple(values[:count])
+
+    def bisect(self, ts: float) -> int:
+        """Första posten med tid ≥ ts (posterna skrivs i tidsordning)."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def price_book(self, index: int) -> PriceBook:
+        """Priserna som gällde före post `index` — söker bakåt, inte hela filen."""
+        book = PriceBook()
+        seen: set[int] = set()
+        for i in range(index - 1, -1, -1):
+            if self.kind(i) != KIND_PRICES:
+                continue
+            ts, day, *_ = self.prices(i)
+            if day in seen:
+                continue
+            # Samla hela den senaste skrivningen av dygnet (poster med samma tid ligger intill)
+            j = i
+            while j > 0 and self.kind(j - 1) == KIND_PRICES and self.ts(j - 1) == ts:
+                j -= 1
+            for k in range(j, i + 1):
+                if self.prices(k)[1] == day:
+                    book.add(*self.prices(k))
+            seen.add(day)
+            if len(seen) >= 3:
+                break
+        return book
+
+    def records(self, start: int = 0, stop: int | None = None):
+        """(index, DecisionRecord, PriceBook) för beslutsposterna i [start, stop)."""
+        stop = self._count if stop is None else min(stop, self._count)
+        book = self.price_book(start)
+        for index in range(start, stop):
+            kind = self.kind(index)
+            if kind == KIND_PRICES:
+                book.add(*self.prices(index))
+            elif kind == KIND_DECISION:
+                yield index, self.decision(index), book
+
+
+class PriceBook:
+    """Senast kända priser per dygn."""
+
+    def __init__(self) -> None:
+        self._days: dict[int, tuple[float, list[float | None]]] = {}
+
+    def add(self, ts: float, day: int, offset: int, total: int, values: tuple[float, ...]) -> None:
+        current = self._days.get(day)
+        if current is None or current[0] != ts:
+            current = (ts, [None] * total)
+            self._days[day] = current
+        prices = current[1]
+        prices[offset:offset + len(values)] = values
+        for old in [d for d in self._days if d < day - 1]:
+            del self._days[old]
+
+    def day(self, day: int) -> list[float]:
+        entry = self._days.get(day)
+        if entry is None or any(p is None for p in entry[1]):
+            return []
+        return list(entry[1])
+
+
+# ── Omspelning ─────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class Replayed:
+    mode: str
+    base_mode: str
+    stage: str      # steget som satte läget: P0, P1–P4, POST-1 … POST-4
+
+    def diverges(self, record: DecisionRecord) -> str | None:
+        """Första skillnaden mot journalen, eller None."""
+        if record.stage == STAGE_FULL and self.base_mode != record.base_mode:
+            return f"basläge {record.base_mode} → {self.base_mode} ({self.stage})"
+        if self.mode != record.mode:
+            return f"läge {record.mode} → {self.mode} ({self.stage})"
+        return None
+
+
+@lru_cache(maxsize=16)
+def _pipelines(disabled: frozenset[str]) -> tuple[Pipeline, Pipeline]:
+    """Bas- och POST-pipeline med postens avstängda steg (stegen är tillståndslösa och delas)."""
+    return Pipeline.from_classes(BASE_STAGES, disabled), Pipeline.from_classes(POST_STAGES, disabled)
+
+
+def replay_decision(
+    record: DecisionRecord, today: list[float], tomorrow: list[float],
+    params: ShadowParams | None = None, prod_state: dict | None = None,
+) -> Replayed:
+    """Kör om beslutet. `params` ersätter journalens parametrar; `prod_state` (uppdateras på plats)
+    ersätter journalens production-tillstånd — för att låta ändrade trösklar påverka förloppet.
+    """
+    p = params or record.params
+    now = record.ts   # production-tiderna är åldrar — journalens Unix-tid duger som monoton tidslinje
+    base_pipeline, post_pipeline = _pipelines(record.disabled_stages)
+
+    if record.stage == STAGE_POST:
+        verdict = Verdict(
+            mode=record.base_mode, stage="bas", manual=record.manual_override,
+            ai=record.ai_override_active, production=record.prod_override_active,
+        )
+    else:
+        def production(mode: str, reason: str, sell: bool) -> tuple[str, str, bool]:
+            if not record.prod_enabled or record.grid_quality != POWER_QUALITY_GOOD:
+                return mode, reason, False
+            state = prod_state if prod_state is not None else record.production_state(now)
+            return production_step(
+                state, p, record.grid_power, record.tariff_active, now, mode, reason, log=False, sell=sell,
+            )
+
+        verdict = base_pipeline.run(Verdict(), StageInput(
+            params=p,
+            ai_mode=record.ai_mode,
+            manual_override=record.manual_override,
+            ctx=price_context(today, tomorrow, record.hour, record.spot_price),
+            longterm={7: record.percentile_7d, 30: record.percentile_30d},
+            sell=record.prod_sell,
+            production=production,
+        ))
+    base_mode = verdict.mode
+
+    post_pipeline.run(verdict, StageInput(
+        params=p,
+        hour=record.hour,
+        has_tomorrow=record.has_tomorrow,
+        peak_enabled=record.peak_enabled,
+        peak_threshold_w=record.peak_threshold_w,
+        tariff_active=lambda: record.tariff_active,
+        indoor_temp=lambda: record.indoor_temp,
+        peak_veto=lambda: (record.peak_veto, record.peak_projected_w),
+    ))
+    return Replayed(mode=verdict.mode, base_mode=base_mode, stage=verdict.stage)
+
+
+def with_params(record: DecisionRecord, overrides: dict) -> ShadowParams:
+    """Journalens parametrar med `overrides` ovanpå (samma validering som skuggläget)."""
+    return record.params.with_overrides(overrides) if overrides else record.params
+
@@ -0,0 +1,144 @@
+"""Mätvärden för övervakning — räknare i minnet och OpenMetrics-text, utan beroende till Home Assistant."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+
+from .const import MODE_BOOST, MODE_NORMAL, MODE_BLOCK, METRICS_REFRESH_BUCKETS, METRICS_STAGE_BUCKETS
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+_MODES = (MODE_BOOST, MODE_NORMAL, MODE_BLOCK)
+
+
+class Histogram:
+    """Kumulativt histogram med fasta övre gränser (sekunder)."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # sista = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def buckets(self) -> list[tuple[str, int]]:
+        """(le, kumulativt antal) inklusive +Inf."""
+        result, total = [], 0
+        for bound, n in zip((*self.bounds, None), self.counts):
+            total += n
+            result.append(("+Inf" if bound is None else repr(float(bound)), total))
+        return result
+
+
+class CoordinatorMetrics:
+    """Räknare som koordinatorn uppdaterar — en skrapning läser bara minnet."""
+
+    def __init__(self) -> None:
+        self.refresh_duration = Histogram(METRICS_REFRESH_BUCKETS)
+        self.publishes: Counter[str] = Counter()          # läge → antal
+        self.publish_failures = 0
+        self.prod_transitions: Counter[str] = Counter()   # "active"/"inactive"/"prearmed" → antal
+        self.ai_commands: Counter[str] = Counter()        # accepted/rejected/superseded → antal
+        self.grid_samples = 0
+        self.stage_duration: dict[str, Histogram] = {}    # pipelinesteg → tid när steget kördes
+        self.stage_skips: Counter[str] = Counter()        # pipelinesteg → överhoppade (avstängt/kan inte påverka)
+
+    def observe_stage(self, name: str, seconds: float | None) -> None:
+        if seconds is None:
+            self.stage_skips[name] += 1
+            return
+        histogram = self.stage_duration.get(name)
+        if histogram is None:
+            histogram = self.stage_duration[name] = Histogram(METRICS_STAGE_BUCKETS)
+        histogram.observe(seconds)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float | int | bool) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    def __init__(self, name: str, kind: str, help_text: str, unit: str | None = None) -> None:
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.unit = unit
+        self.samples: list[str] = []
+
+    def add(self, suffix: str, labels: dict, value) -> None:
+        self.samples.append(f"{self.name}{suffix}{_labels(**labels)} {_number(value)}")
+
+    def render(self) -> list[str]:
+        lines = [f"# TYPE {self.name} {self.kind}"]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        lines.append(f"# HELP {self.name} {self.help}")
+        return lines + self.samples
+
+
+def render_openmetrics(entries: list[tuple[str, object]]) -> str:
+    """OpenMetrics-text för (entry_id, koordinator) — läser `metrics`, `data` och production-tillståndet."""
+    mode = _Family("sgready_mode", "stateset", "Aktuellt SG Ready-läge")
+    price = _Family("sgready_price", "gauge", "Aktuellt spotpris per kWh")
+    import_price = _Family("sgready_import_price", "gauge", "Aktuellt importpris per kWh efter prismodellen")
+    percentile = _Family("sgready_price_percentile", "gauge", "Prisets percentil i fönstret")
+    prod_active = _Family("sgready_prod_override_active", "gauge", "Production override aktiv")
+    refresh = _Family("sgready_refresh_duration_seconds", "histogram", "Tid per omräkning", "seconds")
+    publishes = _Family("sgready_publishes", "counter", "Publicerade lägen")
+    failures = _Family("sgready_publish_failures", "counter", "Misslyckade publiceringar")
+    transitions = _Family("sgready_prod_override_transitions", "counter", "Production override av/på")
+    ai = _Family("sgready_ai_commands", "counter", "AI-kommandon per utfall")
+    samples = _Family("sgready_grid_samples", "counter", "Mottagna mätvärden från effektkällorna")
+    stage = _Family("sgready_stage_duration_seconds", "histogram", "Tid per körda pipelinesteg", "seconds")
+    skips = _Family("sgready_stage_skips", "counter", "Överhoppade pipelinesteg")
+
+    for entry_id, coordinator in entries:
+        m: CoordinatorMetrics = coordinator.metrics
+        data = coordinator.data
+        if data is not None:
+            for state in _MODES:
+                mode.add("", {"entry": entry_id, "sgready_mode": state}, data.mode == state)
+            price.add("", {"entry": entry_id}, data.current_price if data.spot_price is None else data.spot_price)
+            import_price.add("", {"entry": entry_id}, data.current_price)
+            percentile.add("", {"entry": entry_id}, data.price_percentile)
+            prod_active.add("", {"entry": entry_id}, data.prod_override_active)
+        for le, count in m.refresh_duration.buckets():
+            refresh.add("_bucket", {"entry": entry_id, "le": le}, count)
+        refresh.add("_count", {"entry": entry_id}, m.refresh_duration.count)
+        refresh.add("_sum", {"entry": entry_id}, m.refresh_duration.sum)
+        for state in _MODES:
+            publishes.add("_total", {"entry": entry_id, "mode": state}, m.publishes[state])
+        failures.add("_total", {"entry": entry_id}, m.publish_failures)
+        for to in ("active", "inactive", "prearmed"):
+            transitions.add("_total", {"entry": entry_id, "to": to}, m.prod_transitions[to])
+        for result, count in sorted(m.ai_commands.items()):
+            ai.add("_total", {"entry": entry_id, "result": result}, count)
+        samples.add("_total", {"entry": entry_id}, m.grid_samples)
+        for name, histogram in sorted(m.stage_duration.items()):
+            for le, count in histogram.buckets():
+                stage.add("_bucket", {"entry": entry_id, "stage": name, "le": le}, count)
+            stage.add("_count", {"entry": entry_id, "stage": name}, histogram.count)
+            stage.add("_sum", {"entry": entry_id, "stage": name}, histogram.sum)
+        for name, count in sorted(m.stage_skips.items()):
+            skips.add("_total", {"entry": entry_id, "stage": name}, count)
+
+    lines: list[str] = []
+    for family in (mode, price, import_price, percentile, prod_active, refresh, publishes, failures, transitions, ai, samples, stage, skips):
+        lines.extend(family.render())
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,119 @@
+"""Tidsstyrd override-kö — en extern planerare kan skicka ett helt dygns plan i ett meddelande."""
+from __future__ import annotations
+
+import heapq
+import itertools
+from dataclasses import dataclass
+from datetime import datetime, tzinfo
+
+from .const import AI_MODES, PLAN_MAX_WINDOWS
+
+
+def _parse_time(value, tz: tzinfo) -> datetime:
+    """ISO-sträng eller datetime → tidszonsmedveten datetime (naiv tolkas som lokal tid)."""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz)
+    return dt
+
+
+@dataclass(frozen=True)
+class OverrideWindow:
+    """Ett override-fönster [start, end) med läge, anledning och prioritet."""
+
+    start: datetime
+    end: datetime
+    mode: str
+    reason: str = ""
+    priority: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict, tz: tzinfo) -> OverrideWindow:
+        """Bygg fönster från payload — kastar ValueError vid ogiltigt innehåll."""
+        try:
+            start = _parse_time(data["start"], tz)
+            end = _parse_time(data["end"], tz)
+        except KeyError as err:
+            raise ValueError(f"fönster saknar {err.args[0]}") from err
+        mode = data.get("mode")
+        if mode not in AI_MODES:
+            raise ValueError(f"okänt läge: {mode!r}")
+        if end <= start:
+            raise ValueError(f"end ({end.isoformat()}) måste vara efter start ({start.isoformat()})")
+        return cls(
+            start=start,
+            end=end,
+            mode=mode,
+            reason=str(data.get("reason", "")),
+            priority=int(data.get("priority", 0)),
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "mode": self.mode,
+            "reason": self.reason,
+            "priority": self.priority,
+        }
+
+
+class OverrideQueue:
+    """Min-heap av kommande fönster (sorterat på start) + liten lista med aktiva fönster.
+
+    `advance(now)` flyttar startade fönster från heapen till aktiva och rensar
+    utgångna — O(log n) per gräns. Vid överlapp vinner högst prioritet, därefter
+    senast startade fönster. Ett `auto`-fönster med hög prioritet kan alltså
+    "hålla upp" en lägre prioriterad override.
+    """
+
+    def __init__(self) -> None:
+        self._pending: list[tuple[datetime, int, OverrideWindow]] = []
+        self._active: list[OverrideWindow] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._active)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._active.clear()
+
+    def check(self, count: int, replace: bool = True) -> None:
+        """Ryms `count` nya fönster? Kastar ValueError utan att ändra planen."""
+        if (0 if replace else len(self)) + count > PLAN_MAX_WINDOWS:
+            raise ValueError(f"planen får innehålla max {PLAN_MAX_WINDOWS} fönster")
+
+    def load(self, windows: list[OverrideWindow], replace: bool = True) -> None:
+        """Ladda en plan. `replace=False` lägger fönstren till befintlig plan."""
+        self.check(len(windows), replace)
+        if replace:
+            self.clear()
+        for window in windows:
+            heapq.heappush(self._pending, (window.start, next(self._seq), window))
+
+    def advance(self, now: datetime) -> OverrideWindow | None:
+        """Applicera alla gränser fram till `now` och returnera vinnande fönster."""
+        while self._pending and self._pending[0][0] <= now:
+            _, _, window = heapq.heappop(self._pending)
+            if window.end > now:
+                self._active.append(window)
+        self._active = [w for w in self._active if w.end > now]
+        if not self._active:
+            return None
+        return max(self._active, key=lambda w: (w.priority, w.start))
+
+    def next_boundary(self, now: datetime) -> datetime | None:
+        """Nästa tidpunkt då vinnande fönster kan ändras."""
+        candidates = [w.end for w in self._active if w.end > now]
+        if self._pending:
+            candidates.append(self._pending[0][0])
+        return min(candidates) if candidates else None
+
+    def as_list(self) -> list[dict]:
+        """Serialiserbar plan (aktiva + kommande), sorterad på start."""
+        windows = self._active + [w for _, _, w in self._pending]
+        return [w.as_dict() for w in sorted(windows, key=lambda w: (w.start, -w.priority))]
@@ -0,0 +1,117 @@
+"""Effekttariff — inkrementella timmedel av nätimport och månadens topp-K."""
+from __future__ import annotations
+
+import heapq
+from datetime import datetime, timedelta, timezone, tzinfo
+
+from .const import PEAK_MAX_GAP_SECONDS
+
+
+class PeakTracker:
+    """Håller löpande energi för innevarande timme och en min-heap med månadens K högsta timmedel.
+
+    Samplen integreras med sample-and-hold: effekten från förra samplet antas
+    gälla fram till nästa, men högst PEAK_MAX_GAP_SECONDS (längre luckor räknas
+    som okänd tid och bidrar inte). `None` (mätaren otillgänglig) bryter hållet.
+    Bara import räknas — export ger 0 W.
+    Timgränser räknas i UTC så att sommartidsomställningen inte ger dubbla
+    eller saknade timmar; månaden bestäms i lokal tid (`tz`).
+    """
+
+    def __init__(self, top_k: int, tz: tzinfo) -> None:
+        self.top_k = top_k
+        self.tz = tz
+        self.month: str | None = None
+        self.peaks: list[tuple[float, str]] = []   # min-heap: (medel-W, timstart ISO)
+        self._hour_start: datetime | None = None
+        self._energy_ws = 0.0
+        self._last_ts: datetime | None = None
+        self._last_w: float | None = None
+
+    def add_sample(self, power_w: float | None, ts: datetime) -> bool:
+        """Registrera ett sample. Returnerar True om en timme avslutades (spara då)."""
+        ts = ts.astimezone(timezone.utc)
+        closed = False
+        if self._last_ts is not None and self._last_w is not None and ts > self._last_ts:
+            start = self._last_ts
+            end = min(ts, start + timedelta(seconds=PEAK_MAX_GAP_SECONDS))
+            # Dela upp integrationen över timgränser
+            while start < end:
+                boundary = self._hour_start + timedelta(hours=1)
+                if end < boundary:
+                    self._energy_ws += self._last_w * (end - start).total_seconds()
+                    break
+                self._energy_ws += self._last_w * (boundary - start).total_seconds()
+                self._close_hour()
+                closed = True
+                start = boundary
+        hour_start = ts.replace(minute=0, second=0, microsecond=0)
+        if self._hour_start is None or hour_start > self._hour_start:
+            if self._hour_start is not None and self._energy_ws:
+                self._close_hour()
+                closed = True
+            self._hour_start = hour_start
+            self._energy_ws = 0.0
+        self._last_ts = ts
+        self._last_w = max(0.0, power_w) if power_w is not None else None
+        return closed
+
+    def _close_hour(self) -> None:
+        avg_w = self._energy_ws / 3600
+        month = self._hour_start.astimezone(self.tz).strftime("%Y-%m")
+        if month != self.month:
+            self.month = month
+            self.peaks = []
+        entry = (round(avg_w, 1), self._hour_start.isoformat())
+        if len(self.peaks) < self.top_k:
+            heapq.heappush(self.peaks, entry)
+        elif entry > self.peaks[0]:
+            heapq.heapreplace(self.peaks, entry)
+        self._hour_start += timedelta(hours=1)
+        self._energy_ws = 0.0
+
+    @property
+    def threshold_w(self) -> float | None:
+        """Lägsta av topp-K — ett timmedel över detta tränger undan en topp. None tills K timmar finns."""
+        if len(self.peaks) < self.top_k:
+            return None
+        return self.peaks[0][0]
+
+    def projected_w(self, now: datetime, extra_w: float = 0.0) -> float | None:
+        """Förväntat timmedel om nuvarande effekt (+ extra last) håller resten av timmen."""
+        now = now.astimezone(timezone.utc)
+        if self._hour_start is None or now - self._hour_start >= timedelta(hours=1):
+            return None
+        elapsed = (now - self._hour_start).total_seconds()
+        energy = self._energy_ws
+        last_w = self._last_w or 0.0
+        if self._last_ts is not None and now > self._last_ts:
+            energy += last_w * min((now - self._last_ts).total_seconds(), PEAK_MAX_GAP_SECONDS)
+        remaining = 3600 - elapsed
+        return (energy + (last_w + extra_w) * remaining) / 3600
+
+    def would_set_peak(self, now: datetime, extra_w: float = 0.0) -> bool:
+        """Sant om timmen med `extra_w` väntas tränga in bland månadens topp-K."""
+        threshold = self.threshold_w
+        projected = self.projected_w(now, extra_w)
+        return threshold is not None and projected is not None and projected > threshold
+
+    def as_dict(self) -> dict:
+        return {
+            "month": self.month,
+            "peaks": sorted(self.peaks, reverse=True),
+            "hour_start": self._hour_start.isoformat() if self._hour_start else None,
+            "energy_ws": self._energy_ws,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, top_k: int, tz: tzinfo) -> PeakTracker:
+        tracker = cls(top_k, tz)
+        tracker.month = data.get("month")
+        peaks = sorted((tuple(p) for p in data.get("peaks", [])), reverse=True)[:top_k]
+        tracker.peaks = [(float(w), str(h)) for w, h in peaks]
+        heapq.heapify(tracker.peaks)
+        if data.get("hour_start"):
+            tracker._hour_start = datetime.fromisoformat(data["hour_start"]).astimezone(timezone.utc)
+            tracker._energy_ws = float(data.get("energy_ws", 0.0))
+        return tracker
@@ -0,0 +1,256 @@
+"""Beslutspipeline — ordnade steg P0 … POST-4, utan beroende till Home Assistant.
+
+Varje steg deklarerar vad det läser (`inputs`) och avgör i `applies` —
+enbart från läget så här långt — om det alls kan ändra utfallet. Steg som
+inte kan det hoppas över utan att läsa entiteter. AI- och manuell
+override låser läget för prissteget; övriga steg respekterar låsningen
+som tidigare (t.ex. blockerar tariffen även manuell boost).
+
+Ett nytt steg är en Stage-subklass i BASE_STAGES/POST_STAGES (eller
+`Pipeline.insert`). Valfria steg kan stängas av per entry. Samma pipeline
+kör koordinatorn, journalens omkörning och flottgatewayen.
+"""
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from .const import (
+    MODE_BOOST, MODE_NORMAL, MODE_BLOCK,
+    AI_MODE_AUTO, AI_MODE_FORCE_BOOST, AI_MODE_FORCE_NORMAL, AI_MODE_FORCE_BLOCK,
+)
+from .engine import PriceContext, classify_price
+
+
+@dataclass(slots=True)
+class Verdict:
+    """Läget på väg genom pipelinen."""
+
+    mode: str = MODE_NORMAL
+    reason: str = ""
+    confidence: int = 0
+    stage: str = ""              # steget som senast satte läget
+    manual: bool = False         # manuell boost (P0)
+    ai: bool = False             # AI-override (P0)
+    production: bool = False     # production override (POST-1)
+    fields: dict = field(default_factory=dict)   # övriga Decision-fält som stegen satt
+
+    @property
+    def locked(self) -> bool:
+        return self.manual or self.ai
+
+    def set(self, stage: str, mode: str, reason: str, confidence: int | None = None) -> None:
+        self.mode, self.reason, self.stage = mode, reason, stage
+        if confidence is not None:
+            self.confidence = confidence
+
+
+@dataclass(slots=True)
+class StageInput:
+    """Indata till stegen. Entitetsläsningar är funktioner — de anropas bara av steg som körs."""
+
+    params: object                              # boost_pct, block_pct, longterm_days, min_temp, prod_*
+    ai_mode: str = AI_MODE_AUTO
+    ai_reason: str = ""
+    manual_override: bool = False
+    ctx: PriceContext | None = None
+    longterm: dict | None = None
+    sell: bool = False                          # exportpriset slår blockgränsen
+    hour: int = 0
+    has_tomorrow: bool = True
+    peak_enabled: bool = False
+    peak_threshold_w: float | None = None
+    production: Callable[[str, str, bool], tuple[str, str, bool]] | None = None
+    tariff_active: Callable[[], bool] = lambda: False
+    indoor_temp: Callable[[], float | None] = lambda: None
+    peak_veto: Callable[[], tuple[bool, float | None]] = lambda: (False, None)
+
+
+class Stage(ABC):
+    """Ett steg. `run` anropas bara om steget är påslaget och `applies` är sant."""
+
+    name = ""
+    label = ""                  # P0, P1–P4, POST-1 … (som i journalen)
+    inputs: frozenset[str] = frozenset()
+
+    def applies(self, v: Verdict, inp: StageInput) -> bool:
+        return True
+
+    @abstractmethod
+    def run(self, v: Verdict, inp: StageInput) -> None:
+        """Ändra `v` på plats."""
+
+
+_AI_MODES = {
+    AI_MODE_FORCE_BOOST: (MODE_BOOST, "⚡ Manuell överstyrning: boost"),
+    AI_MODE_FORCE_NORMAL: (MODE_NORMAL, "🏠 Manuell överstyrning: normal"),
+    AI_MODE_FORCE_BLOCK: (MODE_BLOCK, "🔒 Manuell överstyrning: block"),
+}
+
+
+class OverrideStage(Stage):
+    """P0: manuell boost-switch, sedan AI-override — låser läget."""
+
+    name = "override"
+    label = "P0"
+    inputs = frozenset({"manual_override", "ai_mode", "ai_reason"})
+
+    def applies(self, v, inp):
+        return inp.manual_override or inp.ai_mode in _AI_MODES
+
+    def run(self, v, inp):
+        if inp.manual_override:
+            v.set(self.label, MODE_BOOST, "⚡ Manuell boost-override", 100)
+            v.manual = True
+            return
+        mode, fallback = _AI_MODES[inp.ai_mode]
+        v.set(self.label, mode, f"🤖 AI: {inp.ai_reason}" if inp.ai_reason else fallback, 100)
+        v.ai = True
+
+
+class PriceStage(Stage):
+    """P1–P4: spridning, extrempriser, percentiler och långsiktig kontext."""
+
+    name = "price"
+    label = "P1–P4"
+    inputs = frozenset({"prices", "boost_pct", "block_pct", "longterm_days"})
+
+    def applies(self, v, inp):
+        return not v.locked and inp.ctx is not None
+
+    def run(self, v, inp):
+        v.set(self.label, *classify_price(inp.params, inp.ctx, inp.longterm))
+
+
+class ProductionStage(Stage):
+    """POST-1: eget solöverskott ersätter block (tillståndsmaskinen stegas även utan block)."""
+
+    name = "production"
+    label = "POST-1"
+    inputs = frozenset({"grid_power", "tariff", "prod_*"})
+
+    def applies(self, v, inp):
+        return not v.ai and inp.production is not None
+
+    def run(self, v, inp):
+        mode, reason, active = inp.production(v.mode, v.reason, inp.sell)
+        if active:
+            v.set(self.label, mode, reason, 95)
+            v.production = True
+
+
+class TemperatureStage(Stage):
+    """POST-2: för kallt inne — block blir normal."""
+
+    name = "temperature"
+    label = "POST-2"
+    inputs = frozenset({"indoor_temp", "min_temp"})
+
+    def applies(self, v, inp):
+        return v.mode == MODE_BLOCK and not v.ai and not v.production
+
+    def run(self, v, inp):
+        indoor_temp = inp.indoor_temp()
+        v.fields["indoor_temp"] = indoor_temp
+        min_temp = inp.params.min_temp
+        if indoor_temp is not None and indoor_temp < min_temp:
+            v.set(self.label, MODE_NORMAL, f"🌡 Temp för låg ({indoor_temp:.1f}°C < {min_temp}°C) — förhindrar block", 95)
+            v.fields["temp_override_active"] = True
+
+
+class TariffStage(Stage):
+    """POST-3: tariffen blockerar boost (även manuell, men inte AI)."""
+
+    name = "tariff"
+    label = "POST-3"
+    inputs = frozenset({"tariff"})
+
+    def applies(self, v, inp):
+        return v.mode == MODE_BOOST and not v.ai
+
+    def run(self, v, inp):
+        if inp.tariff_active():
+            v.set(self.label, MODE_NORMAL, "⏰ Tariff aktiv — boost blockerad")
+            v.fields["tariff_blocked"] = True
+
+
+class PeakStage(Stage):
+    """POST-4: boost som väntas ge en ny topp-K-timme i månaden vetas."""
+
+    name = "peak"
+    label = "POST-4"
+    inputs = frozenset({"grid_power", "peaks"})
+
+    def applies(self, v, inp):
+        return inp.peak_enabled and v.mode == MODE_BOOST and not v.ai and not v.manual
+
+    def run(self, v, inp):
+        vetoed, projected_w = inp.peak_veto()
+        v.fields["peak_projected_w"] = round(projected_w) if projected_w is not None else None
+        if vetoed:
+            v.set(self.label, MODE_NORMAL, f"⚡ Effekttopp — ~{projected_w:.0f} W > {inp.peak_threshold_w:.0f} W, boost blockerad")
+            v.fields["peak_vetoed"] = True
+
+
+class DataQualityStage(Stage):
+    """Sänk confidence när morgondagens priser saknas (sent på dagen även i orsaken)."""
+
+    name = "data_quality"
+    inputs = frozenset({"has_tomorrow", "hour"})
+
+    def applies(self, v, inp):
+        return not inp.has_tomorrow
+
+    def run(self, v, inp):
+        if inp.hour >= 18:
+            v.confidence = max(50, v.confidence - 10)
+            v.reason += " [begränsad data]"
+        else:
+            v.confidence = max(55, v.confidence - 5)
+
+
+BASE_STAGES: tuple[type[Stage], ...] = (OverrideStage, PriceStage, ProductionStage)
+POST_STAGES: tuple[type[Stage], ...] = (TemperatureStage, TariffStage, PeakStage, DataQualityStage)
+POST_FIELDS = {   # Decision-fält som POST-stegen sätter när de körs
+    "indoor_temp": None,
+    "temp_override_active": False,
+    "tariff_blocked": False,
+    "peak_vetoed": False,
+    "peak_projected_w": None,
+}
+# AI- och manuell override är användarens och AI:ns sista ord — kan inte stängas av
+REQUIRED_STAGES = frozenset({OverrideStage.name, PriceStage.name, DataQualityStage.name})
+OPTIONAL_STAGES = [cls.name for cls in (*BASE_STAGES, *POST_STAGES) if cls.name not in REQUIRED_STAGES]
+
+
+class Pipeline:
+    """Kör stegen i ordning. `observe(namn, sekunder | None)` får tid per körda steg, None = överhoppat."""
+
+    def __init__(self, stages: list[Stage], disabled: frozenset[str] = frozenset()) -> None:
+        self.stages = list(stages)
+        self.disabled = disabled - REQUIRED_STAGES
+
+    @classmethod
+    def from_classes(cls, classes, disabled=frozenset()) -> Pipeline:
+        return cls([stage() for stage in classes], frozenset(disabled))
+
+    def insert(self, stage: Stage, before: str | None = None) -> None:
+        """Lägg till ett steg före `before` (sist om None)."""
+        names = [existing.name for existing in self.stages]
+        self.stages.insert(names.index(before) if before in names else len(self.stages), stage)
+
+    def run(self, v: Verdict, inp: StageInput, observe: Callable[[str, float | None], None] | None = None) -> Verdict:
+        for stage in self.stages:
+            if stage.name in self.disabled or not stage.applies(v, inp):
+                if observe:
+                    observe(stage.name, None)
+                continue
+            if observe is None:
+                stage.run(v, inp)
+                continue
+            started = time.perf_counter()
+            stage.run(v, inp)
+            observe(stage.name, time.perf_counter() - started)
+        return v
@@ -0,0 +1,161 @@
+"""Prismodell — effektiva import- och exportpriser per timslot, utan beroende till Home Assistant.
+
+Import: (spot + påslag + nätavgift + energiskatt) × (1 + moms), där
+nätavgiften kan vara tidsdifferentierad. Export: andel av spot + fast
+ersättning (t.ex. nätnytta). Vektorerna räknas en gång per prisuppdatering
+och läses sedan av fönsterstatistik, P1–P4, production override,
+lastplanering och energibokföring.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, tzinfo
+
+_NUMBERS = ("supplier_fee", "grid_fee", "energy_tax", "vat_pct", "export_spot_pct", "export_compensation")
+
+
+def _time(value) -> time:
+    try:
+        return time.fromisoformat(str(value))
+    except ValueError as err:
+        raise ValueError(f"Ogiltig tid: {value!r}") from err
+
+
+@dataclass(frozen=True, slots=True)
+class FeePeriod:
+    """Tidsdifferentierad nätavgift, t.ex. {"start": "06:00", "end": "22:00", "fee": 0.53, "months": [11, 12, 1, 2, 3], "weekdays": true}."""
+
+    start: time
+    end: time                                  # exklusiv; före start = över midnatt
+    fee: float
+    months: frozenset[int] = frozenset()       # tom = alla månader
+    weekdays: bool = False                     # bara måndag–fredag
+
+    @classmethod
+    def from_dict(cls, data: dict) -> FeePeriod:
+        if not isinstance(data, dict):
+            raise ValueError("Nätavgiftsperiod måste vara ett objekt")
+        try:
+            fee = float(data["fee"])
+            months = frozenset(int(m) for m in data.get("months") or ())
+        except (KeyError, TypeError, ValueError) as err:
+            raise ValueError("Nätavgiftsperiod kräver fee (tal) och months som lista med 1–12") from err
+        if not months <= frozenset(range(1, 13)):
+            raise ValueError("months måste vara 1–12")
+        return cls(
+            start=_time(data.get("start", "00:00")),
+            end=_time(data.get("end", "00:00")),
+            fee=fee,
+            months=months,
+            weekdays=bool(data.get("weekdays", False)),
+        )
+
+    def matches(self, moment: datetime) -> bool:
+        if self.months and moment.month not in self.months:
+            return False
+        if self.weekdays and moment.weekday() >= 5:
+            return False
+        clock = moment.time()
+        if self.start < self.end:
+            return self.start <= clock < self.end
+        return clock >= self.start or clock < self.end   # över midnatt (start == end = hela dygnet)
+
+
+@dataclass(frozen=True, slots=True)
+class PriceModel:
+    """Avgifter per kWh i samma valuta som spotpriset. Standardvärdena = spotpriset rakt igenom."""
+
+    supplier_fee: float = 0.0           # elhandlarens påslag
+    grid_fee: float = 0.0               # rörlig nätavgift utanför perioderna
+    grid_fee_periods: tuple[FeePeriod, ...] = field(default=())   # första träff gäller
+    energy_tax: float = 0.0
+    vat_pct: float = 0.0
+    export_spot_pct: float = 100.0      # andel av spotpriset vid export
+    export_compensation: float = 0.0    # fast ersättning per exporterad kWh
+
+    @classmethod
+    def from_dict(cls, data) -> PriceModel:
+        """Bygg från config-objekt. Kastar ValueError vid okända nycklar eller ogiltiga värden."""
+        if not data:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError("Prismodellen måste vara ett objekt")
+        unknown = set(data) - set(_NUMBERS) - {"grid_fee_periods"}
+        if unknown:
+            raise ValueError(f"Okända nycklar: {', '.join(sorted(unknown))}")
+        try:
+            values = {key: float(data[key]) for key in _NUMBERS if key in data}
+        except (TypeError, ValueError) as err:
+            raise ValueError("Avgifter måste vara tal") from err
+        if not 0 <= values.get("vat_pct", 0) <= 100 or not 0 <= values.get("export_spot_pct", 100) <= 200:
+            raise ValueError("vat_pct måste vara 0–100 och export_spot_pct 0–200")
+        periods = data.get("grid_fee_periods") or []
+        if isinstance(periods, dict):
+            periods = [periods]
+        return cls(**values, grid_fee_periods=tuple(FeePeriod.from_dict(p) for p in periods))
+
+    @property
+    def neutral(self) -> bool:
+        """True om import- och exportpris är spotpriset."""
+        return self == _NEUTRAL
+
+    def grid_fee_at(self, moment: datetime) -> float:
+        return next((period.fee for period in self.grid_fee_periods if period.matches(moment)), self.grid_fee)
+
+    def import_price(self, spot: float, moment: datetime) -> float:
+        return (spot + self.supplier_fee + self.grid_fee_at(moment) + self.energy_tax) * (1 + self.vat_pct / 100)
+
+    def export_price(self, spot: float, moment: datetime) -> float:
+        return spot * self.export_spot_pct / 100 + self.export_compensation
+
+
+_NEUTRAL = PriceModel()
+
+
+@dataclass(frozen=True, slots=True)
+class PriceVectors:
+    """Spot-, import- och exportpris per timslot för idag och imorgon (index = lokal timme)."""
+
+    day: date
+    spot_today: list[float]
+    spot_tomorrow: list[float]
+    import_today: list[float]
+    import_tomorrow: list[float]
+    export_today: list[float]
+    export_tomorrow: list[float]
+
+    def _at(self, today: list[float], tomorrow: list[float], moment: datetime) -> float | None:
+        prices = {0: today, 1: tomorrow}.get((moment.date() - self.day).days)
+        if not prices or moment.hour >= len(prices):
+            return None
+        return prices[moment.hour]
+
+    def import_at(self, moment: datetime) -> float | None:
+        """Importpriset för timslotten som innehåller `moment` (lokal tid)."""
+        return self._at(self.import_today, self.import_tomorrow, moment)
+
+    def export_at(self, moment: datetime) -> float | None:
+        return self._at(self.export_today, self.export_tomorrow, moment)
+
+    def spot_at(self, moment: datetime) -> float | None:
+        return self._at(self.spot_today, self.spot_tomorrow, moment)
+
+
+def price_vectors(model: PriceModel, today: list[float], tomorrow: list[float], day: date, tz: tzinfo) -> PriceVectors:
+    """Effektiva prisvektorer för idag/imorgon — index h är lokal timme h det dygnet."""
+    if model.neutral:
+        return PriceVectors(day, list(today), list(tomorrow), list(today), list(tomorrow), list(today), list(tomorrow))
+
+    def apply(prices: list[float], offset: int, price) -> list[float]:
+        start = day + timedelta(days=offset)
+        return [price(spot, datetime.combine(start, time(hour), tz)) for hour, spot in enumerate(prices)]
+
+    return PriceVectors(
+        day=day,
+        spot_today=list(today),
+        spot_tomorrow=list(tomorrow),
+        import_today=apply(today, 0, model.import_price),
+        import_tomorrow=apply(tomorrow, 1, model.import_price),
+        export_today=apply(today, 0, model.export_price),
+        export_tomorrow=apply(tomorrow, 1, model.export_price),
+    )
@@ -0,0 +1,150 @@
+"""Production override — tillståndsmaskin för eget solöverskott, utan beroende till Home Assistant.
+
+Portad direkt från Node-RED 'Production Override Logic (med hysteres)'.
+Parametrarna läses som attribut (prod_normal_threshold, prod_boost_threshold,
+prod_return_threshold, prod_hysteresis, prod_min_duration, prod_off_delay) —
+koordinatorn, skuggparametrar och flottgatewayens anläggningar har alla dem.
+Tider (`now`, start_time, last_change) är monotona sekunder, se clock.py —
+aktiverings- och avstängningstiderna påverkas inte av sommartid eller NTP-steg.
+"""
+from __future__ import annotations
+
+import logging
+
+from .const import MODE_BOOST, MODE_NORMAL, MODE_BLOCK
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def new_production_state() -> dict:
+    return {
+        "active": False,
+        "mode": None,
+        "start_time": None,       # Monoton tid då aktiveringstiden började räknas
+        "last_change": None,      # Monoton tid för in i hysteres-zon
+        "in_hysteresis": False,
+        "tariff_limited": False,
+    }
+
+
+def production_step(
+    s: dict, p, meter_power: float, in_tariff_period: bool, now: float,
+    original_mode: str, original_reason: str, log: bool = True, sell: bool = False,
+) -> tuple[str, str, bool]:
+    """Ett steg i tillståndsmaskinen — ersätter BARA 'block' vid eget överskott.
+
+    `sell` = exportpriset är värt mer än att använda överskottet (se prismodellen);
+    då behandlas timmen som om läget inte vore block.
+    Returnerar (new_mode, reason, override_active). `s` uppdateras på plats.
+    """
+    normal_threshold = p.prod_normal_threshold
+    boost_threshold = p.prod_boost_threshold
+    return_threshold = p.prod_return_threshold
+    hysteresis = p.prod_hysteresis
+    min_duration = p.prod_min_duration
+    off_delay = p.prod_off_delay
+
+    # Hysteres-tröskel vid återgång
+    deactivation_threshold = return_threshold + (hysteresis if s["active"] else 0)
+    surplus = abs(meter_power)
+
+    if meter_power < normal_threshold:
+        # Tillräckligt överskott
+        if not s["active"]:
+            if s["start_time"] is None:
+                s["start_time"] = now
+            duration = now - s["start_time"]
+            if duration >= min_duration:
+                s["active"] = True
+                s["last_change"] = now
+                s["in_hysteresis"] = False
+                # Välj läge
+                if surplus >= abs(boost_threshold) and (not in_tariff_period or meter_power < 0):
+                    s["mode"] = MODE_BOOST
+                    s["tariff_limited"] = False
+                elif surplus >= abs(boost_threshold):
+                    s["mode"] = MODE_NORMAL
+                    s["tariff_limited"] = True
+                else:
+                    s["mode"] = MODE_NORMAL
+                    s["tariff_limited"] = False
+                if log:
+                    _LOGGER.info("Production override aktiverad: %s vid %dW", s["mode"], surplus)
+        else:
+            # Aktiv — uppdatera läge dynamiskt
+            s["in_hysteresis"] = False
+            s["last_change"] = now
+            if surplus >= abs(boost_threshold):
+                if not in_tariff_period or meter_power < 0:
+                    if s["mode"] != MODE_BOOST:
+                        s["mode"] = MODE_BOOST
+                        s["tariff_limited"] = False
+                elif s["mode"] == MODE_BOOST:
+                    s["mode"] = MODE_NORMAL
+                    s["tariff_limited"] = True
+            elif surplus >= abs(normal_threshold):
+                if s["mode"] != MODE_NORMAL:
+                    s["mode"] = MODE_NORMAL
+                    s["tariff_limited"] = False
+
+    elif meter_power > deactivation_threshold:
+        # Över återgångströskel
+        s["start_time"] = None
+        if s["active"]:
+            if not s["in_hysteresis"]:
+                s["in_hysteresis"] = True
+                s["last_change"] = now
+            time_since = now - s["last_change"]
+            if time_since >= off_delay:
+                s["active"] = False
+                s["mode"] = None
+                s["in_hysteresis"] = False
+                s["tariff_limited"] = False
+                if log:
+                    _LOGGER.info("Production override inaktiverad efter %ds", off_delay)
+    else:
+        # Hysteres-zon
+        if not s["active"]:
+            s["start_time"] = None
+
+    # Applicera — ENDAST om original_mode är "block" och överskottet inte hellre säljs
+    if s["active"] and s["mode"] and original_mode == MODE_BLOCK and not sell:
+        power_str = f"{surplus:.0f}W överskott" if meter_power < 0 else f"{meter_power:.0f}W import"
+        tariff_str = " (tariff-begränsad)" if s["tariff_limited"] else ""
+        reason = f"🔋 Egen produktion: {power_str} → {s['mode']}{tariff_str}"
+        return s["mode"], reason, True
+    elif s["active"] and s["mode"]:
+        # Ursprungligt läge är inte block (eller exporten betalar bättre) — låt vara
+        if sell and original_mode == MODE_BLOCK and log:
+            _LOGGER.info("Production override: exportpriset slår blockgränsen — överskottet säljs")
+        s["active"] = False
+        s["mode"] = None
+
+    return original_mode, original_reason, False
+
+
+def production_prearm(s: dict, mode: str, now: float) -> bool:
+    """Förarma från solprognosen — aktiv direkt, utan att vänta prod_min_duration.
+
+    Därefter bekräftar mätaren som vanligt i production_step: överskott håller
+    (och justerar) läget, import över återgångströskeln startar hysteresen och
+    slår av efter prod_off_delay. Returnerar False om override redan är aktiv.
+    """
+    if s["active"]:
+        return False
+    s.update(active=True, mode=mode, start_time=None, last_change=now, in_hysteresis=False, tariff_limited=False)
+    return True
+
+
+def production_countdown(s: dict, p, now: float) -> dict:
+    """Nedräkningsstatus för production override (som Node-RED status-text)."""
+    if s["active"] and s["in_hysteresis"] and s["last_change"] is not None:
+        time_left = p.prod_off_delay - (now - s["last_change"])
+        return {"state": "hysteresis", "seconds_left": max(0, round(time_left))}
+    elif not s["active"] and s["start_time"] is not None:
+        duration = now - s["start_time"]
+        time_left = p.prod_min_duration - duration
+        return {"state": "waiting", "seconds_left": max(0, round(time_left))}
+    elif s["active"]:
+        return {"state": "active", "seconds_left": 0}
+    return {"state": "passive", "seconds_left": 0}
@@ -0,0 +1,387 @@
+"""Prisleverantörer — Nord Pool-integrationen, en prissensor eller en lokal fil.
+
+Varje leverantör ger timpriser (SEK/kWh) för idag och imorgon i lokal tid,
+index = timme (alltid 24 platser, även vid sommartidsomställning), plus när
+källan senast fick ny data. Kvartspriser (MTU 15) medelvärdesbildas per timme. PriceChain provar leverantörerna i
+prioritetsordning: första med dagens priser gäller och morgondagen fylls
+från nästa som har den.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time, timedelta, timezone
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.util import dt as dt_util
+
+from .const import PRICE_PROVIDER_NORDPOOL, PRICE_PROVIDER_SENSOR, PRICE_PROVIDER_FILE, PRICE_PROVIDERS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Attribut med dagens/morgondagens priser — HACS-Nordpool (raw_*, today/tomorrow), ENTSO-e (prices_*)
+_TODAY_ATTRIBUTES = ("raw_today", "prices_today", "today")
+_TOMORROW_ATTRIBUTES = ("raw_tomorrow", "prices_tomorrow", "tomorrow")
+
+
+class PriceUnavailable(Exception):
+    """Leverantören har inga priser just nu — `str(err)` är orsaken."""
+
+
+@dataclass(frozen=True, slots=True)
+class PriceSlots:
+    """Timpriser för idag och imorgon (index = lokal timme) från en källa."""
+
+    today: list[float]
+    tomorrow: list[float]
+    updated: datetime      # när källan senast fick ny data
+    source: str
+
+
+def _moment(value) -> datetime:
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        try:
+            moment = datetime.fromisoformat(str(value))
+        except ValueError as err:
+            raise PriceUnavailable(f"Ogiltig tidpunkt: {value!r}") from err
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return moment
+
+
+def price_points(values, list_day: date, scale: float = 1.0) -> list[tuple[datetime, float]]:
+    """Prislista → (tidpunkt, pris). Objekt med start/time + value/price, eller bara tal
+    i tidsordning från `list_day` 00:00 (fler än 25 = kvartspriser).
+
+    Bara tal räknas i förfluten tid från midnatt, så att ett dygn med 23 eller
+    25 timmar hamnar rätt över sommartidsomställningen.
+    """
+    if not isinstance(values, list):
+        raise PriceUnavailable("Priserna måste vara en lista")
+    step = 15 if len(values) > 25 else 60
+    midnight = datetime.combine(list_day, time(0), dt_util.DEFAULT_TIME_ZONE).astimezone(timezone.utc)
+    points = []
+    for index, item in enumerate(values):
+        if isinstance(item, dict):
+            price = item.get("value", item.get("price"))
+            moment = _moment(item.get("start", item.get("time")))
+        else:
+            price = item
+            moment = midnight + timedelta(minutes=index * step)
+        if price is None:
+            continue
+        try:
+            points.append((moment, float(price) * scale))
+        except (TypeError, ValueError) as err:
+            raise PriceUnavailable(f"Ogiltigt pris: {price!r}") from err
+    return points
+
+
+def _local_hours(day: date) -> set[int]:
+    """Lokala timmar som finns under `day` — 23 när klockan ställs fram, annars 24."""
+    tz = dt_util.DEFAULT_TIME_ZONE
+    start = datetime.combine(day, time(0), tz).astimezone(timezone.utc)
+    end = datetime.combine(day + timedelta(days=1), time(0), tz).astimezone(timezone.utc)
+    return {(start + timedelta(hours=n)).astimezone(tz).hour for n in range(int((end - start) / timedelta(hours=1)))}
+
+
+def _day_slots(buckets: dict[int, list[float]], day: date) -> list[float] | None:
+    """24 platser, index = lokal timme. None om en timme som finns saknar pris.
+
+    Timmen som hoppas över när klockan ställs fram fylls med föregående
+    timmes pris (nästa om det är 00); den dubbla timmen när klockan ställs
+    tillbaka får medelvärdet av båda, precis som kvartspriser.
+    """
+    hours = _local_hours(day)
+    if any(hour not in buckets for hour in hours):
+        return None
+    slots = [sum(buckets[hour]) / len(buckets[hour]) if hour in hours else None for hour in range(24)]
+    for hour in range(24):
+        if slots[hour] is None:
+            slots[hour] = slots[hour - 1] if hour else slots[hour + 1]
+    return slots
+
+
+def hourly_slots(points: Iterable[tuple[datetime, float]], day: date) -> tuple[list[float], list[float]]:
+    """(tidpunkt, pris) → timslots för `day` och dagen efter, medelvärde per lokal timme.
+
+    Varje dygn är 24 platser med index = lokal timme, eller tomt. Saknas
+    priset för någon timme i dagens dygn kastas PriceUnavailable (kedjan
+    provar då nästa leverantör); ett ofullständigt morgondygn lämnas tomt så
+    att kedjan kan fylla det från nästa.
+    """
+    buckets: tuple[dict[int, list[float]], dict[int, list[float]]] = ({}, {})
+    for moment, price in points:
+        local = dt_util.as_local(moment)
+        offset = (local.date() - day).days
+        if offset in (0, 1):
+            buckets[offset].setdefault(local.hour, []).append(price)
+    today = _day_slots(buckets[0], day) if buckets[0] else []
+    if today is None:
+        missing = sorted(_local_hours(day) - buckets[0].keys())
+        raise PriceUnavailable(f"priser saknas för {day} kl {', '.join(f'{hour:02d}' for hour in missing)}")
+    tomorrow = _day_slots(buckets[1], day + timedelta(days=1)) if buckets[1] else []
+    if tomorrow is None:
+        _LOGGER.debug("Ofullständiga priser för %s — morgondagen lämnas tom", day + timedelta(days=1))
+        tomorrow = []
+    return today, tomorrow
+
+
+class PriceProvider(ABC):
+    """Levererar PriceSlots. `async_subscribe` anropar `update` när källan har ny data."""
+
+    name = ""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+
+    @property
+    def label(self) -> str:
+        return self.name
+
+    @abstractmethod
+    async def async_fetch(self, day: date) -> PriceSlots:
+        """Priser för `day` och dagen efter. Kastar PriceUnavailable."""
+
+    @callback
+    def async_subscribe(self, update: Callable[[], None]) -> Callable[[], None] | None:
+        return None
+
+
+class NordPoolProvider(PriceProvider):
+    """Officiella Nord Pool-integrationen (HA 2024+) — priser i mSEK/MWh i config_entry.runtime_data."""
+
+    name = PRICE_PROVIDER_NORDPOOL
+
+    def __init__(self, hass: HomeAssistant, config_entry_id: str | None, area: str) -> None:
+        super().__init__(hass)
+        self.config_entry_id = config_entry_id
+        self.area = area
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.area}"
+
+    def _coordinator(self):
+        entry = self.hass.config_entries.async_get_entry(self.config_entry_id)
+        if not entry:
+            raise PriceUnavailable(f"Nord Pool config entry '{self.config_entry_id}' hittades inte")
+        return getattr(entry, "runtime_data", None)
+
+    async def async_fetch(self, day: date) -> PriceSlots:
+        coordinator = self._coordinator()
+        if not coordinator or not getattr(coordinator, "data", None):
+            raise PriceUnavailable("Nord Pool coordinator har ingen data ännu")
+        points = []
+        updated = []
+        try:
+            for day_data in coordinator.data.entries:
+                if getattr(day_data, "updated_at", None):
+                    updated.append(day_data.updated_at)
+                for item in day_data.entries:
+                    price = item.entry.get(self.area)
+                    if price is not None:
+                        points.append((item.start, price / 1000))
+        except (AttributeError, TypeError) as err:
+            raise PriceUnavailable(f"Okänt Nord Pool-dataformat: {err}") from err
+        today, tomorrow = hourly_slots(points, day)
+        return PriceSlots(today, tomorrow, max(updated, default=None) or dt_util.utcnow(), self.label)
+
+    @callback
+    def async_subscribe(self, update: Callable[[], None]) -> Callable[[], None] | None:
+        """Nord Pool publicerar morgondagens priser ~kl 13 — lyssnaren ger refresh inom sekunder."""
+        try:
+            coordinator = self._coordinator()
+        except PriceUnavailable:
+            coordinator = None
+        if not coordinator:
+            _LOGGER.warning("Kan inte starta Nord Pool-lyssnare — entry eller coordinator saknas")
+            return None
+        _LOGGER.info("Prenumererar på Nord Pool-uppdateringar")
+        return coordinator.async_add_listener(update)
+
+
+class SensorProvider(PriceProvider):
+    """Prissensor med dagens/morgondagens priser i attribut (HACS-Nordpool, ENTSO-e m.fl.).
+
+    Listor med bara tal tolkas från sensorns senaste uppdateringsdygn — tills
+    sensorn uppdaterats efter midnatt är dess "tomorrow" alltså vårt idag.
+    """
+
+    name = PRICE_PROVIDER_SENSOR
+
+    def __init__(self, hass: HomeAssistant, entity_id: str, scale: float = 1.0) -> None:
+        super().__init__(hass)
+        self.entity_id = entity_id
+        self.scale = scale
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.entity_id}"
+
+    async def async_fetch(self, day: date) -> PriceSlots:
+        state = self.hass.states.get(self.entity_id)
+        if state is None:
+            raise PriceUnavailable(f"{self.entity_id} finns inte")
+        list_day = dt_util.as_local(state.last_updated).date()
+        points = []
+        for offset, keys in ((0, _TODAY_ATTRIBUTES), (1, _TOMORROW_ATTRIBUTES)):
+            values = next((state.attributes[key] for key in keys if state.attributes.get(key)), None)
+            if values:
+                points.extend(price_points(values, list_day + timedelta(days=offset), self.scale))
+        if not points:
+            raise PriceUnavailable(f"{self.entity_id} saknar prisattribut ({', '.join(_TODAY_ATTRIBUTES)})")
+        today, tomorrow = hourly_slots(points, day)
+        return PriceSlots(today, tomorrow, state.last_updated, self.label)
+
+    @callback
+    def async_subscribe(self, update: Callable[[], None]) -> Callable[[], None] | None:
+        @callback
+        def _on_change(event) -> None:
+            old, new = event.data.get("old_state"), event.data.get("new_state")
+            if new is None or (old is not None and old.attributes == new.attributes and old.state == new.state):
+                return
+            update()
+
+        return async_track_state_change_event(self.hass, [self.entity_id], _on_change)
+
+
+class FileProvider(PriceProvider):
+    """Lokal JSON-fil — {"date": "2026-01-14", "today": [...], "tomorrow": [...]} eller en lista
+    med {"start": iso, "price": …}. Läses om bara när filen ändrats; mtime = färskhet."""
+
+    name = PRICE_PROVIDER_FILE
+
+    def __init__(self, hass: HomeAssistant, path: str, scale: float = 1.0) -> None:
+        super().__init__(hass)
+        self.path = path
+        self.scale = scale
+        self._mtime: float | None = None
+        self._points: list[tuple[datetime, float]] = []
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{os.path.basename(self.path)}"
+
+    def _parse(self, data) -> list[tuple[datetime, float]]:
+        if isinstance(data, dict) and ("today" in data or "tomorrow" in data):
+            try:
+                list_day = date.fromisoformat(str(data["date"]))
+            except (KeyError, ValueError) as err:
+                raise PriceUnavailable("Prisfil med today/tomorrow kräver date (ÅÅÅÅ-MM-DD)") from err
+            return [
+                *price_points(data.get("today") or [], list_day, self.scale),
+                *price_points(data.get("tomorrow") or [], list_day + timedelta(days=1), self.scale),
+            ]
+        if isinstance(data, dict):
+            data = data.get("prices")
+        return price_points(data, dt_util.now().date(), self.scale)
+
+    async def async_fetch(self, day: date) -> PriceSlots:
+        path = self.hass.config.path(self.path)
+        try:
+            mtime, data = await self.hass.async_add_executor_job(self._read, path)
+        except (OSError, ValueError) as err:
+            self._mtime = None
+            raise PriceUnavailable(f"Kunde inte läsa {self.path}: {err}") from err
+        if data is not None:
+            self._points = self._parse(data)
+            self._mtime = mtime
+        today, tomorrow = hourly_slots(self._points, day)
+        return PriceSlots(today, tomorrow, datetime.fromtimestamp(mtime, timezone.utc), self.label)
+
+    def _read(self, path: str) -> tuple[float, object | None]:
+        """Körs i executor. Returnerar (mtime, data) — data None om filen är oförändrad."""
+        current = os.path.getmtime(path)
+        if current == self._mtime:
+            return current, None
+        with open(path, encoding="utf-8") as file:
+            return current, json.load(file)
+
+
+def price_provider(hass: HomeAssistant, data, nordpool_entry_id: str | None, area: str) -> PriceProvider:
+    """Bygg från config-objekt, t.ex. {"type": "sensor", "entity": "sensor.nordpool", "scale": 0.01}.
+
+    Nord Pool-leverantören använder integrationens valda entry och område om
+    inget annat anges. Kastar ValueError vid ogiltig konfiguration.
+    """
+    if isinstance(data, str):
+        data = {"type": data}
+    if not isinstance(data, dict):
+        raise ValueError("Prisleverantör måste vara ett objekt eller en typ")
+    kind = data.get("type")
+    if kind not in PRICE_PROVIDERS:
+        raise ValueError(f"Okänd prisleverantör: {kind!r} (tillåtna: {', '.join(PRICE_PROVIDERS)})")
+    try:
+        scale = float(data.get("scale", 1))
+    except (TypeError, ValueError) as err:
+        raise ValueError(f"{kind}: scale måste vara ett tal") from err
+    if scale <= 0:
+        raise ValueError(f"{kind}: scale måste vara positivt")
+    if kind == PRICE_PROVIDER_NORDPOOL:
+        return NordPoolProvider(hass, data.get("config_entry", nordpool_entry_id), str(data.get("area", area)))
+    if kind == PRICE_PROVIDER_SENSOR:
+        entity_id = str(data.get("entity", "")).strip()
+        if "." not in entity_id:
+            raise ValueError(f"Ogiltigt entitets-ID: {entity_id!r}")
+        return SensorProvider(hass, entity_id, scale)
+    path = str(data.get("path", "")).strip()
+    if not path:
+        raise ValueError("file: path saknas")
+    return FileProvider(hass, path, scale)
+
+
+class PriceChain:
+    """Leverantörer i prioritetsordning med reserv — en trasig källa stoppar aldrig kedjan."""
+
+    def __init__(self, providers: list[PriceProvider]) -> None:
+        self.providers = providers
+        self.active: str | None = None          # källan för dagens priser
+        self._failures: dict[str, str] = {}     # label → senast loggade fel
+
+    async def async_fetch(self, day: date) -> PriceSlots | None:
+        """Första leverantören med dagens priser; saknas morgondagen fylls den från nästa som har den."""
+        result: PriceSlots | None = None
+        for provider in self.providers:
+            try:
+                slots = await provider.async_fetch(day)
+            except PriceUnavailable as err:
+                self._failed(provider, str(err))
+                continue
+            except Exception as err:   # noqa: BLE001 — en leverantörsbugg ska ge reserv, inte stopp
+                _LOGGER.error("Prisleverantör %s kastade fel: %s", provider.label, err, exc_info=True)
+                self._failed(provider, repr(err))
+                continue
+            if not slots.today:
+                self._failed(provider, f"inga priser för {day}")
+                continue
+            if self._failures.pop(provider.label, None):
+                _LOGGER.info("Prisleverantör %s levererar igen", provider.label)
+            if result is None:
+                result = slots
+            elif slots.tomorrow:
+                result = replace(result, tomorrow=slots.tomorrow, source=f"{result.source}+{slots.source}")
+            if result.tomorrow:
+                break
+        source = result.source.split("+")[0] if result else None
+        if source != self.active and result is not None:
+            if self.active is not None or source != self.providers[0].label:
+                _LOGGER.warning("Priskälla: %s", source)
+        self.active = source
+        return result
+
+    def _failed(self, provider: PriceProvider, reason: str) -> None:
+        if self._failures.get(provider.label) != reason:
+            self._failures[provider.label] = reason
+            _LOGGER.warning("Prisleverantör %s: %s", provider.label, reason)
+
+    @callback
+    def async_subscribe(self, update: Callable[[], None]) -> list[Callable[[], None]]:
+        return [unsub for provider in self.providers if (unsub := provider.async_subscribe(update))]
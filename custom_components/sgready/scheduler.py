@@ -0,0 +1,248 @@
+"""Lastplanering — billigaste sammanhängande fönster för sekundära laster (varmvatten, pool, elbil)."""
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, tzinfo
+
+_INF = float("inf")
+
+
+def _prefix_sums(prices: list[float]) -> list[float]:
+    sums = [0.0]
+    for price in prices:
+        sums.append(sums[-1] + price)
+    return sums
+
+
+def cheapest_window(prices: list[float], length: int, lo: int = 0, hi: int | None = None) -> tuple[int, float] | None:
+    """Billigaste `length` sammanhängande slots i prices[lo:hi] → (startindex, summa). O(n)."""
+    hi = len(prices) if hi is None else min(hi, len(prices))
+    lo = max(lo, 0)
+    if length <= 0 or hi - lo < length:
+        return None
+    sums = _prefix_sums(prices)
+    start = min(range(lo, hi - length + 1), key=lambda i: sums[i + length] - sums[i])
+    return start, sums[start + length] - sums[start]
+
+
+def cheapest_windows(
+    prices: list[float], length: int, count: int, lo: int = 0, hi: int | None = None
+) -> list[tuple[int, float]]:
+    """`count` disjunkta fönster om `length` slots med minsta totalsumma, sorterade i tid.
+
+    DP över prefixsummor: best[k][i] = min(best[k][i-1], best[k-1][i-length] + fönstersumma)
+    — O(n·count). Tom lista om intervallet inte rymmer alla fönster.
+    """
+    if count <= 1:
+        window = cheapest_window(prices, length, lo, hi)
+        return [window] if window else []
+    hi = len(prices) if hi is None else min(hi, len(prices))
+    lo = max(lo, 0)
+    n = hi - lo
+    if length <= 0 or n < length * count:
+        return []
+    sums = _prefix_sums(prices)
+
+    previous = [0.0] * (n + 1)       # noll fönster kostar inget
+    taken: list[list[bool]] = []
+    for _ in range(count):
+        current = [_INF] * (n + 1)
+        take = [False] * (n + 1)
+        for i in range(1, n + 1):
+            current[i] = current[i - 1]
+            if i >= length and previous[i - length] < _INF:
+                cost = previous[i - length] + sums[lo + i] - sums[lo + i - length]
+                if cost < current[i]:
+                    current[i] = cost
+                    take[i] = True
+        taken.append(take)
+        previous = current
+    if previous[n] == _INF:
+        return []
+
+    windows = []
+    i = n
+    for take in reversed(taken):
+        while not take[i]:
+            i -= 1
+        start = lo + i - length
+        windows.append((start, sums[start + length] - sums[start]))
+        i -= length
+    return sorted(windows)
+
+
+def _slug(name: str) -> str:
+    name = name.lower().translate(str.maketrans("åäö", "aao"))
+    return re.sub(r"[^a-z0-9]+", "_", name).strip("_")
+
+
+def _parse_time(value) -> time | None:
+    if value in (None, ""):
+        return None
+    if isinstance(value, time):
+        return value
+    try:
+        return time.fromisoformat(str(value))
+    except ValueError as err:
+        raise ValueError(f"Ogiltig tid: {value!r}") from err
+
+
+@dataclass(frozen=True, slots=True)
+class LoadSpec:
+    """En konfigurerad last, t.ex. {"name": "Varmvatten", "hours": 2, "before": "07:00"}."""
+
+    name: str
+    hours: int
+    before: time | None = None    # fönstren ska vara klara till (nästa) denna tid
+    after: time | None = None     # tidigaste start (före deadline)
+    count: int = 1                # antal disjunkta fönster
+
+    @property
+    def key(self) -> str:
+        return _slug(self.name)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> LoadSpec:
+        """Bygg från config-objekt. Kastar ValueError vid ogiltiga värden."""
+        if not isinstance(data, dict):
+            raise ValueError("Last måste vara ett objekt")
+        name = str(data.get("name", "")).strip()
+        if not _slug(name):
+            raise ValueError("Last saknar namn")
+        try:
+            hours = int(data.get("hours", 1))
+            count = int(data.get("count", 1))
+        except (TypeError, ValueError) as err:
+            raise ValueError(f"{name}: hours/count måste vara heltal") from err
+        if not 1 <= hours <= 24 or not 1 <= count <= 12 or hours * count > 24:
+            raise ValueError(f"{name}: hours×count måste rymmas i ett dygn")
+        return cls(
+            name=name,
+            hours=hours,
+            before=_parse_time(data.get("before")),
+            after=_parse_time(data.get("after")),
+            count=count,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class LoadPlan:
+    """Valda fönster för en last.
+
+    En ofullständig plan (deadline i ett dygn utan priser ännu) är preliminär
+    och aktiveras aldrig — den ersätts när morgondagens priser kommer.
+    """
+
+    windows: tuple[tuple[datetime, datetime], ...] = ()
+    avg_price: float | None = None
+    complete: bool = False        # priser fanns för hela intervallet fram till deadline
+
+    def active(self, now: datetime) -> bool:
+        return self.complete and any(start <= now < end for start, end in self.windows)
+
+    def next_start(self, now: datetime) -> datetime | None:
+        """Start för pågående eller nästa fönster."""
+        return next((start for start, end in self.windows if end > now), None)
+
+    def as_dict(self) -> dict:
+        return {
+            "windows": [{"start": s.isoformat(), "end": e.isoformat()} for s, e in self.windows],
+            "avg_price": round(self.avg_price, 4) if self.avg_price is not None else None,
+            "complete": self.complete,
+        }
+
+
+def plan_load(spec: LoadSpec, prices: list[float], day_start: date, tz: tzinfo, now: datetime) -> LoadPlan:
+    """Planera `spec` över timpriser där index 0 är `day_start` 00:00 lokal tid."""
+
+    def slot(i: int) -> datetime:
+        return datetime.combine(day_start + timedelta(days=i // 24), time(i % 24), tzinfo=tz)
+
+    def index(moment: datetime, round_up: bool = False) -> int:
+        i = (moment.date() - day_start).days * 24 + moment.hour
+        return i + 1 if round_up and (moment.minute or moment.second) else i
+
+    now = now.astimezone(tz)
+    lo = index(now)
+    hi = len(prices)
+    if spec.before is not None:
+        deadline = datetime.combine(now.date(), spec.before, tzinfo=tz)
+        if deadline <= now:
+            deadline += timedelta(days=1)
+        hi = index(deadline)
+        if spec.after is not None:
+            earliest = datetime.combine(deadline.date(), spec.after, tzinfo=tz)
+            if earliest >= deadline:
+                earliest -= timedelta(days=1)
+            lo = max(lo, index(earliest, round_up=True))
+    elif spec.after is not None:
+        lo = max(lo, index(datetime.combine(now.date(), spec.after, tzinfo=tz), round_up=True))
+
+    complete = hi <= len(prices)
+    found = cheapest_windows(prices, spec.hours, spec.count, lo, min(hi, len(prices)))
+    if not found:
+        return LoadPlan(complete=complete)
+    total = sum(cost for _, cost in found)
+    return LoadPlan(
+        windows=tuple((slot(start), slot(start + spec.hours)) for start, _ in found),
+        avg_price=total / (spec.hours * len(found)),
+        complete=complete,
+    )
+
+
+class LoadSchedule:
+    """Planer för alla konfigurerade laster — räknas om bara när priserna ändras.
+
+    En plan vars fönster pågår behålls tills det är slut, så att en last inte
+    flyttas mitt i en körning. När alla fönster i en plan passerats planeras
+    nästa cykel (`tick`) med senast kända priser.
+    """
+
+    def __init__(self, specs: list[LoadSpec], tz: tzinfo) -> None:
+        self.specs: dict[str, LoadSpec] = {spec.key: spec for spec in specs}
+        self.tz = tz
+        self.plans: dict[str, LoadPlan] = {}
+        self._prices: list[float] = []
+        self._day_start: date | None = None
+        self._listeners: list[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def update(self, prices: list[float], day_start: date, now: datetime) -> None:
+        """Nya priser — planera om alla laster som inte kör just nu."""
+        self._prices = list(prices)
+        self._day_start = day_start
+        for key, spec in self.specs.items():
+            current = self.plans.get(key)
+            if current is not None and current.active(now):
+                continue
+            self.plans[key] = plan_load(spec, self._prices, day_start, self.tz, now)
+        self._notify()
+
+    def tick(self, now: datetime) -> None:
+        """Fönstergräns passerad — planera nästa cykel för laster utan kommande fönster."""
+        if self._day_start is not None:
+            for key, spec in self.specs.items():
+                plan = self.plans.get(key)
+                if plan is None or plan.next_start(now) is None:
+                    self.plans[key] = plan_load(spec, self._prices, self._day_start, self.tz, now)
+        self._notify()
+
+    def next_boundary(self, now: datetime) -> datetime | None:
+        """Nästa start eller slut för något fönster."""
+        moments = [
+            moment
+            for plan in self.plans.values()
+            for window in plan.windows
+            for moment in window
+            if moment > now
+        ]
+        return min(moments, default=None)
@@ -32,9 +32,12 @@ class SGReadyAIOverrideSelect(SelectEntity):
 
     @property
     def extra_state_attributes(self):
+        next_change = self._coordinator.ai_plan_next_change
         return {
             "ai_reason": self._coordinator.ai_reason,
             "ai_until": self._coordinator.ai_until.isoformat() if self._coordinator.ai_until else None,
+            "plan_windows": len(self._coordinator.ai_plan),
+            "plan_next_change": next_change.isoformat() if next_change else None,
         }
 
     async def async_select_option(self, option: str) -> None:
@@ -1,29 +1,69 @@
 """Sensorer för SG Ready."""
 from __future__ import annotations
 
-from homeassistant.components.sensor import SensorEntity, SensorStateClass
-from homeassistant.const import UnitOfEnergy
-from homeassistant.core import HomeAssistant
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.const import UnitOfEnergy, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, SENSOR_MODE, SENSOR_PRICE, SENSOR_RANK
+from .const import (
+    DOMAIN, SENSOR_MODE, SENSOR_PRICE, SENSOR_RANK, SENSOR_ACTUATION_LATENCY, SENSOR_LOAD_NEXT_START, SENSOR_SHADOW,
+    SENSOR_ENERGY, ENERGY_CURRENCY, MODE_BOOST, MODE_NORMAL, MODE_BLOCK,
+)
 from .coordinator import SGReadyCoordinator
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities: AddEntitiesCallback):
     coordinator: SGReadyCoordinator = hass.data[DOMAIN][entry.entry_id]
-    async_add_entities([
+    entities = [
         SGReadyModeSensor(coordinator, entry),
         SGReadyPriceSensor(coordinator, entry),
         SGReadyRankSensor(coordinator, entry),
-    ])
+    ]
+    if coordinator.confirms_actuation:
+        entities.append(SGReadyActuationLatencySensor(coordinator, entry))
+    if coordinator.shadow_enabled:
+        entities.append(SGReadyShadowSensor(coordinator, entry))
+    entities.extend(SGReadyLoadNextStartSensor(coordinator, entry, key) for key in coordinator.loads.specs)
+    if coordinator.power.sources:
+        entities.extend(SGReadyEnergySensor(coordinator, entry, key) for key in _ENERGY_SENSORS)
+    async_add_entities(entities)
 
 
-class SGReadyModeSensor(CoordinatorEntity, SensorEntity):
+class _SGReadyCoordinatorSensor(CoordinatorEntity, SensorEntity):
+    """Skriver bara state när något av fälten i `_depends_on` har ändrats — eller tillgängligheten.
+
+    Efter en misslyckad uppdatering kan nästa lyckade ge identisk data (tom
+    changed_fields); utan jämförelsen skulle entiteten förbli otillgänglig.
+    """
+
+    _depends_on: frozenset[str]
+    _written_available: bool | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        available = self.available
+        if available == self._written_available and self.coordinator.changed_fields.isdisjoint(self._depends_on):
+            return
+        self._written_available = available
+        super()._handle_coordinator_update()
+
+
+class SGReadyModeSensor(_SGReadyCoordinatorSensor):
     """Visar aktuellt SG Ready-läge."""
 
     _attr_icon = "mdi:heat-pump"
+    _depends_on = frozenset({
+        "mode", "reason", "confidence", "ai_override_active", "manual_override",
+        "temp_override_active", "price_percentile", "price_vs_avg_pct", "diff_from_avg_ore",
+        "price_spread", "spread_pct", "insignificant_spread", "boost_threshold", "block_threshold",
+        "window_size", "window_avg", "window_min", "window_max", "has_tomorrow",
+        "price_percentile_7d", "price_percentile_30d",
+        "indoor_temp", "min_temp", "boost_pct", "block_pct",
+        "peak_vetoed", "peak_threshold_w", "peak_projected_w",
+        "grid_power_quality", "prod_forecast_window", "sell_surplus",
+    })
 
     def __init__(self, coordinator, entry):
         super().__init__(coordinator)
@@ -32,7 +72,7 @@ class SGReadyModeSensor(CoordinatorEntity, SensorEntity):
 
     @property
     def native_value(self):
-        return self.coordinator.data.get("mode") if self.coordinator.data else None
+        return self.coordinator.data.mode if self.coordinator.data else None
 
     @property
     def extra_state_attributes(self):
@@ -41,40 +81,52 @@ class SGReadyModeSensor(CoordinatorEntity, SensorEntity):
             return {}
         return {
             # Beslut
-            "reason": d.get("reason"),
-            "confidence": f"{d.get('confidence', 0)}%",
-            "override": d.get("override", False),
-            "temp_override_active": d.get("temp_override_active"),
+            "reason": d.reason,
+            "confidence": f"{d.confidence}%",
+            "override": d.ai_override_active or d.manual_override,
+            "temp_override_active": d.temp_override_active,
             # Prisanalys
-            "price_percentile": f"{d.get('price_percentile', 0):.0f}%",
-            "price_vs_avg": f"{d.get('price_vs_avg_pct', 0):.0f}%",
-            "diff_from_avg_ore": d.get("diff_from_avg_ore"),
-            "price_spread": d.get("price_spread"),
-            "spread_pct": f"{d.get('spread_pct', 0):.0f}%",
-            "insignificant_spread": d.get("insignificant_spread"),
-            "boost_threshold": d.get("boost_threshold"),
-            "block_threshold": d.get("block_threshold"),
+            "price_percentile": f"{d.price_percentile:.0f}%",
+            "price_vs_avg": f"{d.price_vs_avg_pct:.0f}%",
+            "diff_from_avg_ore": d.diff_from_avg_ore,
+            "price_spread": d.price_spread,
+            "spread_pct": f"{d.spread_pct:.0f}%",
+            "insignificant_spread": d.insignificant_spread,
+            "boost_threshold": d.boost_threshold,
+            "block_threshold": d.block_threshold,
             # Fönster
-            "window_size": f"{d.get('window_size', 0)}h",
-            "window_avg": d.get("window_avg"),
-            "window_min": d.get("window_min"),
-            "window_max": d.get("window_max"),
-            "has_tomorrow_prices": d.get("has_tomorrow"),
+            "window_size": f"{d.window_size}h",
+            "window_avg": d.window_avg,
+            "window_min": d.window_min,
+            "window_max": d.window_max,
+            "has_tomorrow_prices": d.has_tomorrow,
+            # Långsiktig kontext
+            "price_percentile_7d": d.price_percentile_7d,
+            "price_percentile_30d": d.price_percentile_30d,
             # Temperatur
-            "indoor_temp": d.get("indoor_temp"),
-            "min_temp": d.get("min_temp"),
+            "indoor_temp": d.indoor_temp,
+            "min_temp": d.min_temp,
+            # Effekttopp
+            "peak_vetoed": d.peak_vetoed,
+            "peak_threshold_w": d.peak_threshold_w,
+            "peak_projected_w": d.peak_projected_w,
+            # Elmätare / solprognos
+            "grid_power_quality": d.grid_power_quality,
+            "prod_forecast_window": d.prod_forecast_window,
+            "sell_surplus": d.sell_surplus,
             # Konfiguration
-            "boost_pct": f"{d.get('boost_pct', 0):.0f}%",
-            "block_pct": f"{d.get('block_pct', 0):.0f}%",
+            "boost_pct": f"{d.boost_pct:.0f}%",
+            "block_pct": f"{d.block_pct:.0f}%",
         }
 
 
-class SGReadyPriceSensor(CoordinatorEntity, SensorEntity):
+class SGReadyPriceSensor(_SGReadyCoordinatorSensor):
     """Visar aktuellt elpris."""
 
     _attr_icon = "mdi:currency-usd"
     _attr_native_unit_of_measurement = "SEK/kWh"
     _attr_state_class = SensorStateClass.MEASUREMENT
+    _depends_on = frozenset({"current_price", "spot_price", "export_price", "price_source", "price_updated"})
 
     def __init__(self, coordinator, entry):
         super().__init__(coordinator)
@@ -85,14 +137,27 @@ class SGReadyPriceSensor(CoordinatorEntity, SensorEntity):
     def native_value(self):
         if not self.coordinator.data:
             return None
-        price = self.coordinator.data.get("current_price")
+        price = self.coordinator.data.current_price
         return round(price, 4) if price is not None else None
 
+    @property
+    def extra_state_attributes(self):
+        d = self.coordinator.data
+        if not d:
+            return {}
+        return {
+            "spot_price": d.spot_price,
+            "export_price": d.export_price,
+            "source": d.price_source,
+            "updated": d.price_updated,
+        }
+
 
-class SGReadyRankSensor(CoordinatorEntity, SensorEntity):
+class SGReadyRankSensor(_SGReadyCoordinatorSensor):
     """Visar prisrankning för aktuell timme."""
 
     _attr_icon = "mdi:sort-numeric-ascending"
+    _depends_on = frozenset({"price_percentile", "outdoor_temp", "cop", "heat_cost"})
 
     def __init__(self, coordinator, entry):
         super().__init__(coordinator)
@@ -103,5 +168,160 @@ class SGReadyRankSensor(CoordinatorEntity, SensorEntity):
     def native_value(self):
         if not self.coordinator.data:
             return None
-        percentile = self.coordinator.data.get("price_percentile")
+        percentile = self.coordinator.data.price_percentile
         return f"P{percentile:.0f}" if percentile is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        d = self.coordinator.data
+        if not d:
+            return {}
+        return {
+            "ranked_on": "heat_cost" if d.cop is not None else "price",
+            "outdoor_temp": d.outdoor_temp,
+            "cop": d.cop,
+            "heat_cost": d.heat_cost,
+        }
+
+
+class SGReadyActuationLatencySensor(SensorEntity):
+    """Tid från publicerat läge till kvittens från värmepumpen (kräver state-topic)."""
+
+    _attr_icon = "mdi:timer-check-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: SGReadyCoordinator, entry):
+        self._coordinator = coordinator
+        self._attr_unique_id = f"{entry.entry_id}_{SENSOR_ACTUATION_LATENCY}"
+        self._attr_name = "SG Ready Aktiveringslatens"
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._coordinator.actuation.add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self):
+        latency = self._coordinator.actuation.last_latency_ms
+        return round(latency) if latency is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        return self._coordinator.actuation.as_dict()
+
+
+class SGReadyShadowSensor(SensorEntity):
+    """Läget kandidatkonfigurationen skulle ha valt — styr ingenting."""
+
+    _attr_icon = "mdi:heat-pump-outline"
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: SGReadyCoordinator, entry):
+        self._coordinator = coordinator
+        self._attr_unique_id = f"{entry.entry_id}_{SENSOR_SHADOW}"
+        self._attr_name = "SG Ready Skuggläge"
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._coordinator.shadow_ledger.add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self):
+        return self._coordinator.shadow_ledger.shadow_mode
+
+    @property
+    def extra_state_attributes(self):
+        ledger = self._coordinator.shadow_ledger
+        params = self._coordinator.shadow_params
+        return {
+            "reason": ledger.shadow_reason,
+            "live_mode": ledger.live_mode,
+            "diverged": ledger.diverged,
+            "today": ledger.totals(1),
+            "last_7d": ledger.totals(7),
+            "total": ledger.totals(),
+            "recent_divergences": list(ledger.divergences),
+            "params": params.as_dict() if params else None,
+        }
+
+
+class SGReadyLoadNextStartSensor(SensorEntity):
+    """Start för pågående eller nästa billigaste fönster för en last."""
+
+    _attr_icon = "mdi:clock-start"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: SGReadyCoordinator, entry, key: str):
+        self._coordinator = coordinator
+        self._key = key
+        self._attr_unique_id = f"{entry.entry_id}_{SENSOR_LOAD_NEXT_START}_{key}"
+        self._attr_name = f"SG Ready {coordinator.loads.specs[key].name} nästa start"
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._coordinator.loads.add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self):
+        plan = self._coordinator.loads.plans.get(self._key)
+        return plan.next_start(self._coordinator.clock.now()) if plan else None
+
+    @property
+    def extra_state_attributes(self):
+        plan = self._coordinator.loads.plans.get(self._key)
+        return {"avg_price": plan.as_dict()["avg_price"], "complete": plan.complete} if plan else {}
+
+
+# nyckel → (namn, enhet, ikon, värde ur EnergyLedger)
+_ENERGY_SENSORS = {
+    "import": ("Import", UnitOfEnergy.KILO_WATT_HOUR, "mdi:transmission-tower-import", lambda e: e.import_kwh),
+    "export": ("Export", UnitOfEnergy.KILO_WATT_HOUR, "mdi:transmission-tower-export", lambda e: e.export_kwh),
+    "import_cost": ("Importkostnad", ENERGY_CURRENCY, "mdi:cash-minus", lambda e: e.import_cost),
+    "export_revenue": ("Exportintäkt", ENERGY_CURRENCY, "mdi:cash-plus", lambda e: e.export_revenue),
+    MODE_BOOST: ("Import Boost", UnitOfEnergy.KILO_WATT_HOUR, "mdi:fire", lambda e: e.mode_kwh[MODE_BOOST]),
+    MODE_NORMAL: ("Import Normal", UnitOfEnergy.KILO_WATT_HOUR, "mdi:thermostat", lambda e: e.mode_kwh[MODE_NORMAL]),
+    MODE_BLOCK: ("Import Block", UnitOfEnergy.KILO_WATT_HOUR, "mdi:snowflake", lambda e: e.mode_kwh[MODE_BLOCK]),
+}
+
+
+class SGReadyEnergySensor(SensorEntity):
+    """Ackumulerad energi eller kostnad ur energibokföringen (för Energipanelen)."""
+
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: SGReadyCoordinator, entry, key: str):
+        self._coordinator = coordinator
+        self._key = key
+        name, unit, icon, self._value = _ENERGY_SENSORS[key]
+        self._attr_unique_id = f"{entry.entry_id}_{SENSOR_ENERGY}_{key}"
+        self._attr_name = f"SG Ready {name}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_icon = icon
+        if unit == ENERGY_CURRENCY:
+            # Monetära sensorer får inte vara total_increasing i HA
+            self._attr_device_class = SensorDeviceClass.MONETARY
+            self._attr_state_class = SensorStateClass.TOTAL
+        else:
+            self._attr_device_class = SensorDeviceClass.ENERGY
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._coordinator.energy.add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self):
+        return round(self._value(self._coordinator.energy), 4)
+
+    @property
+    def extra_state_attributes(self):
+        if self._key != "import_cost":
+            return None
+        ledger = self._coordinator.energy
+        average, savings = ledger.average_price, ledger.savings
+        return {
+            "net_cost": round(ledger.import_cost - ledger.export_revenue, 2),
+            "average_price": round(average, 4) if average is not None else None,
+            "savings": round(savings, 2) if savings is not None else None,
+            "unpriced_kwh": round(ledger.unpriced_kwh, 3),
+            "gaps": ledger.gaps,
+        }
@@ -0,0 +1,110 @@
+"""HA-tjänster för SG Ready — samma semantik som AI-kommandokanalen via MQTT."""
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+
+from .ai_commands import CommandRejected, validate_command
+from .const import (
+    DOMAIN, AI_MODES,
+    SERVICE_SET_OVERRIDE, SERVICE_LOAD_PLAN, SERVICE_RECOMPUTE,
+    ATTR_ENTRY_ID,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_TARGET = {vol.Optional(ATTR_ENTRY_ID): cv.string}
+
+SET_OVERRIDE_SCHEMA = vol.Schema({
+    vol.Required("mode"): vol.In(AI_MODES),
+    vol.Optional("reason"): cv.string,
+    vol.Optional("until"): cv.datetime,
+    **_TARGET,
+})
+
+LOAD_PLAN_SCHEMA = vol.Schema({
+    vol.Required("plan"): vol.All(cv.ensure_list, [dict]),
+    vol.Optional("replace", default=True): cv.boolean,
+    **_TARGET,
+})
+
+RECOMPUTE_SCHEMA = vol.Schema(_TARGET)
+
+
+def _coordinators(hass: HomeAssistant, call: ServiceCall) -> dict:
+    """Valda koordinatorer — alla konfigurerade om entry_id saknas."""
+    coordinators = hass.data.get(DOMAIN, {})
+    entry_id = call.data.get(ATTR_ENTRY_ID)
+    if entry_id is None:
+        return dict(coordinators)
+    if entry_id not in coordinators:
+        raise ServiceValidationError(f"Okänt SG Ready entry_id: {entry_id}")
+    return {entry_id: coordinators[entry_id]}
+
+
+def _command(call: ServiceCall) -> dict:
+    """Tjänstedata → validerat AI-kommando (samma schema som MQTT-payloaden)."""
+    payload = {k: v for k, v in call.data.items() if k != ATTR_ENTRY_ID}
+    payload.setdefault("source", f"service:{call.service}")
+    try:
+        return validate_command(payload)
+    except CommandRejected as err:
+        raise ServiceValidationError(str(err)) from err
+
+
+async def _async_apply(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Pröva kommandot mot alla valda instanser först — allt eller inget."""
+    command = _command(call)
+    coordinators = _coordinators(hass, call)
+    for entry_id, coordinator in coordinators.items():
+        try:
+            coordinator.check_ai_command(command)
+        except ValueError as err:
+            raise ServiceValidationError(str(err) if len(coordinators) == 1 else f"{entry_id}: {err}") from err
+    results = {}
+    for entry_id, coordinator in coordinators.items():
+        coordinator.async_apply_ai_command(command)
+        await coordinator.async_refresh()
+        results[entry_id] = coordinator.decision_summary()
+    return {"entries": results}
+
+
+async def _async_recompute(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    results = {}
+    for entry_id, coordinator in _coordinators(hass, call).items():
+        await coordinator.async_refresh()
+        results[entry_id] = coordinator.decision_summary()
+    return {"entries": results}
+
+
+def async_register_services(hass: HomeAssistant) -> None:
+    """Registrera tjänsterna en gång för domänen (gäller alla entries)."""
+    if hass.services.has_service(DOMAIN, SERVICE_RECOMPUTE):
+        return
+
+    async def _set_override(call: ServiceCall) -> ServiceResponse:
+        return await _async_apply(hass, call)
+
+    async def _load_plan(call: ServiceCall) -> ServiceResponse:
+        return await _async_apply(hass, call)
+
+    async def _recompute(call: ServiceCall) -> ServiceResponse:
+        return await _async_recompute(hass, call)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_OVERRIDE, _set_override,
+        schema=SET_OVERRIDE_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_LOAD_PLAN, _load_plan,
+        schema=LOAD_PLAN_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RECOMPUTE, _recompute,
+        schema=RECOMPUTE_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+    _LOGGER.debug("SG Ready-tjänster registrerade")
@@ -0,0 +1,192 @@
+"""Skuggläge — utvärdera en kandidatkonfiguration parallellt med den aktiva, utan att styra."""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import datetime
+
+from .const import SHADOW_MAX_DAYS, SHADOW_MAX_DIVERGENCES, SHADOW_MAX_GAP_SECONDS, SHADOW_MODE_LOAD
+
+
+@dataclass(frozen=True, slots=True)
+class ShadowParams:
+    """Parametrar som skuggbeslutet får avvika i. Namnen är desamma som config-nycklarna."""
+
+    boost_pct: float
+    block_pct: float
+    min_temp: float
+    longterm_days: int
+    prod_normal_threshold: float
+    prod_boost_threshold: float
+    prod_return_threshold: float
+    prod_hysteresis: float
+    prod_min_duration: float
+    prod_off_delay: float
+
+    @classmethod
+    def from_source(cls, source) -> ShadowParams:
+        """Läs aktuella värden från koordinatorn (samma attributnamn)."""
+        return cls(**{name: getattr(source, name) for name in _PARAM_NAMES})
+
+    def with_overrides(self, data: dict) -> ShadowParams:
+        """Kandidaten = aktiv konfiguration med `data` ovanpå. Kastar ValueError vid fel."""
+        return replace(self, **validate_overrides(data))
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+_PARAM_NAMES = tuple(f.name for f in fields(ShadowParams))
+
+
+def validate_overrides(data: dict) -> dict:
+    """Kontrollera kandidatens värden — okända nycklar och orimliga procent avvisas."""
+    if not isinstance(data, dict):
+        raise ValueError("Skuggkonfigurationen måste vara ett objekt")
+    unknown = set(data) - set(_PARAM_NAMES)
+    if unknown:
+        raise ValueError(f"Okända parametrar: {', '.join(sorted(unknown))}")
+    changes = {}
+    for name, value in data.items():
+        try:
+            changes[name] = int(value) if name == "longterm_days" else float(value)
+        except (TypeError, ValueError) as err:
+            raise ValueError(f"{name}: ogiltigt värde {value!r}") from err
+    for name in ("boost_pct", "block_pct"):
+        if name in changes and not 1 <= changes[name] <= 49:
+            raise ValueError(f"{name} måste vara 1–49")
+    if changes.get("longterm_days", 0) not in (0, 7, 30):
+        raise ValueError("longterm_days måste vara 0, 7 eller 30")
+    return changes
+
+
+def _empty_day() -> dict:
+    return {
+        "live_cost": 0.0,
+        "shadow_cost": 0.0,
+        "live_switches": 0,
+        "shadow_switches": 0,
+        "diverged_hours": 0.0,
+    }
+
+
+class ShadowLedger:
+    """Ackumulerar avvikelser, kostnad och antal lägesbyten per dygn för aktivt och skuggbeslut.
+
+    Kostnaden är ett index i kr per kW nominell värmepumpseffekt: pris ×
+    relativ last för läget (SHADOW_MODE_LOAD) × timmar. Värmebehovet antas
+    konstant (normal = 1), så block bygger upp en värmeskuld och boost ett
+    förråd. Saldot värderas löpande till aktuellt pris — uppskjuten last
+    köps alltså tillbaka senare, och block är bara billigare om det sker
+    till ett lägre pris. Inget mäts — jämför bara deltat mellan konfigurationerna.
+    """
+
+    def __init__(self) -> None:
+        self.days: OrderedDict[str, dict] = OrderedDict()
+        self.divergences: deque[dict] = deque(maxlen=SHADOW_MAX_DIVERGENCES)
+        self.live_mode: str | None = None
+        self.shadow_mode: str | None = None
+        self.shadow_reason = ""
+        self._last_ts: datetime | None = None
+        self._last_price: float | None = None
+        self.balance = {"live": 0.0, "shadow": 0.0}   # lagrad värme (+) / värmeskuld (−) i timmar normal last
+        self._valued = {"live": 0.0, "shadow": 0.0}   # saldo × pris vid senaste värderingen
+        self._listeners: list[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def _day(self, ts: datetime) -> dict:
+        key = ts.date().isoformat()
+        day = self.days.get(key)
+        if day is None:
+            day = self.days[key] = _empty_day()
+            while len(self.days) > SHADOW_MAX_DAYS:
+                self.days.popitem(last=False)
+        return day
+
+    @property
+    def diverged(self) -> bool:
+        return self.shadow_mode is not None and self.shadow_mode != self.live_mode
+
+    def record(self, live_mode: str, shadow_mode: str, price: float, now: datetime, shadow_reason: str = "") -> None:
+        """Nytt beslutspar. Tiden sedan förra paret bokförs på de då gällande lägena,
+        därefter omvärderas värmesaldot till det nya priset."""
+        if self._last_ts is not None and self._last_price is not None and now > self._last_ts:
+            hours = min((now - self._last_ts).total_seconds(), SHADOW_MAX_GAP_SECONDS) / 3600
+            day = self._day(self._last_ts)
+            for side, mode in (("live", self.live_mode), ("shadow", self.shadow_mode)):
+                load = SHADOW_MODE_LOAD.get(mode, 1.0)
+                day[f"{side}_cost"] += self._last_price * load * hours
+                self.balance[side] += (load - 1.0) * hours
+            if self.diverged:
+                day["diverged_hours"] += hours
+
+        day = self._day(now)
+        for side in ("live", "shadow"):
+            # Förrådet är värt (skulden kostar) vad värmen kostar att köpa nu
+            value = self.balance[side] * price
+            day[f"{side}_cost"] -= value - self._valued[side]
+            self._valued[side] = value
+        if self.live_mode is not None and live_mode != self.live_mode:
+            day["live_switches"] += 1
+        if self.shadow_mode is not None and shadow_mode != self.shadow_mode:
+            day["shadow_switches"] += 1
+        if shadow_mode != live_mode and (live_mode, shadow_mode) != (self.live_mode, self.shadow_mode):
+            self.divergences.append({
+                "time": now.isoformat(),
+                "live": live_mode,
+                "shadow": shadow_mode,
+                "price": price,
+                "reason": shadow_reason,
+            })
+
+        self.live_mode = live_mode
+        self.shadow_mode = shadow_mode
+        self.shadow_reason = shadow_reason
+        self._last_ts = now
+        self._last_price = price
+        self._notify()
+
+    def totals(self, days: int | None = None) -> dict:
+        """Summerat över de senaste `days` dygnen (alla sparade om None)."""
+        selected = list(self.days.values())[-days:] if days else list(self.days.values())
+        total = _empty_day()
+        for day in selected:
+            for key in total:
+                total[key] += day[key]
+        return {
+            "days": len(selected),
+            "live_cost": round(total["live_cost"], 3),
+            "shadow_cost": round(total["shadow_cost"], 3),
+            "cost_delta": round(total["shadow_cost"] - total["live_cost"], 3),
+            "live_switches": total["live_switches"],
+            "shadow_switches": total["shadow_switches"],
+            "switch_delta": total["shadow_switches"] - total["live_switches"],
+            "diverged_hours": round(total["diverged_hours"], 2),
+        }
+
+    def as_dict(self) -> dict:
+        return {
+            "days": dict(self.days),
+            "divergences": list(self.divergences),
+            "balance": dict(self.balance),
+            "valued": dict(self._valued),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ShadowLedger:
+        ledger = cls()
+        for key in sorted(data.get("days", {}))[-SHADOW_MAX_DAYS:]:
+            ledger.days[key] = {**_empty_day(), **data["days"][key]}
+        ledger.divergences.extend(data.get("divergences", []))
+        for side in ("live", "shadow"):
+            ledger.balance[side] = float(data.get("balance", {}).get(side, 0.0))
+            ledger._valued[side] = float(data.get("valued", {}).get(side, 0.0))
+        return ledger
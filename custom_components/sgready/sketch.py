@@ -0,0 +1,138 @@
+"""Kvantilskiss (t-digest) för prishistorik över flera dygn."""
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from .const import SKETCH_COMPRESSION, SKETCH_MAX_DAYS
+
+
+class TDigest:
+    """Sammanslagbar t-digest — begränsat antal centroider oavsett antal värden.
+
+    Centroider lagras som sorterade [medel, vikt]-par. Komprimeringen använder
+    den klassiska gränsen 4·N·q·(1−q)/δ, vilket ger hög upplösning i svansarna
+    där boost/block-besluten fattas.
+    """
+
+    __slots__ = ("compression", "_centroids", "count")
+
+    def __init__(self, compression: int = SKETCH_COMPRESSION) -> None:
+        self.compression = compression
+        self._centroids: list[list[float]] = []
+        self.count = 0.0
+
+    def add_many(self, values: list[float]) -> None:
+        self._centroids.extend([float(v), 1.0] for v in values)
+        self.count += len(values)
+        self._compress()
+
+    @classmethod
+    def merged(cls, digests: list[TDigest], compression: int = SKETCH_COMPRESSION) -> TDigest:
+        result = cls(compression)
+        for digest in digests:
+            result._centroids.extend([m, w] for m, w in digest._centroids)
+            result.count += digest.count
+        result._compress()
+        return result
+
+    def _compress(self) -> None:
+        if not self._centroids:
+            return
+        self._centroids.sort(key=lambda c: c[0])
+        total = self.count
+        merged = [self._centroids[0][:]]
+        cumulative = 0.0
+        for mean, weight in self._centroids[1:]:
+            last = merged[-1]
+            q = (cumulative + last[1] / 2) / total
+            limit = max(1.0, 4 * total * q * (1 - q) / self.compression)
+            if last[1] + weight <= limit:
+                new_weight = last[1] + weight
+                last[0] += (mean - last[0]) * weight / new_weight
+                last[1] = new_weight
+            else:
+                cumulative += last[1]
+                merged.append([mean, weight])
+        self._centroids = merged
+
+    def cdf(self, x: float) -> float | None:
+        """Andel av vikten under `x` (0–1), linjärt interpolerat mellan centroider."""
+        c = self._centroids
+        if not c:
+            return None
+        if x < c[0][0]:
+            return 0.0
+        if x >= c[-1][0]:
+            return 1.0
+        cumulative = 0.0
+        for i in range(1, len(c)):
+            prev_mean, prev_weight = c[i - 1]
+            mean, weight = c[i]
+            if x < mean:
+                left = cumulative + prev_weight / 2
+                right = cumulative + prev_weight + weight / 2
+                frac = (x - prev_mean) / (mean - prev_mean) if mean > prev_mean else 0.0
+                return (left + frac * (right - left)) / self.count
+            cumulative += prev_weight
+        return 1.0
+
+    def as_list(self) -> list[list[float]]:
+        return [[round(m, 5), w] for m, w in self._centroids]
+
+    @classmethod
+    def from_list(cls, data: list, compression: int = SKETCH_COMPRESSION) -> TDigest:
+        digest = cls(compression)
+        digest._centroids = sorted(([float(m), float(w)] for m, w in data), key=lambda c: c[0])
+        digest.count = sum(w for _, w in digest._centroids)
+        return digest
+
+
+class PriceHistory:
+    """En digest per dygn (max SKETCH_MAX_DAYS), sammanslagna vid behov.
+
+    Minnet är konstant per elområde: dagar × centroider. Sammanslagna digests
+    för 7/30 dygn cachas tills en ny dag läggs till.
+    """
+
+    def __init__(self) -> None:
+        self._days: OrderedDict[str, TDigest] = OrderedDict()
+        self._merged: dict[int, TDigest] = {}
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def has_day(self, day: str) -> bool:
+        return day in self._days
+
+    def add_day(self, day: str, prices: list[float]) -> None:
+        """Lägg till ett dygns priser (ISO-datum). Ett redan inlagt dygn ersätts."""
+        digest = TDigest()
+        digest.add_many([p for p in prices if p is not None])
+        self._days[day] = digest
+        self._days = OrderedDict(sorted(self._days.items()))
+        while len(self._days) > SKETCH_MAX_DAYS:
+            self._days.popitem(last=False)
+        self._merged.clear()
+
+    def percentile(self, price: float, days: int) -> float | None:
+        """Var `price` ligger (0–100) bland de senaste `days` dygnen."""
+        if not self._days:
+            return None
+        merged = self._merged.get(days)
+        if merged is None:
+            merged = self._merged[days] = TDigest.merged(list(self._days.values())[-days:])
+        value = merged.cdf(price)
+        return value * 100 if value is not None else None
+
+    def days_available(self, days: int) -> int:
+        return min(days, len(self._days))
+
+    def as_dict(self) -> dict:
+        return {day: digest.as_list() for day, digest in self._days.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> PriceHistory:
+        history = cls()
+        for day in sorted(data)[-SKETCH_MAX_DAYS:]:
+            history._days[day] = TDigest.from_list(data[day])
+        return history
@@ -0,0 +1 @@
+"""Fristående flottgateway för SG Ready — integrationens beslutskärna utan Home Assistant."""
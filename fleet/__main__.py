@@ -0,0 +1,40 @@
+"""Kör flottgatewayen: python -m fleet sites.json"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+
+from .broker import AiomqttTransport
+from .gateway import FleetGateway, load_config
+
+
+async def _run(config: dict, tick: float) -> None:
+    mqtt = config["mqtt"]
+    if importlib.util.find_spec("aiomqtt") is None:   # annars eviga återanslutningsförsök
+        raise SystemExit("aiomqtt saknas — installera med `pip install aiomqtt`")
+
+    def connect() -> AiomqttTransport:
+        return AiomqttTransport(
+            mqtt.get("host", "localhost"), int(mqtt.get("port", 1883)), mqtt.get("username"), mqtt.get("password"),
+        )
+
+    gateway = FleetGateway(None, config["sites"], config["prefix"], config["tz"])
+    logging.getLogger(__name__).info("Flottgateway startad: %d anläggningar, %d elområden",
+                                     len(gateway.sites), len(gateway.areas))
+    await gateway.serve(connect, tick=tick)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m fleet", description="SG Ready flottgateway")
+    parser.add_argument("config", help="JSON-konfiguration med mqtt, defaults och sites")
+    parser.add_argument("--tick", type=float, default=1.0, help="sekunder mellan utvärderingar")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_run(load_config(args.config), args.tick))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Lasttest för flottgatewayen över MemoryBroker: python -m fleet.bench --sites 1000
+
+Skapar N anläggningar fördelade på elområden, publicerar priser och
+effektvärden via brokern i processen och mäter full utvärdering av alla
+anläggningar (beslut + publicering), meddelandehantering och minne per
+anläggning. Ingen nätverkstrafik — siffrorna är gatewayens egen kostnad.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+
+from .broker import MemoryBroker
+from .gateway import FleetGateway, SiteConfig
+
+AREAS = ("SE1", "SE2", "SE3", "SE4")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def bench(sites: int, passes: int, messages: int) -> dict:
+    broker = MemoryBroker()
+    configs = [
+        SiteConfig.from_dict({"id": f"site-{i}", "area": AREAS[i % len(AREAS)], "prod_enabled": i % 3 == 0})
+        for i in range(sites)
+    ]
+    tracemalloc.start()
+    async with broker.client() as transport, broker.client() as feeder:
+        gateway = FleetGateway(transport, configs)
+        await gateway.subscribe()
+        day = gateway.now().date().isoformat()
+        for index, area in enumerate(AREAS):
+            prices = [0.4 + 0.1 * ((hour + index) % 12) for hour in range(24)]
+            await feeder.publish(f"sgready/prices/{area}", json.dumps({"date": day, "today": prices}), retain=True)
+        for i in range(sites):
+            await feeder.publish(f"sgready/site-{i}/grid_power", str(-800 if i % 3 == 0 else 300))
+
+        started = time.perf_counter()
+        handled = 0
+        while not transport.queue.empty():
+            gateway.handle(*transport.queue.get_nowait())
+            handled += 1
+        for i in range(messages):
+            gateway.handle(f"sgready/site-{i % sites}/temperature", str(19 + i % 4).encode())
+            handled += 1
+        handle_seconds = time.perf_counter() - started
+
+        durations = []
+        for _ in range(passes):
+            started = time.perf_counter()
+            await gateway.evaluate(everything=True)
+            durations.append(time.perf_counter() - started)
+        memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "sites": sites,
+        "passes": passes,
+        "pass_ms_p50": round(statistics.median(durations) * 1000, 2),
+        "pass_ms_p95": round(_percentile(durations, 95) * 1000, 2),
+        "pass_ms_max": round(max(durations) * 1000, 2),
+        "us_per_decision": round(statistics.median(durations) / sites * 1e6, 2),
+        "messages_per_s": round(handled / handle_seconds) if handle_seconds else None,
+        "bytes_per_site": round(memory / sites),
+        "stats": gateway.stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m fleet.bench", description="Lasttest för flottgatewayen")
+    parser.add_argument("--sites", type=int, default=1000)
+    parser.add_argument("--passes", type=int, default=50, help="antal fulla utvärderingar")
+    parser.add_argument("--messages", type=int, default=100_000, help="extra indatameddelanden att hantera")
+    parser.add_argument("--json", action="store_true", help="maskinläsbar rapport")
+    args = parser.parse_args()
+    report = asyncio.run(bench(args.sites, args.passes, args.messages))
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"Anläggningar:        {report['sites']}")
+    print(f"Full utvärdering:    p50 {report['pass_ms_p50']} ms  p95 {report['pass_ms_p95']} ms  "
+          f"max {report['pass_ms_max']} ms  ({report['us_per_decision']} µs/beslut)")
+    print(f"Meddelanden/s:       {report['messages_per_s']}")
+    print(f"Minne:               {report['bytes_per_site']} B/anläggning")
+
+
+if __name__ == "__main__":
+    main()
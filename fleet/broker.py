@@ -0,0 +1,102 @@
+"""MQTT-transport för flottgatewayen — aiomqtt i drift, MemoryBroker som lokal ersättare i test."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """MQTT-matchning med `+` (en nivå) och `#` (resten)."""
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+class MemoryBroker:
+    """Minimal broker i processen — wildcards och retained-meddelanden, ingen QoS.
+
+    Används för att köra gatewayen utan nätverk (utveckling, lasttest).
+    """
+
+    def __init__(self) -> None:
+        self._clients: list[MemoryClient] = []
+        self.retained: dict[str, bytes] = {}
+
+    def client(self) -> MemoryClient:
+        return MemoryClient(self)
+
+    def publish(self, topic: str, payload: bytes, retain: bool = False) -> None:
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        for client in self._clients:
+            if any(topic_matches(f, topic) for f in client.filters):
+                client.queue.put_nowait((topic, payload))
+
+
+class MemoryClient:
+    """Klient mot MemoryBroker med samma gränssnitt som AiomqttTransport."""
+
+    def __init__(self, broker: MemoryBroker) -> None:
+        self._broker = broker
+        self.filters: list[str] = []
+        self.queue: asyncio.Queue[tuple[str, bytes]] = asyncio.Queue()
+
+    async def __aenter__(self) -> MemoryClient:
+        self._broker._clients.append(self)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._broker._clients.remove(self)
+
+    async def subscribe(self, topic_filter: str) -> None:
+        self.filters.append(topic_filter)
+        for topic, payload in self._broker.retained.items():
+            if topic_matches(topic_filter, topic):
+                self.queue.put_nowait((topic, payload))
+
+    async def publish(self, topic: str, payload: str | bytes, retain: bool = False, qos: int = 0) -> None:
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._broker.publish(topic, payload, retain)
+
+    async def messages(self) -> AsyncIterator[tuple[str, bytes]]:
+        while True:
+            yield await self.queue.get()
+
+
+class AiomqttTransport:
+    """Riktig MQTT-anslutning. aiomqtt importeras först vid anslutning (valfritt beroende)."""
+
+    def __init__(self, host: str, port: int = 1883, username: str | None = None, password: str | None = None) -> None:
+        self._options = {"hostname": host, "port": port, "username": username, "password": password}
+        self._client = None
+
+    async def __aenter__(self) -> AiomqttTransport:
+        try:
+            import aiomqtt
+        except ImportError as err:
+            raise RuntimeError("aiomqtt saknas — installera med `pip install aiomqtt`") from err
+        self._client = aiomqtt.Client(**self._options)
+        await self._client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._client.__aexit__(*exc)
+
+    async def subscribe(self, topic_filter: str) -> None:
+        await self._client.subscribe(topic_filter)
+
+    async def publish(self, topic: str, payload: str | bytes, retain: bool = False, qos: int = 0) -> None:
+        await self._client.publish(topic, payload, qos=qos, retain=retain)
+
+    async def messages(self) -> AsyncIterator[tuple[str, bytes]]:
+        async for message in self._client.messages:
+            yield str(message.topic), message.payload
@@ -0,0 +1,41 @@
+"""Laddar integrationens HA-fria moduler utan att importera Home Assistant.
+
+`custom_components/sgready/__init__.py` importerar homeassistant, så paketet
+kan inte importeras som vanligt. I stället registreras ett tomt paket
+`sgready` med integrationskatalogen som __path__ — moduler som bara beror på
+`.const` (och voluptuous) går då att importera som `sgready.engine` osv.
+Samma källfiler används alltså av integrationen och gatewayen.
+"""
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+
+PACKAGE = "sgready"
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "sgready"
+
+if PACKAGE not in sys.modules:
+    _pkg = types.ModuleType(PACKAGE)
+    _pkg.__path__ = [str(PACKAGE_DIR)]
+    sys.modules[PACKAGE] = _pkg
+
+from sgready import const  # noqa: E402
+from sgready.ai_commands import (  # noqa: E402
+    CommandRejected, TokenBucket, command_id, decode_command, parse_command, validate_command,
+)
+from sgready.clock import Clock, SystemClock, VirtualClock  # noqa: E402
+from sgready.engine import PriceContext, classify_price, price_context  # noqa: E402
+from sgready.override_queue import OverrideQueue, OverrideWindow  # noqa: E402
+from sgready.pipeline import BASE_STAGES, POST_STAGES, Pipeline, StageInput, Verdict  # noqa: E402
+from sgready.production import new_production_state, production_step  # noqa: E402
+
+__all__ = [
+    "const",
+    "CommandRejected", "TokenBucket", "command_id", "decode_command", "parse_command", "validate_command",
+    "Clock", "SystemClock", "VirtualClock",
+    "PriceContext", "classify_price", "price_context",
+    "OverrideQueue", "OverrideWindow",
+    "BASE_STAGES", "POST_STAGES", "Pipeline", "StageInput", "Verdict",
+    "new_production_state", "production_step",
+]
@@ -0,0 +1,437 @@
+"""Flottgateway — SG Ready-beslut för många anläggningar i en asyncio-process.
+
+Topics (prefix från konfigurationen, standard "sgready"):
+
+    {prefix}/prices/{area}         in   {"date": "2026-01-01", "today": [...], "tomorrow": [...]} (retained)
+    {prefix}/{site}/grid_power     in   W, positivt = import
+    {prefix}/{site}/temperature    in   °C
+    {prefix}/{site}/tariff         in   on/off
+    {prefix}/{site}/ai_command     in   samma JSON som integrationens AI-topic (läge eller plan)
+    {prefix}/{site}/mode           ut   boost/normal/block (retained, bara vid ändring)
+    {prefix}/{site}/ai_result      ut   {"id", "status", "error"}
+
+Prisanalysen (fönster, statistik, percentil) räknas en gång per elområde och
+timme och delas av alla anläggningar i området — per anläggning återstår bara
+P0–P4 och POST-stegen, O(1). Minnet per anläggning är fast (slots) plus
+AI-planen, som är begränsad till PLAN_MAX_WINDOWS fönster.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timedelta, tzinfo
+from zoneinfo import ZoneInfo
+
+from .core import (
+    BASE_STAGES, POST_STAGES, Clock, CommandRejected, OverrideQueue, OverrideWindow, Pipeline, PriceContext,
+    StageInput, SystemClock, TokenBucket, Verdict, command_id, const, decode_command, new_production_state,
+    price_context, production_step, validate_command,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+GRID_MAX_AGE = timedelta(minutes=5)     # samma färskhetskrav som integrationen
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 60.0
+_RESERVED_IDS = {"prices"}
+# Integrationens beslutspipeline — stegen är tillståndslösa och delas av alla anläggningar
+_PIPELINE = Pipeline.from_classes((*BASE_STAGES, *POST_STAGES))
+
+
+@dataclass(frozen=True, slots=True)
+class SiteConfig:
+    """Parametrar för en anläggning — samma namn som integrationens config-nycklar."""
+
+    site_id: str
+    area: str
+    boost_pct: float = const.DEFAULT_BOOST_PCT
+    block_pct: float = const.DEFAULT_BLOCK_PCT
+    min_temp: float = const.DEFAULT_MIN_TEMP
+    longterm_days: int = 0          # ingen prishistorik i gatewayen
+    prod_enabled: bool = False
+    prod_normal_threshold: float = const.DEFAULT_PROD_NORMAL_THRESHOLD
+    prod_boost_threshold: float = const.DEFAULT_PROD_BOOST_THRESHOLD
+    prod_return_threshold: float = const.DEFAULT_PROD_RETURN_THRESHOLD
+    prod_hysteresis: float = const.DEFAULT_PROD_HYSTERESIS
+    prod_min_duration: float = const.DEFAULT_PROD_MIN_DURATION
+    prod_off_delay: float = const.DEFAULT_PROD_OFF_DELAY
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: dict | None = None) -> SiteConfig:
+        """Bygg från konfigurationsfilen. Kastar ValueError vid ogiltiga värden."""
+        merged = {**(defaults or {}), **data}
+        site_id = str(merged.pop("id", "")).strip()
+        if not site_id or "/" in site_id or "+" in site_id or "#" in site_id or site_id in _RESERVED_IDS:
+            raise ValueError(f"ogiltigt anläggnings-id: {site_id!r}")
+        if "area" not in merged:
+            raise ValueError(f"{site_id}: area saknas")
+        types = {f.name: f.type for f in fields(cls) if f.name != "site_id"}
+        unknown = set(merged) - set(types)
+        if unknown:
+            raise ValueError(f"{site_id}: okända nycklar {', '.join(sorted(unknown))}")
+        values = {}
+        for name, value in merged.items():
+            try:
+                values[name] = _COERCE[types[name]](value)
+            except (TypeError, ValueError) as err:
+                raise ValueError(f"{site_id}: {name}: ogiltigt värde {value!r}") from err
+        if not values["area"]:
+            raise ValueError(f"{site_id}: area saknas")
+        for name in ("boost_pct", "block_pct"):
+            if name in values and not 1 <= values[name] <= 49:
+                raise ValueError(f"{site_id}: {name} måste vara 1–49")
+        for name in ("prod_hysteresis", "prod_min_duration", "prod_off_delay"):
+            if values.get(name, 0) < 0:
+                raise ValueError(f"{site_id}: {name} får inte vara negativt")
+        if values.get("longterm_days", 0) != 0:
+            raise ValueError(f"{site_id}: longterm_days stöds inte i gatewayen (ingen prishistorik)")
+        return cls(site_id=site_id, **values)
+
+
+def _bool(value) -> bool:
+    """JSON-bool, 0/1 eller on/off-text — "false" får inte bli sant."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+        return value.strip().lower() in _TRUE
+    raise ValueError(value)
+
+
+def _number(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError(value)
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+def _integer(value) -> int:
+    number = _number(value)
+    if not number.is_integer():
+        raise ValueError(value)
+    return int(number)
+
+
+def _text(value) -> str:
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return value.strip()
+
+
+_TRUE = {"true", "on", "yes", "1"}
+_FALSE = {"false", "off", "no", "0"}
+_COERCE = {"bool": _bool, "float": _number, "int": _integer, "str": _text}
+
+
+class AreaPrices:
+    """Timpriser för ett elområde och cachad prisanalys för aktuell timme."""
+
+    __slots__ = ("today", "tomorrow", "date", "_key", "_context")
+
+    def __init__(self) -> None:
+        self.today: list[float] = []
+        self.tomorrow: list[float] = []
+        self.date: date | None = None
+        self._key: tuple | None = None
+        self._context: PriceContext | None = None
+
+    def update(self, payload: dict) -> None:
+        """Nya priser från `{prefix}/prices/{area}`. Kastar ValueError vid fel."""
+        try:
+            day = date.fromisoformat(payload["date"])
+            today = [float(p) for p in payload.get("today", [])]
+            tomorrow = [float(p) for p in payload.get("tomorrow", [])]
+        except (KeyError, TypeError, ValueError) as err:
+            raise ValueError(f"ogiltig prispayload: {err}") from err
+        if len(today) > 25 or len(tomorrow) > 25:
+            raise ValueError("max 25 timpriser per dygn")
+        self.today, self.tomorrow, self.date = today, tomorrow, day
+        self._key = None
+
+    def context(self, now: datetime) -> PriceContext:
+        day = now.date()
+        if self.date is not None and day > self.date:
+            # Midnatt passerad — gårdagens "imorgon" blir dagens priser
+            rolled = day == self.date + timedelta(days=1)
+            self.today = self.tomorrow if rolled else []
+            self.tomorrow = []
+            self.date = day
+            self._key = None
+        key = (day, now.hour)
+        if key != self._key:
+            self._key = key
+            self._context = price_context(self.today, self.tomorrow, now.hour)
+        return self._context
+
+
+class Site:
+    """Tillstånd för en anläggning — fasta fält, inga växande strukturer utöver AI-planen."""
+
+    __slots__ = (
+        "config", "prod_state", "grid_power", "grid_at", "indoor_temp", "tariff",
+        "ai_mode", "ai_until", "ai_reason", "plan", "limiter", "mode", "reason",
+    )
+
+    def __init__(self, config: SiteConfig, clock: Clock) -> None:
+        self.config = config
+        self.prod_state = new_production_state()
+        self.grid_power: float | None = None
+        self.grid_at: datetime | None = None
+        self.indoor_temp: float | None = None
+        self.tariff = False
+        self.ai_mode = const.AI_MODE_AUTO
+        self.ai_until: datetime | None = None
+        self.ai_reason = ""
+        self.plan = OverrideQueue()
+        self.limiter = TokenBucket(const.AI_RATE_PER_MINUTE / 60, const.AI_RATE_BURST, clock.monotonic)
+        self.mode: str | None = None
+        self.reason = ""
+
+    def apply_command(self, command: dict, tz: tzinfo) -> None:
+        """Samma semantik som koordinatorns async_apply_ai_command. Kastar ValueError."""
+        if "plan" in command:
+            windows = [OverrideWindow.from_dict(item, tz) for item in command["plan"]]
+            self.plan.load(windows, replace=command.get("replace", True))
+            return
+        until = command.get("until")
+        if until is not None and until.tzinfo is None:
+            until = until.replace(tzinfo=tz)
+        self.ai_mode = command["mode"]
+        self.ai_reason = command["reason"]
+        self.ai_until = until
+
+    def effective_ai_mode(self, now: datetime) -> tuple[str, str]:
+        if self.ai_mode != const.AI_MODE_AUTO and self.ai_until and now > self.ai_until:
+            self.ai_mode, self.ai_reason, self.ai_until = const.AI_MODE_AUTO, "", None
+        window = self.plan.advance(now)
+        if self.ai_mode == const.AI_MODE_AUTO and window:
+            return window.mode, window.reason
+        return self.ai_mode, self.ai_reason
+
+    def decide(self, ctx: PriceContext, now: datetime, tick: float) -> tuple[str, str]:
+        """Integrationens pipeline: P0 (AI) → P1–P4 → POST-1 (produktion) → POST-2 (temperatur) → POST-3 (tariff).
+
+        `now` är lokal väggtid, `tick` monoton tid för production override-tidtagningen.
+        Effekttoppen (POST-4) finns inte i gatewayen.
+        """
+        cfg = self.config
+        ai_mode, ai_reason = self.effective_ai_mode(now)
+        fresh = cfg.prod_enabled and self.grid_power is not None and now - self.grid_at <= GRID_MAX_AGE
+
+        def production(mode: str, reason: str, sell: bool) -> tuple[str, str, bool]:
+            return production_step(self.prod_state, cfg, self.grid_power, self.tariff, tick, mode, reason, log=False)
+
+        verdict = _PIPELINE.run(Verdict(), StageInput(
+            params=cfg,
+            ai_mode=ai_mode,
+            ai_reason=ai_reason,
+            ctx=ctx,
+            hour=now.hour,
+            has_tomorrow=ctx.has_tomorrow,
+            production=production if fresh else None,
+            tariff_active=lambda: self.tariff,
+            indoor_temp=lambda: self.indoor_temp,
+        ))
+        return verdict.mode, verdict.reason
+
+
+class FleetGateway:
+    """Tar emot indata för alla anläggningar och publicerar läge vid ändring."""
+
+    def __init__(
+        self, transport, sites: list[SiteConfig], prefix: str = "sgready", tz: tzinfo | None = None,
+        clock: Clock | None = None,
+    ) -> None:
+        self.transport = transport
+        self.prefix = prefix.rstrip("/")
+        self.tz = tz or ZoneInfo("Europe/Stockholm")
+        self.clock = clock or SystemClock(lambda: self.tz)
+        self.sites = {config.site_id: Site(config, self.clock) for config in sites}
+        self.areas = {config.area: AreaPrices() for config in sites}
+        self._dirty: set[str] = set(self.sites)
+        self._outbox: list[tuple[str, str, bool]] = []
+        self.stats = {"messages": 0, "decisions": 0, "published": 0, "rejected": 0, "errors": 0, "reconnects": 0}
+
+    def now(self) -> datetime:
+        return self.clock.now()
+
+    # ── Indata ──────────────────────────────────────────────────────────────
+
+    async def subscribe(self) -> None:
+        p = self.prefix
+        for topic_filter in (
+            f"{p}/prices/+", f"{p}/+/grid_power", f"{p}/+/temperature", f"{p}/+/tariff", f"{p}/+/ai_command",
+        ):
+            await self.transport.subscribe(topic_filter)
+
+    def handle(self, topic: str, payload: bytes) -> None:
+        """Routa ett meddelande — synkront och O(1); besluten fattas i `evaluate`."""
+        self.stats["messages"] += 1
+        parts = topic[len(self.prefix) + 1:].split("/")
+        if len(parts) != 2:
+            return
+        key, kind = parts
+        if key == "prices":
+            self._handle_prices(kind, payload)
+            return
+        site = self.sites.get(key)
+        if site is None:
+            return
+        text = payload.decode("utf-8", "replace").strip() if isinstance(payload, bytes) else str(payload).strip()
+        if kind == "grid_power":
+            try:
+                site.grid_power = float(text)
+            except ValueError:
+                site.grid_power = None
+            site.grid_at = self.now()
+        elif kind == "temperature":
+            try:
+                site.indoor_temp = float(text)
+            except ValueError:
+                site.indoor_temp = None
+        elif kind == "tariff":
+            site.tariff = text.lower() in ("on", "true", "1", "active")
+        elif kind == "ai_command":
+            self._handle_ai_command(site, payload)
+        else:
+            return
+        self._dirty.add(key)
+
+    def _handle_prices(self, area: str, payload: bytes) -> None:
+        prices = self.areas.get(area)
+        if prices is None:
+            return
+        try:
+            prices.update(json.loads(payload))
+        except ValueError as err:
+            _LOGGER.warning("Priser för %s avvisade: %s", area, err)
+            return
+        _LOGGER.info("Priser för %s: %d timmar idag, %d imorgon", area, len(prices.today), len(prices.tomorrow))
+        self._dirty.update(site_id for site_id, site in self.sites.items() if site.config.area == area)
+
+    def _handle_ai_command(self, site: Site, payload: bytes) -> None:
+        raw = None
+        try:
+            if not site.limiter.take():
+                raise CommandRejected("hastighetsgräns överskriden")
+            raw = decode_command(payload)
+            site.apply_command(validate_command(raw), self.tz)
+        except (CommandRejected, ValueError) as err:
+            self.stats["rejected"] += 1
+            self._queue(site, "ai_result", json.dumps({"id": command_id(raw), "status": "rejected", "error": str(err)}))
+            return
+        self._queue(site, "ai_result", json.dumps({"id": command_id(raw), "status": "accepted", "error": None}))
+
+    def _queue(self, site: Site, kind: str, payload: str, retain: bool = False) -> None:
+        self._outbox.append((f"{self.prefix}/{site.config.site_id}/{kind}", payload, retain))
+
+    # ── Beslut ──────────────────────────────────────────────────────────────
+
+    async def evaluate(self, everything: bool = False) -> int:
+        """Fatta beslut för ändrade anläggningar (eller alla) och publicera ändrade lägen."""
+        now, tick = self.now(), self.clock.monotonic()
+        site_ids = list(self.sites) if everything else list(self._dirty)
+        self._dirty.clear()
+        for site_id in site_ids:
+            site = self.sites[site_id]
+            try:
+                mode, reason = site.decide(self.areas[site.config.area].context(now), now, tick)
+            except Exception:  # en trasig anläggning får inte stoppa de andra
+                self.stats["errors"] += 1
+                _LOGGER.exception("Beslut för %s misslyckades", site_id)
+                continue
+            self.stats["decisions"] += 1
+            site.reason = reason
+            if mode != site.mode:
+                site.mode = mode
+                self._queue(site, "mode", mode, retain=True)
+        # Skickade meddelanden plockas bort först efter lyckad publicering — resten
+        # ligger kvar till nästa anslutning om transporten fallerar
+        sent = 0
+        try:
+            for topic, payload, retain in self._outbox:
+                await self.transport.publish(topic, payload, retain=retain, qos=1)
+                sent += 1
+        finally:
+            del self._outbox[:sent]
+            self.stats["published"] += sent
+        return len(site_ids)
+
+    async def _read(self) -> None:
+        async for topic, payload in self.transport.messages():
+            try:
+                self.handle(topic, payload)
+            except Exception:  # ett trasigt meddelande får inte stoppa gatewayen
+                _LOGGER.exception("Fel vid hantering av %s", topic)
+
+    async def run(self, tick: float = 1.0, full_every: float = 60.0) -> None:
+        """Läs meddelanden och utvärdera ändrade anläggningar varje `tick` sekund.
+
+        Alla anläggningar utvärderas dessutom var `full_every` sekund, så att
+        timbyten, utgångna AI-override och production override-tidtagning slår
+        igenom utan nya meddelanden. Returnerar inte; kastar om transporten
+        fallerar (läsning eller publicering).
+        """
+        await self.subscribe()
+        reader = asyncio.create_task(self._read())
+        loop = asyncio.get_running_loop()
+        next_full = loop.time()
+        try:
+            while True:
+                if reader.done():
+                    reader.result()   # kastar transportens fel
+                    raise ConnectionError("meddelandeströmmen tog slut")
+                everything = loop.time() >= next_full
+                if everything:
+                    next_full = loop.time() + full_every
+                await self.evaluate(everything)
+                await asyncio.sleep(tick)
+        finally:
+            reader.cancel()
+
+    async def serve(self, connect: Callable[[], AbstractAsyncContextManager], tick: float = 1.0) -> None:
+        """Kör `run` över `connect()` och anslut igen med ökande väntan när transporten fallerar.
+
+        Tillståndet per anläggning behålls; efter återanslutning prenumereras
+        det på nytt (retained priser kommer tillbaka) och alla utvärderas.
+        """
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            started = self.clock.monotonic()
+            try:
+                async with connect() as transport:
+                    self.transport = transport
+                    self._dirty.update(self.sites)
+                    await self.run(tick=tick)
+            except Exception as err:   # anslutning, läsning eller publicering
+                if self.clock.monotonic() - started > RECONNECT_MAX_SECONDS:
+                    delay = RECONNECT_MIN_SECONDS   # anslutningen höll en stund — börja om från kort väntan
+                self.stats["reconnects"] += 1
+                _LOGGER.warning("MQTT-transporten föll bort (%s) — ansluter igen om %.0f s", err, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+def load_config(path: str) -> dict:
+    """Läs JSON-konfigurationen. Returnerar {"mqtt", "prefix", "tz", "sites"}; kastar ValueError."""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    defaults = data.get("defaults", {})
+    sites = [SiteConfig.from_dict(item, defaults) for item in data.get("sites", [])]
+    ids = [site.site_id for site in sites]
+    if len(ids) != len(set(ids)):
+        raise ValueError("dubbletter bland anläggnings-id")
+    return {
+        "mqtt": data.get("mqtt", {}),
+        "prefix": data.get("prefix", "sgready"),
+        "tz": ZoneInfo(data.get("timezone", "Europe/Stockholm")),
+        "sites": sites,
+    }
@@ -2,12 +2,24 @@
  * Shelly EM — Grid Power till MQTT
  * JL Styr AB
  *
- * Publicerar näteffekten (W) till MQTT var 10:e sekund.
+ * Läser näteffekten (W) var 10:e sekund och publicerar den till MQTT när den
+ * ändrats mer än DEADBAND_W, direkt när den korsar en tröskel, och annars som
+ * hjärtslag var HEARTBEAT_S sekund — under stabila perioder bara en bråkdel
+ * av meddelandena utan att någon tröskelpassage missas.
  * Positivt värde = import (köper från nätet)
  * Negativt värde = export (säljer till nätet / solöverskott)
  *
  * Topic: homeassistant/sgready/grid_power
  * Payload: numeriskt värde i watt, t.ex. -1250 eller 340
+ * Topic: homeassistant/sgready/grid_power/stats (valfritt, SUMMARY)
+ * Payload: {"min": -1300, "avg": -1210, "max": -1100, "samples": 6} sedan förra publiceringen
+ *
+ * Valfri lokal reserv (EDGE_ENABLED): samma production override-logik som
+ * integrationen (tröskel, hysteres, aktiveringstid) körs även här, med
+ * trösklar från ett retained config-topic som integrationen publicerar.
+ * Så länge HA:s hjärtslag (inte retained, med tidsstämpel) kommer är HA
+ * auktoritet; tystnar HA (eller brokern) tar Shellyn över och styr reläerna
+ * själv, och publicerar läget på styr-topicet om värmepumpen läser det.
  *
  * Installation:
  *   1. Öppna Shelly EM i webbläsaren → Scripts → Skapa nytt script
@@ -21,9 +33,153 @@
 // ── Konfiguration ────────────────────────────────────────────────────────────
 var TOPIC   = "homeassistant/sgready/grid_power";
 var CHANNEL = 0;       // 0 = kanal 1 (nätanslutning), 1 = kanal 2
-var INTERVAL_MS = 10000;  // publiceringsintervall i millisekunder
+var INTERVAL_MS = 10000;  // mätintervall i millisekunder
+var DEADBAND_W  = 50;     // publicera bara om värdet ändrats mer än så (0 = alltid)
+var HEARTBEAT_S = 120;    // publicera ändå minst så här ofta (håll under 300 s — HA:s färskhetskrav)
+var SUMMARY     = false;  // publicera min/medel/max sedan förra publiceringen på TOPIC + "/stats"
+
+// Lokal production override (reserv när HA inte svarar)
+// Det lokala beslutet når värmepumpen på två sätt: via Shellyns egna reläer
+// (RELAY_K1_ID/RELAY_K2_ID) eller, med integrationens MQTT-utgång, på
+// styr-topicet som värmepumpens brygga läser. Med utgång switch eller modbus
+// publiceras inget — då gör reserven ingenting utan RELAY_K1_ID.
+var EDGE_ENABLED      = false;
+var EDGE_CONFIG_TOPIC = "homeassistant/sgready/edge_config";  // retained, publiceras av integrationen
+var HEARTBEAT_TOPIC   = EDGE_CONFIG_TOPIC + "/heartbeat";     // HA:s hjärtslag (ersätts av heartbeat_topic i config)
+var CONTROL_TOPIC     = "homeassistant/sgready/control";      // ersätts av control_topic i config
+var CONTROL_PUBLISH   = false; // lokalt beslut på CONTROL_TOPIC (ersätts av control_publish i config)
+var HA_TIMEOUT_S      = 900;   // HA räknas som borta efter så lång tystnad (ersätts av config)
+var RELAY_K1_ID = -1;          // Switch-id för SG Ready kontakt 1, -1 = styr inga reläer
+var RELAY_K2_ID = -1;          // Switch-id för SG Ready kontakt 2
 // ─────────────────────────────────────────────────────────────────────────────
 
+// Trösklar — standardvärden tills config-topicet tagits emot (samma som integrationen).
+// Används av dödbandet även när EDGE_ENABLED är av.
+var cfg = {
+  enabled: true,
+  normal_threshold: -100,
+  boost_threshold: -500,
+  return_threshold: 50,
+  hysteresis: 50,
+  min_duration: 300,
+  off_delay: 600
+};
+
+var prod = { active: false, mode: null, start: null, lastChange: null, inHysteresis: false };
+var haMode = null;        // läge från HA:s senaste hjärtslag
+var haSeen = Shelly.getComponentStatus("sys").uptime;  // uptime (s) vid senaste hjärtslag — start räknas som hörd
+var edgeMode = null;      // senaste lokalt beslutade läge
+var relayMode = null;     // läge som reläerna står i
+var lastSent = null;      // senast publicerade värde
+var lastSentAt = 0;       // uptime (s) vid senaste publicering
+var stats = null;         // min/summa/max sedan senaste publicering
+
+function uptime() {
+  return Shelly.getComponentStatus("sys").uptime;
+}
+
+function haAlive() {
+  return MQTT.isConnected() && uptime() - haSeen < HA_TIMEOUT_S;
+}
+
+function setRelays(mode) {
+  if (RELAY_K1_ID < 0 || mode === relayMode) return;
+  // boost → K1+K2, normal → av, block → bara K1
+  Shelly.call("Switch.Set", { id: RELAY_K1_ID, on: mode === "boost" || mode === "block" });
+  if (RELAY_K2_ID >= 0) Shelly.call("Switch.Set", { id: RELAY_K2_ID, on: mode === "boost" });
+  relayMode = mode;
+  print("Reläer →", mode);
+}
+
+// Port av integrationens production_step (utan tariff — den finns bara i HA)
+function prodStep(power, now, baseMode) {
+  var s = prod;
+  var deactivation = cfg.return_threshold + (s.active ? cfg.hysteresis : 0);
+  var surplus = Math.abs(power);
+
+  if (power < cfg.normal_threshold) {
+    if (!s.active) {
+      if (s.start === null) s.start = now;
+      if (now - s.start >= cfg.min_duration) {
+        s.active = true;
+        s.lastChange = now;
+        s.inHysteresis = false;
+        s.mode = surplus >= Math.abs(cfg.boost_threshold) ? "boost" : "normal";
+      }
+    } else {
+      s.inHysteresis = false;
+      s.lastChange = now;
+      if (surplus >= Math.abs(cfg.boost_threshold)) s.mode = "boost";
+      else if (surplus >= Math.abs(cfg.normal_threshold)) s.mode = "normal";
+    }
+  } else if (power > deactivation) {
+    s.start = null;
+    if (s.active) {
+      if (!s.inHysteresis) {
+        s.inHysteresis = true;
+        s.lastChange = now;
+      }
+      if (now - s.lastChange >= cfg.off_delay) {
+        s.active = false;
+        s.mode = null;
+        s.inHysteresis = false;
+      }
+    }
+  } else if (!s.active) {
+    s.start = null;
+  }
+
+  // Ersätter bara block — som i integrationen
+  if (s.active && s.mode && baseMode === "block") return s.mode;
+  if (s.active && s.mode) {
+    s.active = false;
+    s.mode = null;
+  }
+  return baseMode;
+}
+
+function edgeDecide(power) {
+  if (!EDGE_ENABLED || !cfg.enabled) return;
+  var mode = prodStep(power, uptime(), haMode || "normal");
+  if (haAlive()) {
+    edgeMode = null;   // HA är auktoritet — tillståndet hålls varmt men används inte
+    return;
+  }
+  if (mode === edgeMode) return;
+  edgeMode = mode;
+  print("HA tyst — lokalt läge:", mode);
+  setRelays(mode);
+  // Inte retained — HA:s retained läge ligger kvar och gäller när HA är tillbaka
+  if (CONTROL_PUBLISH && MQTT.isConnected()) MQTT.publish(CONTROL_TOPIC, mode, 1, false);
+}
+
+// Trösklar där ett värde ska ut direkt — produktionslogikens och import/export-gränsen
+function crossesThreshold(a, b) {
+  var limits = [0, cfg.normal_threshold, cfg.boost_threshold,
+                cfg.return_threshold, cfg.return_threshold + cfg.hysteresis];
+  for (var i = 0; i < limits.length; i++) {
+    if ((a < limits[i]) !== (b < limits[i])) return true;
+  }
+  return false;
+}
+
+function shouldSend(value, now) {
+  if (lastSent === null || now - lastSentAt >= HEARTBEAT_S) return true;
+  if (Math.abs(value - lastSent) > DEADBAND_W) return true;
+  return crossesThreshold(lastSent, value);
+}
+
+function collect(value) {
+  if (stats === null) {
+    stats = { min: value, max: value, sum: value, n: 1 };
+    return;
+  }
+  if (value < stats.min) stats.min = value;
+  if (value > stats.max) stats.max = value;
+  stats.sum += value;
+  stats.n++;
+}
+
 function publishPower() {
   Shelly.call("EM.GetStatus", { id: CHANNEL }, function (result, err) {
     if (err !== 0 || !result) {
@@ -41,11 +197,68 @@ function publishPower() {
     // Runda av till hela watt
     var rounded = Math.round(power);
 
-    MQTT.publish(TOPIC, String(rounded), 0, false);
-    print("Publicerat:", rounded, "W →", TOPIC);
+    var now = uptime();
+    collect(rounded);
+    if (MQTT.isConnected() && shouldSend(rounded, now)) {
+      MQTT.publish(TOPIC, String(rounded), 0, false);
+      if (SUMMARY) {
+        MQTT.publish(TOPIC + "/stats", JSON.stringify({
+          min: stats.min, avg: Math.round(stats.sum / stats.n), max: stats.max, samples: stats.n
+        }), 0, false);
+      }
+      print("Publicerat:", rounded, "W →", TOPIC);
+      lastSent = rounded;
+      lastSentAt = now;
+      stats = null;
+    }
+    edgeDecide(rounded);
   });
 }
 
-// Kör direkt vid start, sedan var INTERVAL_MS
+// Hjärtslag {"mode": "boost", "ts": 1760000000} — bara färska räknas, så att ett
+// meddelande som legat kvar hos brokern inte tas för ett levande HA
+function onHeartbeat(topic, message) {
+  var data;
+  try {
+    data = JSON.parse(message);
+  } catch (e) {
+    return;
+  }
+  var mode = data.mode;
+  if (mode !== "boost" && mode !== "normal" && mode !== "block") return;
+  var unixtime = Shelly.getComponentStatus("sys").unixtime;
+  if (typeof data.ts === "number" && typeof unixtime === "number" && Math.abs(unixtime - data.ts) > HA_TIMEOUT_S) return;
+  haMode = mode;
+  haSeen = uptime();
+  edgeMode = null;
+  setRelays(mode);
+}
+
+function onEdgeConfig(topic, message) {
+  var data;
+  try {
+    data = JSON.parse(message);
+  } catch (e) {
+    print("Ogiltig edge-config:", message);
+    return;
+  }
+  for (var key in cfg) {
+    if (typeof data[key] === typeof cfg[key]) cfg[key] = data[key];
+  }
+  if (typeof data.ha_timeout === "number") HA_TIMEOUT_S = data.ha_timeout;
+  if (typeof data.control_topic === "string") CONTROL_TOPIC = data.control_topic;
+  if (typeof data.control_publish === "boolean") CONTROL_PUBLISH = data.control_publish;
+  if (EDGE_ENABLED && typeof data.heartbeat_topic === "string" && data.heartbeat_topic !== HEARTBEAT_TOPIC) {
+    MQTT.unsubscribe(HEARTBEAT_TOPIC);
+    HEARTBEAT_TOPIC = data.heartbeat_topic;
+    MQTT.subscribe(HEARTBEAT_TOPIC, onHeartbeat);
+  }
+  print("Edge-config:", JSON.stringify(cfg));
+}
+
+MQTT.subscribe(EDGE_CONFIG_TOPIC, onEdgeConfig);
+if (EDGE_ENABLED) MQTT.subscribe(HEARTBEAT_TOPIC, onHeartbeat);
+
+// Mät direkt vid start, sedan var INTERVAL_MS
 publishPower();
 Timer.set(INTERVAL_MS, true, publishPower);
@@ -0,0 +1,118 @@
+"""Spela upp beslutsjournalen genom beslutslogiken och visa var beteendet avviker.
+
+    python tools/journal_replay.py /config/.storage/sgready.<entry>.journal.bin
+    python tools/journal_replay.py JOURNAL --from 2026-01-14T02:00 --to 2026-01-14T04:00 --verbose
+    python tools/journal_replay.py JOURNAL --set boost_pct=25 --set prod_min_duration=120 --chain
+
+Utan --set ska omspelningen ge exakt journalens lägen — en avvikelse betyder
+att koden ändrats sedan beslutet togs (eller att något utanför indata
+påverkade det). Med --set visas var en annan konfiguration hade gjort
+annorlunda. --chain låter production override-tillståndet följa
+omspelningen i stället för att läsas från varje post.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fleet.core  # noqa: E402,F401 — registrerar integrationens HA-fria moduler som paketet sgready
+from sgready.journal import (  # noqa: E402
+    STAGE_FULL, JournalReader, journal_files, replay_decision, with_params,
+)
+
+
+def _timestamp(value: str) -> float:
+    moment = datetime.fromisoformat(value)
+    return moment.timestamp()   # naiv tid tolkas som lokal tid
+
+
+def _overrides(pairs: list[str]) -> dict:
+    overrides = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--set kräver nyckel=värde: {pair!r}")
+        overrides[key.strip()] = value.strip()
+    return overrides
+
+
+def _describe(record, today: list[float]) -> str:
+    price = today[record.hour] if record.hour < len(today) else None
+    parts = [
+        f"pris={price:.3f}" if price is not None else "pris=?",
+        f"nät={record.grid_power:.0f}W/{record.grid_quality}" if record.grid_power is not None else f"nät={record.grid_quality}",
+        f"inne={record.indoor_temp:.1f}°C" if record.indoor_temp is not None else None,
+        "tariff" if record.tariff_active else None,
+        "manuell" if record.manual_override else None,
+        f"ai={record.ai_mode}" if record.ai_mode != "auto" else None,
+        f"prod={record.prod_mode or 'av'}" + (" (hysteres)" if record.prod_in_hysteresis else ""),
+        "topp-veto" if record.peak_veto else None,
+    ]
+    return " ".join(part for part in parts if part)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="journal_replay", description="Spela upp SG Ready-beslutsjournalen")
+    parser.add_argument("journal", help="journalfil (roterade .1, .2 … läses också)")
+    parser.add_argument("--from", dest="start", help="starttid, ISO 8601 (lokal tid om ingen zon anges)")
+    parser.add_argument("--to", dest="stop", help="sluttid, ISO 8601")
+    parser.add_argument("--set", action="append", default=[], metavar="PARAM=VÄRDE",
+                        help="kör om med ändrad parameter (samma nycklar som skuggläget)")
+    parser.add_argument("--chain", action="store_true",
+                        help="production override-tillståndet följer omspelningen")
+    parser.add_argument("--verbose", action="store_true", help="visa alla beslut, inte bara avvikelser")
+    parser.add_argument("--limit", type=int, default=20, help="max antal avvikelser att visa")
+    args = parser.parse_args()
+
+    overrides = _overrides(args.set)
+    start = _timestamp(args.start) if args.start else None
+    stop = _timestamp(args.stop) if args.stop else None
+    files = journal_files(args.journal)
+    if not files:
+        raise SystemExit(f"Ingen journal: {args.journal}")
+
+    total = diverged = shown = 0
+    first = None
+    prod_state = None
+    for path in files:
+        with JournalReader(path) as reader:
+            begin = reader.bisect(start) if start is not None else 0
+            end = reader.bisect(stop) if stop is not None else len(reader)
+            for index, record, book in reader.records(begin, end):
+                today, tomorrow = book.day(record.day), book.day(record.day + 1)
+                if record.stage == STAGE_FULL and not today:
+                    continue   # prisposterna ligger i en fil som roterats bort
+                try:
+                    params = with_params(record, overrides)
+                except ValueError as err:
+                    raise SystemExit(f"--set: {err}") from err
+                if args.chain and prod_state is None:
+                    prod_state = record.production_state(record.ts)
+                replayed = replay_decision(record, today, tomorrow, params, prod_state if args.chain else None)
+                total += 1
+                divergence = replayed.diverges(record)
+                when = datetime.fromtimestamp(record.ts).isoformat(timespec="seconds")
+                if divergence:
+                    diverged += 1
+                    first = first or (when, divergence, record, today)
+                if (divergence and shown < args.limit) or args.verbose:
+                    shown += 1
+                    marker = "≠" if divergence else " "
+                    print(f"{marker} {when} {path.name}#{index} {record.mode:<6} → {replayed.mode:<6} "
+                          f"[{replayed.stage}] {_describe(record, today)}" + (f"  — {divergence}" if divergence else ""))
+
+    print(f"\n{total} beslut, {diverged} avvikelser" + (f" (med {', '.join(args.set)})" if args.set else ""))
+    if first:
+        when, divergence, record, today = first
+        print(f"Första avvikelse {when}: {divergence}")
+        print(f"  dygn {date.fromordinal(record.day)} timme {record.hour}: {_describe(record, today)}")
+        print(f"  journalens parametrar: {record.params.as_dict()}")
+    sys.exit(1 if diverged and not overrides else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Modbus-simulator — kör integrationens Modbus-utgång mot en pymodbus-server i processen.
+
+    pip install homeassistant pymodbus
+    python tools/modbus_sim.py --port 5020 --register 10 --unit 1
+
+Startar en Modbus TCP-server med ett holding register-block och kör
+`ModbusBackend` mot den: varje läge skrivs och läses tillbaka, en extern
+ändring av registret ska synas i återläsningen, en annan enhet på samma
+server ska lämnas orörd, ett okänt registervärde ger inget läge och en
+stängd server ska ge ConnectionError. Avslutas med
+felkod 1 om någon kontroll misslyckas.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))   # custom_components/ hittas från repots rot
+
+from custom_components.sgready.backends import ModbusBackend, modbus_unit_keyword, modbus_values  # noqa: E402
+from custom_components.sgready.const import DEFAULT_MODBUS_VALUES  # noqa: E402
+
+
+def _decoy(unit: int) -> int:
+    """En andra enhet på servern — enhet 0 är vad ett tappat enhetsnyckelord adresserar."""
+    return 0 if unit != 0 else 1
+
+
+async def _server(port: int, unit: int):
+    from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext
+    from pymodbus.server import ModbusTcpServer
+
+    try:
+        from pymodbus.datastore import ModbusDeviceContext
+    except ImportError:   # pymodbus 3.6–3.9
+        from pymodbus.datastore import ModbusSlaveContext
+
+        devices = {u: ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, [0] * 256)) for u in (unit, _decoy(unit))}
+        context = ModbusServerContext(slaves=devices, single=False)
+    else:
+        devices = {u: ModbusDeviceContext(hr=ModbusSequentialDataBlock(1, [0] * 256)) for u in (unit, _decoy(unit))}
+        context = ModbusServerContext(devices=devices, single=False)
+    server = ModbusTcpServer(context, address=("127.0.0.1", port))
+    task = asyncio.create_task(server.serve_forever())
+    await asyncio.sleep(0.3)
+    return server, task
+
+
+class _Probe:
+    """Egen klient som spelar värmepumpens lokala panel — läser och ändrar registret direkt."""
+
+    def __init__(self, port: int, unit: int, register: int) -> None:
+        from pymodbus.client import AsyncModbusTcpClient
+
+        self.client = AsyncModbusTcpClient("127.0.0.1", port=port)
+        self.unit = {modbus_unit_keyword(self.client): unit}
+        self.register = register
+
+    async def read(self) -> int:
+        result = await self.client.read_holding_registers(self.register, count=1, **self.unit)
+        return result.registers[0]
+
+    async def write(self, value: int) -> None:
+        await self.client.write_register(self.register, value, **self.unit)
+
+
+async def simulate(port: int, unit: int, register: int, values: dict[str, int]) -> list[tuple[str, bool, str]]:
+    results: list[tuple[str, bool, str]] = []
+
+    def check(name: str, ok: bool, detail: str = "") -> None:
+        results.append((name, ok, detail))
+
+    server, task = await _server(port, unit)
+    backend = ModbusBackend("127.0.0.1", port, unit, register, values)
+    probe = _Probe(port, unit, register)
+    decoy = _Probe(port, _decoy(unit), register)
+    try:
+        await probe.client.connect()
+        await decoy.client.connect()
+        await backend.async_start()
+        for mode, raw in values.items():
+            await backend.async_send(mode)
+            stored = await probe.read()
+            back = await backend.async_read_back()
+            check(f"skriv {mode}", stored == raw and back == mode, f"register={stored} återläst={back}")
+        stray = await decoy.read()
+        check(f"enhet {_decoy(unit)} orörd", stray == 0, f"register={stray}")
+
+        external = values["normal"]   # backend står i sista läget i values, panelen byter till normal
+        await probe.write(external)
+        back = await backend.async_read_back()
+        check("extern ändring syns", back == "normal", f"återläst={back}")
+
+        unknown = next(raw for raw in range(0x10000) if raw not in values.values())
+        await probe.write(unknown)
+        back = await backend.async_read_back()
+        check("okänt värde ger inget läge", back is None, f"register={unknown} återläst={back}")
+    finally:
+        probe.client.close()
+        decoy.client.close()
+        await server.shutdown()
+        task.cancel()
+
+    await backend.async_stop()
+    try:
+        await backend.async_send("boost")
+    except ConnectionError as err:
+        check("stängd server ger ConnectionError", True, str(err))
+    else:
+        check("stängd server ger ConnectionError", False, "skrivningen lyckades")
+    finally:
+        await backend.async_stop()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Kör Modbus-utgången mot en simulerad värmepump")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--unit", type=int, default=1)
+    parser.add_argument("--register", type=int, default=10)
+    parser.add_argument("--values", default=None, help='registervärden som JSON, t.ex. {"block": 1, "normal": 2, "boost": 3}')
+    args = parser.parse_args()
+    values = modbus_values(json.loads(args.values) if args.values else dict(DEFAULT_MODBUS_VALUES))
+    results = asyncio.run(simulate(args.port, args.unit, args.register, values))
+    for name, ok, detail in results:
+        print(f"{'✓' if ok else '✗'} {name:<34} {detail}")
+    failed = sum(not ok for _, ok, _ in results)
+    print(f"\n{len(results)} kontroller, {failed} fel")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
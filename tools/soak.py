@@ -0,0 +1,579 @@
+"""Last- och uthållighetstest — integrationen i en riktig Home Assistant-kärna med syntetisk indata.
+
+    pip install homeassistant
+    python tools/soak.py --entries 50 --meters 3 --rate 10 --duration 600 --refresh 2
+
+Startar Home Assistant (utan recorder/frontend) i en temporär konfigkatalog och
+sätter upp N config entries av integrationen, var och en med:
+
+  * en Nord Pool-ersättare — config entry vars `runtime_data` är en koordinator
+    med samma datastruktur som den officiella integrationen; nya priser
+    "publiceras" var --price-update sekund och triggar alla instanser samtidigt,
+  * en MQTT-ersättare i processen i stället för `homeassistant.components.mqtt`
+    (async_publish/async_subscribe, wildcards, retained) och en värmepump som
+    kvitterar läget på state-topicet,
+  * syntetiska effekt- (--rate Hz per mätare) och temperaturströmmar som
+    skrivs till tillståndsmaskinen, samt valfria AI-kommandon.
+
+Koordinatorns uppdateringsintervall sätts till --refresh sekunder — varje
+cykel motsvarar ett ordinarie 5-minutersintervall, så 600 s med --refresh 2
+är 300 beslut per instans ≈ 25 h drift. Rapporten visar event loop-fördröjning,
+omräkningstid (percentiler), publiceringstakt per topic och minnestillväxt.
+
+    python tools/soak.py --virtual-days 3
+
+kör i stället production override i en koordinator på VirtualClock: dygn av
+mätarström (solkurva, moln, laster och ett dagligt mätaravbrott) och ett
+beslut var femte minut på sekunder, med kontroller av aktiveringstid och
+inaktuell mätardata mot den virtuella tiden.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))   # custom_components/ och fleet/ hittas från repots rot
+
+from fleet.broker import topic_matches  # noqa: E402
+
+NORMAL_INTERVAL = 300   # s — koordinatorns ordinarie uppdateringsintervall
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def rss_bytes() -> int:
+    """Aktuellt RSS (Linux), annars högsta RSS hittills."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ── MQTT-ersättare ─────────────────────────────────────────────────────────
+
+class MqttStandIn:
+    """Det integrationen använder av `homeassistant.components.mqtt`, levererat i processen.
+
+    Prenumeranter anropas i event loopen (som den riktiga integrationen gör).
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions: list[tuple[str, object]] = []
+        self.retained: dict[str, str] = {}
+        self.published: Counter[str] = Counter()   # topic-slut (control, ai_result …) → antal
+
+    def module(self) -> ModuleType:
+        module = ModuleType("homeassistant.components.mqtt")
+        module.async_publish = self.async_publish
+        module.async_subscribe = self.async_subscribe
+        return module
+
+    async def async_publish(self, hass, topic: str, payload, qos: int = 0, retain: bool = False, encoding=None) -> None:
+        payload = payload if isinstance(payload, str) else payload.decode() if isinstance(payload, bytes) else str(payload)
+        self.published[topic.rsplit("/", 1)[-1]] += 1
+        if retain:
+            self.retained[topic] = payload
+        self.deliver(hass, topic, payload, retain)
+
+    def deliver(self, hass, topic: str, payload: str, retain: bool = False) -> None:
+        message = SimpleNamespace(topic=topic, payload=payload, qos=0, retain=retain, timestamp=time.time())
+        for topic_filter, callback in list(self.subscriptions):
+            if topic_matches(topic_filter, topic):
+                hass.loop.call_soon(callback, message)
+
+    async def async_subscribe(self, hass, topic: str, msg_callback, qos: int = 0, encoding="utf-8"):
+        subscription = (topic, msg_callback)
+        self.subscriptions.append(subscription)
+        for retained_topic, payload in self.retained.items():
+            if topic_matches(topic, retained_topic):
+                hass.loop.call_soon(msg_callback, SimpleNamespace(topic=retained_topic, payload=payload, retain=True))
+
+        def _unsubscribe() -> None:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+        return _unsubscribe
+
+
+# ── Nord Pool-ersättare ────────────────────────────────────────────────────
+
+class FakeNordPool:
+    """Samma form som den officiella Nord Pool-koordinatorns data: data.entries[dygn].entries[timme]."""
+
+    def __init__(self, area: str, seed: int) -> None:
+        self.area = area
+        self._random = random.Random(seed)
+        self._listeners: list = []
+        self.data = None
+        self.updates = 0
+
+    def async_add_listener(self, update_callback, context=None):
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback) if update_callback in self._listeners else None
+
+    def publish(self, dt_util) -> None:
+        """Nya priser för idag och imorgon (mSEK/MWh) — lyssnarna notifieras."""
+        start = dt_util.start_of_local_day()
+        days = []
+        for day in range(2):
+            base = 600 + self._random.uniform(-300, 600)
+            entries = []
+            for hour in range(24):
+                price = base + 400 * math.sin((hour - 6) / 24 * 2 * math.pi) + self._random.gauss(0, 80)
+                entries.append(SimpleNamespace(
+                    start=start + timedelta(days=day, hours=hour),
+                    entry={self.area: round(price, 2)},
+                ))
+            days.append(SimpleNamespace(entries=entries))
+        self.data = SimpleNamespace(entries=days)
+        self.updates += 1
+        for update_callback in list(self._listeners):
+            update_callback()
+
+
+# ── Körning ────────────────────────────────────────────────────────────────
+
+class Soak:
+    def __init__(self, args) -> None:
+        self.args = args
+        self.mqtt = MqttStandIn()
+        self.loop_lag: list[float] = []
+        self.refresh_times: list[float] = []
+        self.memory: list[tuple[float, int]] = []
+        self.samples_written = 0
+        self.ai_sent = 0
+
+    async def run(self) -> dict:
+        args = self.args
+        from homeassistant import bootstrap, loader
+        from homeassistant.auth import auth_manager_from_config
+        from homeassistant.config_entries import ConfigEntries, ConfigEntry
+        from homeassistant.core import HomeAssistant
+        from homeassistant.setup import async_setup_component
+        from homeassistant.util import dt as dt_util
+
+        from custom_components.sgready import const
+
+        with tempfile.TemporaryDirectory(prefix="sgready-soak-") as config_dir:
+            hass = HomeAssistant(config_dir)
+            hass.config.set_time_zone(args.time_zone)
+            hass.config.skip_pip = True
+            loader.async_setup(hass)
+            hass.config_entries = ConfigEntries(hass, {})
+            await bootstrap.async_load_base_functionality(hass)
+            hass.auth = await auth_manager_from_config(hass, [{"type": "homeassistant"}], [])   # krävs av http
+
+            # MQTT-ersättaren registreras som laddad integration
+            sys.modules["homeassistant.components.mqtt"] = self.mqtt.module()
+            hass.config.components.add("mqtt")
+            await async_setup_component(hass, "http", {"http": {"server_host": "127.0.0.1", "server_port": args.http_port}})
+
+            nordpool = FakeNordPool(args.area, args.seed)
+            nordpool.publish(dt_util)
+            nordpool_entry = ConfigEntry(
+                version=1, minor_version=1, domain="nordpool", title="Nord Pool (ersättare)",
+                data={}, source="user",
+            )
+            object.__setattr__(nordpool_entry, "runtime_data", nordpool)
+            hass.config_entries._entries[nordpool_entry.entry_id] = nordpool_entry   # läggs in utan setup
+
+            rnd = random.Random(args.seed)
+            entries = []
+            for index in range(args.entries):
+                prefix = f"soak/{index}"
+                meters = [f"sensor.soak_{index}_grid_{m}" for m in range(args.meters)]
+                entries.append((index, prefix, meters, ConfigEntry(
+                    version=1, minor_version=1, domain=const.DOMAIN, title=f"Soak {index}", source="user",
+                    data={
+                        const.CONF_NORDPOOL_CONFIG_ENTRY: nordpool_entry.entry_id,
+                        const.CONF_NORDPOOL_AREA: args.area,
+                        const.CONF_MQTT_TOPIC: f"{prefix}/control",
+                        const.CONF_MQTT_AI_TOPIC: f"{prefix}/ai_command",
+                        const.CONF_MQTT_AI_RESULT_TOPIC: f"{prefix}/ai_result",
+                        const.CONF_MQTT_STATE_TOPIC: f"{prefix}/state",
+                        const.CONF_MQTT_EDGE_TOPIC: f"{prefix}/edge_config",
+                        const.CONF_TEMP_ENTITY: f"sensor.soak_{index}_temp",
+                        const.CONF_GRID_POWER_SOURCES: [{"entity": entity_id} for entity_id in meters],
+                        const.CONF_PROD_ENABLED: True,
+                        const.CONF_PEAK_ENABLED: args.peak,
+                        const.CONF_JOURNAL_ENABLED: args.journal,
+                    },
+                )))
+                for entity_id in meters:
+                    hass.states.async_set(entity_id, str(rnd.randint(-2000, 2000)), {"unit_of_measurement": "W"})
+                hass.states.async_set(f"sensor.soak_{index}_temp", "21.0", {"unit_of_measurement": "°C"})
+
+            await hass.async_start()
+            self._start_heat_pumps(hass)
+            started = time.perf_counter()
+            for _, _, _, entry in entries:
+                await hass.config_entries.async_add(entry)
+            setup_seconds = time.perf_counter() - started
+
+            loaded = hass.data.get(const.DOMAIN, {})
+            if len(loaded) != len(entries):
+                await hass.async_stop()
+                raise SystemExit(f"Bara {len(loaded)} av {len(entries)} instanser startade — se loggen")
+            coordinators = [loaded[entry.entry_id] for *_, entry in entries]
+            for coordinator in coordinators:
+                coordinator.update_interval = timedelta(seconds=args.refresh)
+                self._time_refreshes(coordinator)
+                await coordinator.async_refresh()   # schemalägger nästa cykel med det nya intervallet
+            gc.collect()
+            if args.tracemalloc:
+                tracemalloc.start()
+            snapshot = tracemalloc.take_snapshot() if args.tracemalloc else None
+            self.mqtt.published.clear()
+
+            tasks = [
+                asyncio.create_task(self._monitor_loop()),
+                asyncio.create_task(self._monitor_memory()),
+                asyncio.create_task(self._price_updates(nordpool, dt_util)),
+            ]
+            for index, prefix, meters, _ in entries:
+                tasks.append(asyncio.create_task(self._grid_stream(hass, meters, random.Random(args.seed + index))))
+                tasks.append(asyncio.create_task(self._temp_stream(hass, f"sensor.soak_{index}_temp", random.Random(-index))))
+                if args.ai_rate > 0:
+                    tasks.append(asyncio.create_task(self._ai_stream(hass, prefix, random.Random(index))))
+
+            t0 = time.perf_counter()
+            await asyncio.sleep(args.duration)
+            elapsed = time.perf_counter() - t0
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            gc.collect()
+            self.memory.append((time.perf_counter() - t0, rss_bytes()))
+
+            top = []
+            if snapshot is not None:
+                stats = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+                top = [str(stat) for stat in stats[:args.tracemalloc]]
+                tracemalloc.stop()
+
+            published = dict(self.mqtt.published)
+            for _, _, _, entry in entries:
+                await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_stop()
+
+        return self._report(elapsed, setup_seconds, coordinators, published, nordpool, top)
+
+    def _time_refreshes(self, coordinator) -> None:
+        """Mät hela refreshen — beräkning, utgång och entitetsuppdateringar."""
+        refresh = coordinator._async_refresh
+
+        async def _timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await refresh(*args, **kwargs)
+            finally:
+                self.refresh_times.append(time.perf_counter() - started)
+
+        coordinator._async_refresh = _timed
+
+    def _start_heat_pumps(self, hass) -> None:
+        """Värmepumpar som kvitterar varje läge på state-topicet efter en kort fördröjning."""
+
+        def _on_control(msg) -> None:
+            state_topic = msg.topic.rsplit("/", 1)[0] + "/state"
+            hass.loop.call_later(0.05, self.mqtt.deliver, hass, state_topic, str(msg.payload))
+
+        self.mqtt.subscriptions.append(("soak/+/control", _on_control))
+
+    async def _monitor_loop(self) -> None:
+        interval = 0.05
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            self.loop_lag.append(max(0.0, time.perf_counter() - expected))
+
+    async def _monitor_memory(self) -> None:
+        t0 = time.perf_counter()
+        while True:
+            self.memory.append((time.perf_counter() - t0, rss_bytes()))
+            await asyncio.sleep(self.args.memory_interval)
+
+    async def _price_updates(self, nordpool: FakeNordPool, dt_util) -> None:
+        while True:
+            await asyncio.sleep(self.args.price_update)
+            nordpool.publish(dt_util)
+
+    async def _paced(self, rate: float, rnd: random.Random):
+        """Takt `rate` Hz med slumpad fas, utan drift."""
+        period = 1 / rate
+        next_at = time.perf_counter() + rnd.uniform(0, period)
+        while True:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            next_at += period
+            yield
+
+    async def _grid_stream(self, hass, meters: list[str], rnd: random.Random) -> None:
+        values = {entity_id: float(hass.states.get(entity_id).state) for entity_id in meters}
+        async for _ in self._paced(self.args.rate, rnd):
+            for entity_id in meters:
+                # Slumpvandring med enstaka språng (moln, laster som slår till)
+                value = values[entity_id] + rnd.gauss(0, 40) + (rnd.choice((-1500, 1500)) if rnd.random() < 0.002 else 0)
+                values[entity_id] = max(-6000.0, min(6000.0, value))
+                hass.states.async_set(entity_id, str(round(values[entity_id])), {"unit_of_measurement": "W"})
+                self.samples_written += 1
+
+    async def _temp_stream(self, hass, entity_id: str, rnd: random.Random) -> None:
+        temp = 21.0
+        async for _ in self._paced(self.args.temp_rate, rnd):
+            temp = max(17.0, min(24.0, temp + rnd.gauss(0, 0.1)))
+            hass.states.async_set(entity_id, f"{temp:.1f}", {"unit_of_measurement": "°C"})
+
+    async def _ai_stream(self, hass, prefix: str, rnd: random.Random) -> None:
+        modes = ("auto", "force_boost", "force_normal", "force_block")
+        async for _ in self._paced(self.args.ai_rate, rnd):
+            payload = json.dumps({"mode": rnd.choice(modes), "duration_minutes": 30, "source": "soak", "reason": "soak"})
+            self.mqtt.deliver(hass, f"{prefix}/ai_command", payload)
+            self.ai_sent += 1
+
+    def _report(self, elapsed: float, setup_seconds: float, coordinators, published: dict, nordpool, top: list) -> dict:
+        args = self.args
+        refreshes = len(self.refresh_times)
+        simulated_hours = refreshes / max(1, len(coordinators)) * NORMAL_INTERVAL / 3600
+        warm = [rss for t, rss in self.memory if t >= min(args.warmup, elapsed / 2)]
+        growth = (warm[-1] - warm[0]) if len(warm) >= 2 else 0
+        return {
+            "entries": len(coordinators),
+            "duration_s": round(elapsed, 1),
+            "setup_s": round(setup_seconds, 2),
+            "simulated_hours": round(simulated_hours, 1),
+            "grid_samples_per_s": round(self.samples_written / elapsed, 1),
+            "grid_samples_seen": sum(c.metrics.grid_samples for c in coordinators),
+            "price_updates": nordpool.updates,
+            "ai_commands_sent": self.ai_sent,
+            "loop_lag_ms": {
+                "p50": round(percentile(self.loop_lag, 50) * 1000, 2),
+                "p99": round(percentile(self.loop_lag, 99) * 1000, 2),
+                "max": round(max(self.loop_lag, default=0) * 1000, 2),
+            },
+            "refresh_ms": {
+                "count": refreshes,
+                "p50": round(percentile(self.refresh_times, 50) * 1000, 2),
+                "p95": round(percentile(self.refresh_times, 95) * 1000, 2),
+                "p99": round(percentile(self.refresh_times, 99) * 1000, 2),
+                "max": round(max(self.refresh_times, default=0) * 1000, 2),
+            },
+            "publish_per_s": {topic: round(count / elapsed, 2) for topic, count in sorted(published.items())},
+            "publish_failures": sum(c.metrics.publish_failures for c in coordinators),
+            "memory_mb": {
+                "start": round(warm[0] / 2**20, 1) if warm else None,
+                "end": round(warm[-1] / 2**20, 1) if warm else None,
+                "growth_per_simulated_hour_kb": round(growth / 1024 / simulated_hours, 1) if simulated_hours else None,
+            },
+            "tracemalloc_top": top,
+        }
+
+
+# ── Virtuell klocka: production override ───────────────────────────────────
+
+class VirtualProductionRun:
+    """En koordinator på VirtualClock med syntetisk mätare — inga väntetider, inga HA-timers.
+
+    Mätaren skrivs till tillståndsmaskinen var --virtual-step sekund: last
+    med brus och enstaka toppar minus en solkurva med moln. Varje dag kl
+    12:00–12:20 tystnar mätaren. Besluten fattas var femte minut av en
+    klocktimer. Kontrollerna:
+
+      * inaktuell: beslut mer än källans max_age efter senaste mätvärdet ska
+        ha kvalitet stale och inget override, och färska beslut kvalitet good,
+      * aktivering: när override slår på ska de stegade besluten ha sett
+        överskott i minst prod_min_duration virtuella sekunder.
+    """
+
+    METER = "sensor.virtual_grid"
+
+    def __init__(self, args) -> None:
+        self.args = args
+        self.decisions: list[dict] = []
+        self.violations: list[str] = []
+        self.last_write: float | None = None   # monoton tid för senaste mätvärdet
+
+    async def run(self) -> dict:
+        from homeassistant.config_entries import ConfigEntry
+        from homeassistant.core import HomeAssistant
+        from homeassistant.util import dt as dt_util
+
+        from custom_components.sgready import const
+        from custom_components.sgready.clock import VirtualClock
+        from custom_components.sgready.coordinator import SGReadyCoordinator
+
+        args = self.args
+        rnd = random.Random(args.seed)
+        with tempfile.TemporaryDirectory(prefix="sgready-virtual-") as config_dir:
+            hass = HomeAssistant(config_dir)
+            hass.config.set_time_zone(args.time_zone)
+            tz = dt_util.get_time_zone(args.time_zone)
+            clock = VirtualClock(datetime.combine(datetime.now(tz).date(), datetime.min.time(), tz))
+            entry = ConfigEntry(
+                version=1, minor_version=1, domain=const.DOMAIN, title="Virtuell", source="user",
+                data={const.CONF_GRID_POWER_ENTITY: self.METER, const.CONF_PROD_ENABLED: True},
+            )
+            coordinator = SGReadyCoordinator(hass, entry, clock=clock)
+            max_age = coordinator.power.sources[self.METER].max_age
+            # Pristopp mitt på dagen (block 11–17) så att solöverskottet har något att ersätta
+            spot = [0.4] * 7 + [1.2, 1.5, 1.8, 2.2, 2.6, 3.0, 3.2, 3.0, 2.6, 2.2, 1.8, 1.5, 1.2] + [0.5] * 4
+
+            def _decide(_now) -> None:
+                if coordinator.prices is None or coordinator.prices.day != clock.now().date():
+                    coordinator._update_price_vectors(spot, spot)
+                prices = coordinator.prices
+                result = coordinator._calculate_mode(prices.import_today, prices.import_tomorrow)
+                fused = coordinator._grid_power()
+                self._check(coordinator, clock.monotonic(), result, fused, max_age)
+
+            coordinator.async_start_power_listener()
+            stop_decisions = clock.call_every(NORMAL_INTERVAL, _decide)
+            cloud, load_spike = 1.0, 0
+            started = time.perf_counter()
+            for _ in range(int(args.virtual_days * 86400 / args.virtual_step)):
+                local = clock.now()
+                hour = local.hour + local.minute / 60
+                if not (local.hour == 12 and local.minute < 20):
+                    cloud = max(0.2, min(1.0, cloud + rnd.gauss(0, 0.05)))
+                    load_spike = 2000 if rnd.random() < 0.002 else max(0, load_spike - 100)
+                    solar = 4500 * max(0.0, math.sin(math.pi * (hour - 5) / 16)) * cloud
+                    net = 700 + rnd.gauss(0, 150) + load_spike - solar
+                    hass.states.async_set(self.METER, str(round(net)), {"unit_of_measurement": "W"})
+                    await hass.async_block_till_done()
+                    self.last_write = clock.monotonic()
+                clock.advance(args.virtual_step)
+            elapsed = time.perf_counter() - started
+            stop_decisions()
+            coordinator.async_stop_power_listener()
+            await hass.async_stop()
+
+        active = sum(1 for d in self.decisions if d["active"])
+        return {
+            "simulated_days": args.virtual_days,
+            "wall_s": round(elapsed, 2),
+            "decisions": len(self.decisions),
+            "stale_decisions": sum(1 for d in self.decisions if d["quality"] != const.POWER_QUALITY_GOOD),
+            "override_hours": round(active * NORMAL_INTERVAL / 3600, 1),
+            "activations": dict(coordinator.metrics.prod_transitions),
+            "energy_kwh": {"import": round(coordinator.energy.import_kwh, 1), "export": round(coordinator.energy.export_kwh, 1)},
+            "violations": self.violations,
+        }
+
+    def _check(self, coordinator, now: float, result, fused, max_age: float) -> None:
+        age = now - self.last_write if self.last_write is not None else math.inf
+        decision = {
+            "t": now, "quality": fused.quality, "power": fused.power_w,
+            "active": result.prod_override_active, "stepped": fused.good,
+        }
+        when = coordinator.clock.now().strftime("%d %H:%M")
+        if age > max_age and (fused.good or result.prod_override_active):
+            self.violations.append(f"{when}: mätaren tyst i {age:.0f} s men kvalitet {fused.quality}")
+        if age <= max_age - self.args.virtual_step and not fused.good:
+            self.violations.append(f"{when}: färskt mätvärde ({age:.0f} s) men kvalitet {fused.quality}")
+        stepped = [d for d in self.decisions if d["stepped"]]
+        if decision["stepped"] and decision["active"] and stepped and not stepped[-1]["active"]:
+            # Aktivering: sammanhängande överskott bland stegade beslut i minst min_duration
+            threshold = coordinator.prod_normal_threshold
+            earliest = now
+            for previous in reversed([*stepped, decision]):
+                if previous["power"] >= threshold:
+                    break
+                earliest = previous["t"]
+            if now - earliest < coordinator.prod_min_duration:
+                self.violations.append(f"{when}: override efter {now - earliest:.0f} s överskott")
+        self.decisions.append(decision)
+
+
+def _print_virtual_report(report: dict) -> None:
+    print(f"Simulerat:            {report['simulated_days']} dygn på {report['wall_s']} s")
+    print(f"Beslut:               {report['decisions']} ({report['stale_decisions']} med inaktuell mätardata)")
+    print(f"Production override:  {report['override_hours']} h aktiv, övergångar {report['activations']}")
+    print(f"Energi:               import {report['energy_kwh']['import']} kWh, export {report['energy_kwh']['export']} kWh")
+    print(f"Avvikelser:           {len(report['violations'])}")
+    for line in report["violations"][:20]:
+        print(f"  {line}")
+
+
+def _print_report(report: dict) -> None:
+    lag, refresh, memory = report["loop_lag_ms"], report["refresh_ms"], report["memory_mb"]
+    print(f"Instanser:            {report['entries']} (uppsättning {report['setup_s']} s)")
+    print(f"Körtid:               {report['duration_s']} s ≈ {report['simulated_hours']} h drift per instans")
+    print(f"Mätvärden:            {report['grid_samples_per_s']}/s skrivna, {report['grid_samples_seen']} sedda av koordinatorerna")
+    print(f"Prisuppdateringar:    {report['price_updates']}   AI-kommandon: {report['ai_commands_sent']}")
+    print(f"Event loop-fördröjn.: p50 {lag['p50']} ms  p99 {lag['p99']} ms  max {lag['max']} ms")
+    print(f"Omräkning:            {refresh['count']} st  p50 {refresh['p50']} ms  p95 {refresh['p95']} ms  "
+          f"p99 {refresh['p99']} ms  max {refresh['max']} ms")
+    print("Publiceringar/s:      " + ", ".join(f"{topic} {rate}" for topic, rate in report["publish_per_s"].items())
+          + f"   (fel: {report['publish_failures']})")
+    print(f"Minne (RSS):          {memory['start']} → {memory['end']} MB, "
+          f"{memory['growth_per_simulated_hour_kb']} kB per simulerad timme")
+    for line in report["tracemalloc_top"]:
+        print(f"  {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="soak", description="Last-/uthållighetstest för SG Ready-integrationen")
+    parser.add_argument("--entries", type=int, default=10, help="antal config entries")
+    parser.add_argument("--meters", type=int, default=1, help="effektkällor per instans")
+    parser.add_argument("--rate", type=float, default=10.0, help="mätvärden per sekund och mätare")
+    parser.add_argument("--temp-rate", type=float, default=0.2, help="temperaturvärden per sekund och instans")
+    parser.add_argument("--ai-rate", type=float, default=0.0, help="AI-kommandon per sekund och instans")
+    parser.add_argument("--duration", type=float, default=120.0, help="körtid i sekunder")
+    parser.add_argument("--refresh", type=float, default=2.0, help="sekunder per uppdateringscykel (ordinarie 300)")
+    parser.add_argument("--price-update", type=float, default=60.0, help="sekunder mellan nya Nord Pool-priser")
+    parser.add_argument("--peak", action="store_true", help="aktivera effekttariffvakten")
+    parser.add_argument("--journal", action="store_true", help="aktivera beslutsjournalen")
+    parser.add_argument("--warmup", type=float, default=10.0, help="sekunder innan minnesbaslinjen tas")
+    parser.add_argument("--memory-interval", type=float, default=5.0)
+    parser.add_argument("--tracemalloc", type=int, default=0, metavar="N", help="visa N största allokeringsökningar (sänker takten märkbart)")
+    parser.add_argument("--area", default="SE4")
+    parser.add_argument("--time-zone", default="Europe/Stockholm")
+    parser.add_argument("--http-port", type=int, default=18123)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--virtual-days", type=float, default=0.0, help="kör production override på virtuell klocka i så många dygn")
+    parser.add_argument("--virtual-step", type=float, default=10.0, help="sekunder mellan mätvärden i den virtuella körningen")
+    parser.add_argument("--json", action="store_true", help="skriv rapporten som JSON")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.virtual_days > 0:
+        report = asyncio.run(VirtualProductionRun(args).run())
+        if args.json:
+            print(json.dumps(report, indent=2, ensure_ascii=False))
+        else:
+            _print_virtual_report(report)
+        sys.exit(1 if report["violations"] else 0)
+    report = asyncio.run(Soak(args).run())
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()